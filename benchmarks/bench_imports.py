@@ -0,0 +1,59 @@
+"""
+Measures how long data_utils entry points take to import in a fresh interpreter, and which heavy optional
+dependencies each one pulls in. Compare against an older checkout by running it from there.
+
+    python -m benchmarks.bench_imports --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = [
+    "data_utils.settings",
+    "data_utils.script",
+    "data_utils.file_utils.fixed_width.file_spec",
+    "data_utils.file_utils.fixed_width.reader",
+    "data_utils.file_utils.fixed_width.type_caster",
+    "data_utils.file_utils.fixed_width.parallel",
+]
+
+HEAVY_MODULES = ["boto3", "snowflake", "sqlalchemy", "sendgrid", "slack", "gnupg", "pendulum", "numpy", "pyarrow"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def time_import(module: str, runs: int) -> dict:
+    samples = []
+    loaded = []
+
+    for _ in range(runs):
+        probe = PROBE.format(module=module, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", probe], check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        loaded = result["loaded"]
+
+    return {"median_ms": statistics.median(samples) * 1000, "loaded": loaded}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        result = time_import(module, args.runs)
+        loaded = ", ".join(result["loaded"]) or "none"
+        print(f"{module:<48} {result['median_ms']:8.1f} ms   heavy dependencies loaded: {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Throughput benchmarks for the fixed-width pipeline on a synthetic file generated from a layout CSV (see
+benchmarks.synthetic): layout compilation, raw slicing, TypeCaster casting, COMP-3 unpacking, and end-to-end
+parsing in rows/sec and MB/sec, each with its Python memory high-water mark. Runs offline. Results can be written
+as JSON and compared against an earlier run's JSON to spot regressions.
+
+    python -m benchmarks.bench_suite --records 200000 --output after.json --compare before.json
+    python -m benchmarks.bench_suite --layout my_layout.csv --record-type-start 1 --file-format EBCDIC
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from benchmarks.synthetic import _packed_value, _parse_weights, generate_file, load_file_spec
+from data_utils.file_utils.fixed_width import layout_cache
+from data_utils.file_utils.fixed_width.comp3 import unpack_comp3
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+SAMPLE_LAYOUT = Path(__file__).parent / "layouts" / "sample.csv"
+
+# Metrics compared with --compare: higher is better for throughput, lower is better for memory.
+HIGHER_IS_BETTER = ("rows_per_sec", "mb_per_sec")
+LOWER_IS_BETTER = ("peak_memory_mb",)
+
+
+def measure(run: Callable[[], int], size_bytes: int = None, memory: bool = True, repeat: int = 1) -> Dict[str, Any]:
+    """Times run(), which returns the number of rows it processed, keeping the fastest of repeat runs. With
+    memory, runs it once more under tracemalloc for the peak allocation, so tracing doesn't skew the timing."""
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = run()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    result = {"rows": rows, "seconds": round(seconds, 4), "rows_per_sec": round(rows / seconds, 1)}
+    if size_bytes is not None:
+        result["mb_per_sec"] = round(size_bytes / 1024 / 1024 / seconds, 2)
+
+    if memory:
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def run_suite(args: argparse.Namespace, directory: str) -> Dict[str, Dict[str, Any]]:
+    file_config = {"record_type_start": args.record_type_start, "record_type_length": args.record_type_length,
+                   "file_format": args.file_format}
+    spec = load_file_spec(args.layout, directory, **file_config)
+    data_path = os.path.join(directory, "synthetic.dat")
+    size = generate_file(spec, data_path, args.records, args.null_rate, args.garbage_rate,
+                         _parse_weights(args.record_type_weights), args.record_length, args.seed)
+    memory = not args.no_memory
+    results = {}
+
+    def timed(run: Callable[[], int], size_bytes: int = None, trace: bool = memory) -> Dict[str, Any]:
+        return measure(run, size_bytes, trace, args.repeat)
+
+    def compile_layouts() -> int:
+        for _ in range(args.compile_runs):
+            load_file_spec(args.layout, directory, **file_config)
+        return args.compile_runs
+
+    def compile_cached() -> int:
+        # Pinning layout_version skips hashing the layout file, so every run after the first is a registry hit.
+        cached_config = {"layout_name": Path(args.layout).name, "layout_version": "bench", **file_config}
+        settings = _registry_settings(directory)
+        layout_cache.clear_registry()
+        for _ in range(args.compile_runs):
+            FileSpec(settings, cached_config)
+        return args.compile_runs
+
+    results["layout_compile"] = timed(compile_layouts)
+    results["layout_compile_cached"] = timed(compile_cached)
+
+    def slice_records(decode: bool) -> Callable[[], int]:
+        def run() -> int:
+            reader = FixedWidthReader(spec, decode=decode, record_length=args.record_length)
+            return sum(1 for _ in reader.records(data_path))
+        return run
+
+    results["raw_slicing"] = timed(slice_records(False), size)
+    results["slice_and_decode"] = timed(slice_records(True), size)
+
+    records = list(FixedWidthReader(spec, record_length=args.record_length).records(data_path))
+    caster = TypeCaster(spec)
+
+    def cast_records() -> int:
+        cast_record = caster.cast_record
+        for record_type, record in records:
+            cast_record(record_type, record)
+        return len(records)
+
+    results["type_caster"] = timed(cast_records)
+    del records
+
+    packed = _packed_values(args.records, args.seed)
+
+    def unpack_scalar() -> int:
+        for value in packed:
+            unpack_comp3(value)
+        return len(packed)
+
+    results["comp3_scalar"] = timed(unpack_scalar)
+
+    try:
+        import numpy as np
+        from data_utils.file_utils.fixed_width.columnar import ColumnarDecoder
+        from data_utils.file_utils.fixed_width.comp3 import unpack_comp3_matrix
+    except ImportError:
+        np = None
+
+    if np is not None:
+        matrix = np.frombuffer(b"".join(packed), dtype=np.uint8).reshape(len(packed), -1)
+        results["comp3_vectorized"] = timed(lambda: len(unpack_comp3_matrix(matrix, 2)))
+
+    def end_to_end() -> int:
+        reader = FixedWidthReader(spec, record_length=args.record_length)
+        cast_record = TypeCaster(spec).cast_record
+        count = 0
+        for record_type, record in reader.records(data_path):
+            cast_record(record_type, record)
+            count += 1
+        return count
+
+    results["end_to_end"] = timed(end_to_end, size)
+
+    if np is not None:
+        def end_to_end_columnar() -> int:
+            decoder = ColumnarDecoder(spec, record_length=args.record_length)
+            return sum(len(next(iter(batch.values()))) for _, batch in decoder.iter_batches(data_path))
+
+        results["end_to_end_columnar"] = timed(end_to_end_columnar, size)
+
+    if args.workers:
+        from data_utils.file_utils.fixed_width.parallel import ParallelParser
+
+        def end_to_end_parallel() -> int:
+            parser = ParallelParser(spec, workers=args.workers, record_length=args.record_length)
+            return sum(1 for _ in parser.parse(data_path))
+
+        # Worker processes aren't traced, so the parent's peak memory would be misleading.
+        results["end_to_end_parallel"] = timed(end_to_end_parallel, size, trace=False)
+
+    return results
+
+
+def _registry_settings(directory: str):
+    from data_utils.settings import Settings
+
+    config_file = Path(directory) / "registry.ini"
+    if not config_file.exists():
+        config_file.write_text(f"[file_config]\ndownload_path = {directory}/\nuse_s3 = false\n"
+                               f"layout_cache_registry = true\n")
+    return Settings(str(config_file))
+
+
+def _packed_values(count: int, seed: int) -> list:
+    import random
+
+    rng = random.Random(seed)
+    pool = [_packed_value(rng, 5, "S9(7)V9(2) COMP-3") for _ in range(4096)]
+    return [pool[i % len(pool)] for i in range(count)]
+
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    try:
+        import resource
+        # Linux reports kilobytes, macOS bytes.
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        max_rss_mb = round(max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        max_rss_mb = None
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "max_rss_mb": max_rss_mb,
+        "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> list:
+    """Prints the change in each metric against a baseline run. Returns the metrics that regressed by more than
+    threshold (a fraction, e.g. 0.1 for 10%)."""
+    regressions = []
+
+    for name, result in results.items():
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            old, new = baseline.get(name, {}).get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            print(f"  {name:<24} {metric:<16} {old:>14,.2f} -> {new:>14,.2f} ({change:+.1%}){flag}")
+
+            if flag:
+                regressions.append(f"{name}.{metric}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layout", default=str(SAMPLE_LAYOUT), help="Layout CSV, defaults to a sample layout.")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--record-type-start", type=int, default=None,
+                        help="Defaults to 1 for the sample layout.")
+    parser.add_argument("--record-type-length", type=int, default=1)
+    parser.add_argument("--record-type-weights", default=None, help='e.g. "1=1,2=9"')
+    parser.add_argument("--record-length", type=int, default=None, help="Use undelimited fixed-length records.")
+    parser.add_argument("--file-format", default="ASCII", choices=["ASCII", "EBCDIC", "LATIN_1"])
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--garbage-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compile-runs", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark, the fastest is kept.")
+    parser.add_argument("--workers", type=int, default=None, help="Also benchmark ParallelParser.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc memory pass.")
+    parser.add_argument("--output", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Fractional change counted as a regression by --compare.")
+    args = parser.parse_args()
+
+    if args.record_type_start is None and Path(args.layout) == SAMPLE_LAYOUT:
+        args.record_type_start = 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_suite(args, directory)
+
+    for name, result in results.items():
+        print(f"{name:<24} " + "  ".join(f"{key}={value:,}" for key, value in result.items()))
+
+    report = {"meta": metadata(args), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare}:")
+        if baseline["meta"]["args"] != report["meta"]["args"]:
+            print("  Warning: the runs used different arguments, so results may not be comparable.")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
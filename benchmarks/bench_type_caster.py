@@ -0,0 +1,79 @@
+"""
+Compares TypeCaster throughput casting one value at a time through cast_data_types against casting whole
+records through the compiled per-field plans.
+
+    python -m benchmarks.bench_type_caster --rows 200000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+from data_utils.settings import Settings
+
+LAYOUT_CSV = """Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause
+,TXN-ACCOUNT-NUMBER,A,1,16,16,,X(16)
+,TXN-COUNT,N,17,21,5,,9(5)
+,TXN-AMOUNT,N,22,32,11,,S9(9)V9(2)
+,TXN-FEE,N,33,41,9,,S9(7)V9(2)
+,TXN-POST-DATE,D,42,49,8,,9(8)
+,TXN-EXP-DATE,D,50,55,6,,9(6)
+,TXN-TIME,T,56,61,6,,9(6)
+,TXN-DESCRIPTION,A,62,91,30,,X(30)
+"""
+
+RECORDS = [
+    ("4111111111111111", "00042", "00000012345", "-00001250", "20210328", "032023", "235000", "COFFEE SHOP"),
+    ("4111111111111112", "00001", "00000099999", "000000000", "20210329", "042024", "101500", "GROCERY"),
+    ("4111111111111113", "", "", "", "", "", "", ""),
+]
+
+
+def build_file_spec(directory: Path) -> FileSpec:
+    (directory / "layout.csv").write_text(LAYOUT_CSV)
+    config_file = directory / "bench.ini"
+    config_file.write_text(f"[file_config]\ndownload_path = {directory}/\nuse_s3 = false\n")
+    return FileSpec(Settings(str(config_file)), {"layout_name": "layout.csv"})
+
+
+def bench_cast_data_types(caster: TypeCaster, layout: list, rows: int) -> float:
+    cast = caster.cast_data_types
+    start = time.perf_counter()
+
+    for i in range(rows):
+        record = RECORDS[i % len(RECORDS)]
+        [cast(value, field[1], field[6], field[0]) for value, field in zip(record, layout)]
+
+    return rows / (time.perf_counter() - start)
+
+
+def bench_cast_record(caster: TypeCaster, rows: int) -> float:
+    cast_record = caster.cast_record
+    start = time.perf_counter()
+
+    for i in range(rows):
+        cast_record("000", RECORDS[i % len(RECORDS)])
+
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        spec = build_file_spec(Path(directory))
+
+    caster = TypeCaster(spec)
+    before = bench_cast_data_types(caster, spec.layout["000"], args.rows)
+    after = bench_cast_record(caster, args.rows)
+
+    print(f"cast_data_types per value: {before:,.0f} rows/sec")
+    print(f"cast_record compiled plan: {after:,.0f} rows/sec ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
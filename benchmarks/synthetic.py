@@ -0,0 +1,199 @@
+"""
+Generates synthetic fixed-width files from any layout CSV, for benchmarks and load testing. Records mix every record
+type in the layout, numbers are zoned (with leading signs and overpunch) or packed COMP-3 per their pic clause, and
+dates use every format TypeCaster._parse_date_field handles for the field's length. A share of values are blank
+(null_rate) or junk that will not cast (garbage_rate).
+
+    python -m benchmarks.synthetic benchmarks/layouts/sample.csv sample.dat --records 100000 --record-type-start 1
+"""
+import argparse
+import random
+import string
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.settings import Settings
+
+# Distinct values generated per field. Records sample from these pools, which keeps generation fast and gives
+# realistic repetition (dates, counts) for the caches being measured.
+POOL_SIZE = 2048
+
+TEXT_CHARACTERS = string.ascii_uppercase + string.digits + " "
+GARBAGE_CHARACTERS = "!@#$%^&*?XYZxyz"
+POSITIVE_OVERPUNCH = "{ABCDEFGHI"
+NEGATIVE_OVERPUNCH = "}JKLMNOPQR"
+
+
+def load_file_spec(layout_path: str, directory: str, **file_config) -> FileSpec:
+    """Builds a FileSpec for a local layout CSV, using directory as the download path."""
+    directory = Path(directory)
+    layout_name = Path(layout_path).name
+    if Path(layout_path).resolve() != (directory / layout_name).resolve():
+        (directory / layout_name).write_bytes(Path(layout_path).read_bytes())
+
+    config_file = directory / "synthetic.ini"
+    config_file.write_text(f"[file_config]\ndownload_path = {directory}/\nuse_s3 = false\n")
+    return FileSpec(Settings(str(config_file)), {"layout_name": layout_name, **file_config})
+
+
+def generate_file(file_spec: FileSpec, path: str, records: int, null_rate: float = 0.05, garbage_rate: float = 0.01,
+                  record_type_weights: Dict[str, float] = None, record_length: int = None, seed: int = 0) -> int:
+    """
+    Writes records newline delimited, or padded to record_length bytes with no delimiter. Record types are picked
+    by record_type_weights (uniform by default). Returns the number of bytes written.
+    """
+    rng = random.Random(seed)
+    record_types = list(record_type_weights or file_spec.layout)
+    weights = [record_type_weights[key] for key in record_types] if record_type_weights else None
+    pools = {key: [_field_pool(rng, file_spec, field, null_rate, garbage_rate) for field in file_spec.layout[key]]
+             for key in record_types}
+    pad = " ".encode(file_spec.encoding)
+    written = 0
+
+    with open(path, "wb") as f:
+        for record_type in rng.choices(record_types, weights, k=records):
+            record = b"".join([rng.choice(pool) for pool in pools[record_type]])
+            record = _set_record_type(file_spec, record, record_type)
+
+            if record_length:
+                record = record[:record_length].ljust(record_length, pad)
+            else:
+                record += b"\n"
+
+            f.write(record)
+            written += len(record)
+
+    return written
+
+
+def _set_record_type(file_spec: FileSpec, record: bytes, record_type: str) -> bytes:
+    if not file_spec.record_type_start:
+        return record
+
+    start = int(file_spec.record_type_start) - 1
+    length = int(file_spec.record_type_length)
+    key = record_type.encode(file_spec.encoding).ljust(length, " ".encode(file_spec.encoding))
+    return record[:start] + key + record[start + length:]
+
+
+def _field_pool(rng: random.Random, file_spec: FileSpec, field: tuple, null_rate: float,
+                garbage_rate: float) -> List[bytes]:
+    """POOL_SIZE encoded values for a layout field, with blanks and garbage mixed in at the given rates."""
+    name, data_type, _, _, length, _, pic_clause = field
+    packed = FileSpec.is_packed(pic_clause)
+    pool = []
+
+    for _ in range(POOL_SIZE):
+        roll = rng.random()
+        if roll < null_rate:
+            value = " " * length
+        elif roll < null_rate + garbage_rate:
+            if packed:
+                pool.append(b"\xff" * length)
+                continue
+            value = "".join(rng.choice(GARBAGE_CHARACTERS) for _ in range(length))
+        elif packed:
+            pool.append(_packed_value(rng, length, pic_clause))
+            continue
+        elif data_type == "N":
+            value = _zoned_value(rng, length, pic_clause)
+        elif data_type == "D":
+            value = _date_value(rng, length, pic_clause)
+        elif data_type == "T":
+            value = f"{rng.randrange(24):02d}{rng.randrange(60):02d}{rng.randrange(60):02d}"
+        else:
+            value = "".join(rng.choice(TEXT_CHARACTERS) for _ in range(rng.randint(1, length))).strip()
+
+        pool.append(value[:length].ljust(length).encode(file_spec.encoding))
+
+    return pool
+
+
+def _zoned_value(rng: random.Random, length: int, pic_clause: str) -> str:
+    """Zero-filled digits, with an explicit point for "." pic clauses. Signed pic clauses get a leading minus
+    sign or a trailing overpunch."""
+    signed = pic_clause[:1] in ("S", "-", "+")
+    explicit = "." in pic_clause
+    digits = max(length - explicit - (signed and explicit), 1)
+    text = str(rng.randrange(10 ** digits)).zfill(digits)
+
+    if explicit:
+        scale = min(FileSpec.pic_scale(pic_clause), digits)
+        text = f"{text[:digits - scale]}.{text[digits - scale:]}"
+
+    if not signed:
+        return text
+
+    negative = rng.random() < 0.3
+    if explicit:
+        return f"-{text}" if negative else f"+{text}"
+    elif rng.random() < 0.5:
+        return f"-{text[1:]}" if negative else text
+
+    punches = NEGATIVE_OVERPUNCH if negative else POSITIVE_OVERPUNCH
+    return text[:-1] + punches[int(text[-1])]
+
+
+def _packed_value(rng: random.Random, length: int, pic_clause: str) -> bytes:
+    """COMP-3: two digits per byte, with the sign in the last nibble (C positive, D negative)."""
+    digits = str(rng.randrange(10 ** (length * 2 - 1))).zfill(length * 2 - 1)
+    sign = "d" if pic_clause.startswith("S") and rng.random() < 0.3 else "c"
+    return bytes.fromhex(digits + sign)
+
+
+def _date_value(rng: random.Random, length: int, pic_clause: str) -> str:
+    """A date in one of the formats TypeCaster._parse_date_field recognizes by value length, among those that fit
+    the field."""
+    day = date(2015, 1, 1) + timedelta(days=rng.randrange(4000))
+    formats = {
+        8: [day.strftime("%Y%m%d"), day.strftime("%m%d%Y"), day.strftime("%m/%d/%y")],
+        7: [day.strftime("%Y%j")],
+        6: [day.strftime("%m%Y")],
+        5: [f"{day.month}{day.year}"] if day.month < 10 else [],
+        4: [f"{day.year % 10}{day.strftime('%j')}"],
+        3: [f"{day.month}{day.strftime('%y')}"] if pic_clause == "9(6)" and day.month < 10 else [],
+    }
+    # Usually the format matching the field length, sometimes a shorter one that still fits.
+    candidates = formats.get(length) or []
+    if not candidates or rng.random() < 0.2:
+        candidates = [value for size, values in formats.items() if size <= length for value in values] or candidates
+
+    return rng.choice(candidates) if candidates else day.strftime("%Y%m%d")[:length]
+
+
+def _parse_weights(text: Optional[str]) -> Optional[Dict[str, float]]:
+    if not text:
+        return None
+    pairs = (item.split("=", 1) for item in text.split(","))
+    return {key.strip(): float(weight) for key, weight in pairs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("layout", help="Layout CSV.")
+    parser.add_argument("output", help="Data file to write.")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--record-type-start", type=int, default=None)
+    parser.add_argument("--record-type-length", type=int, default=1)
+    parser.add_argument("--record-type-weights", default=None, help='e.g. "1=1,2=9"')
+    parser.add_argument("--record-length", type=int, default=None, help="Write undelimited fixed-length records.")
+    parser.add_argument("--file-format", default="ASCII", choices=["ASCII", "EBCDIC", "LATIN_1"])
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--garbage-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        spec = load_file_spec(args.layout, directory, record_type_start=args.record_type_start,
+                              record_type_length=args.record_type_length, file_format=args.file_format)
+
+    size = generate_file(spec, args.output, args.records, args.null_rate, args.garbage_rate,
+                         _parse_weights(args.record_type_weights), args.record_length, args.seed)
+    print(f"Wrote {args.records:,} records ({size / 1024 / 1024:.1f} MB) to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ from sendgrid.helpers.mail import (
 )
 from typing import List
 
-from data_utils.data_utils.settings import Settings
+from data_utils.settings import Settings
 
 logger = logging.getLogger(__name__)
 
@@ -1,9 +1,29 @@
+import fnmatch
+import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 
 logger = logging.getLogger(__name__)
 
 
+# Multipart part size and parallel part uploads for streamed uploads. Memory use is about part size x concurrency.
+DEFAULT_PART_SIZE = 64 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+# HTTP connections per client, and threads used by download_many/upload_many.
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+# Ranged downloads read each part's response stream in blocks of this size.
+READ_BLOCK_SIZE = 1024 * 1024
+
+
 class S3DownloadError(Exception):
     pass
 
@@ -12,9 +32,65 @@ class S3UploadError(Exception):
     pass
 
 
+class S3HeadError(Exception):
+    pass
+
+
+class S3TransferStats(NamedTuple):
+    bytes: int
+    seconds: float
+    parts: int
+    failed_attempts: int = 0
+    resumed_parts: int = 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class S3ObjectResult(NamedTuple):
+    key: str
+    path: str
+    bytes: int
+    seconds: float
+    error: Optional[Exception] = None
+
+
+# boto3 clients are thread-safe but slow to create, so connectors share one per connection pool size.
+_clients: Dict[int, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _shared_client(max_pool_connections: int) -> Any:
+    with _clients_lock:
+        client = _clients.get(max_pool_connections)
+        if client is None:
+            client = _clients[max_pool_connections] = boto3.client(
+                "s3", config=Config(max_pool_connections=max_pool_connections))
+        return client
+
+
 class S3Connector:
-    def __init__(self):
-        self.client = boto3.client("s3")
+    """
+    Wrapper of boto3.client("s3") with retries. part_size, max_concurrency and multipart_threshold tune the
+    transfer configuration used by upload_file and download_file; unset values keep the boto3 defaults (8MB
+    parts, 10 threads). A complete TransferConfig can be passed as transfer_config instead.
+
+    Connectors share one boto3 client per max_pool_connections, which also sizes the thread pool used by
+    download_many and upload_many.
+    """
+    def __init__(self, part_size: int = None, max_concurrency: int = None, multipart_threshold: int = None,
+                 transfer_config: TransferConfig = None, max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+        self.client = _shared_client(max_pool_connections)
+        self.max_pool_connections = max_pool_connections
+        self._executor = None
+
+        if transfer_config is None:
+            options = dict(multipart_chunksize=part_size, max_concurrency=max_concurrency,
+                           multipart_threshold=multipart_threshold)
+            transfer_config = TransferConfig(**{name: value for name, value in options.items() if value})
+
+        self.transfer_config = transfer_config
 
     def download_file(self, bucket: str, key: str, download_path: str, retry_count: int = 3) -> str:
         """Downloads existing file from S3."""
@@ -24,7 +100,7 @@ class S3Connector:
 
         while retries > 0:
             try:
-                self.client.download_file(bucket, key, download_path)
+                self.client.download_file(bucket, key, download_path, Config=self.transfer_config)
                 break
             except Exception as e:
                 retries -= 1
@@ -43,7 +119,7 @@ class S3Connector:
 
         while retries > 0:
             try:
-                self.client.upload_file(file_name, bucket, key)
+                self.client.upload_file(file_name, bucket, key, Config=self.transfer_config)
                 break
             except Exception as e:
                 retries -= 1
@@ -51,3 +127,246 @@ class S3Connector:
 
                 if retries == 0:
                     raise S3UploadError(e)
+
+    def head_object(self, bucket: str, key: str, retry_count: int = 3) -> dict:
+        """Fetches an object's metadata (ETag, ContentLength, etc.) without downloading it."""
+        retries = retry_count
+
+        while retries > 0:
+            try:
+                return self.client.head_object(Bucket=bucket, Key=key)
+            except Exception as e:
+                retries -= 1
+                logger.exception(f"Error fetching metadata for {key} from s3.")
+
+                if retries == 0:
+                    raise S3HeadError(e)
+
+    def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE,
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> None:
+        """
+        Streams a readable binary file object to S3, using a multipart upload once it exceeds part_size. At most
+        max_concurrency parts are read into memory and uploaded at once. There is no retry here, as a stream can't
+        be rewound; callers retry by reopening their source.
+        """
+        config = TransferConfig(multipart_threshold=part_size, multipart_chunksize=part_size,
+                                max_concurrency=max_concurrency)
+        # Non-seekable streams are buffered part by part, cap buffered parts to the parts being uploaded.
+        config.max_in_memory_upload_chunks = max_concurrency
+
+        try:
+            self.client.upload_fileobj(fileobj, bucket, key, Config=config)
+        except Exception as e:
+            logger.exception(f"Error streaming {key} to s3.")
+            raise S3UploadError(e)
+
+    def get_object(self, bucket: str, key: str) -> Dict[str, Any]:
+        """Opens an object for streaming. The response's "Body" is read incrementally and "ContentLength" is
+        its size."""
+        try:
+            return self.client.get_object(Bucket=bucket, Key=key)
+        except Exception as e:
+            logger.exception(f"Error opening {key} from s3.")
+            raise S3DownloadError(e)
+
+    def download_file_ranged(self, bucket: str, key: str, download_path: str, part_size: int = DEFAULT_PART_SIZE,
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY, retry_count: int = 3) -> S3TransferStats:
+        """
+        Downloads an object as parallel byte range requests written in place into download_path. Each part is
+        retried on its own, so a failure only re-fetches that part. Finished parts are recorded in a
+        "<download_path>.parts" file alongside the download, headed by the ETag, size and part_size they were cut
+        with; if the download fails and is run again for the same object version and part_size, finished parts are
+        skipped. The parts file is removed once the download completes.
+        """
+        head = self.head_object(bucket, key, retry_count)
+        size, etag = head["ContentLength"], head["ETag"]
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        progress_path = f"{download_path}.parts"
+        header = json.dumps({"etag": etag, "size": size, "part_size": part_size}, sort_keys=True)
+        done = self._resumable_parts(download_path, progress_path, header, size, len(ranges))
+        stats = {"failed_attempts": 0}
+        started = time.monotonic()
+
+        logger.info(f"Downloading {bucket}/{key} ({size} bytes) in {len(ranges)} parts to {download_path}.")
+
+        if not done:
+            with open(download_path, "wb") as f:
+                f.truncate(size)
+            with open(progress_path, "w") as f:
+                f.write(f"{header}\n")
+
+        lock = threading.Lock()
+
+        def download_part(index: int) -> None:
+            start, end = ranges[index]
+
+            for attempt in range(1, retry_count + 1):
+                try:
+                    self._download_range(bucket, key, etag, start, end, download_path)
+                    break
+                except Exception as e:
+                    with lock:
+                        stats["failed_attempts"] += 1
+                    logger.warning(f"Attempt {attempt} of {retry_count} for bytes {start}-{end} of {key} failed: {e}")
+                    if attempt == retry_count:
+                        raise
+
+            with lock, open(progress_path, "a") as progress:
+                progress.write(f"{index}\n")
+
+        pending = [index for index in range(len(ranges)) if index not in done]
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [executor.submit(download_part, index) for index in pending]
+            errors = [future.exception() for future in as_completed(futures) if future.exception()]
+
+        if errors:
+            raise S3DownloadError(f"{len(errors)} of {len(ranges)} parts of {key} failed, rerun to resume: "
+                                  f"{errors[0]}")
+
+        os.remove(progress_path)
+
+        downloaded = sum(ranges[index][1] - ranges[index][0] + 1 for index in pending)
+        result = S3TransferStats(downloaded, time.monotonic() - started, len(ranges), stats["failed_attempts"],
+                                 len(done))
+        logger.info(f"S3 download complete: {result.bytes} bytes in {result.seconds:.1f}s "
+                    f"({result.bytes_per_second / 1024 ** 2:.1f} MB/s), {result.failed_attempts} part retries, "
+                    f"{result.resumed_parts} parts resumed.")
+
+        return result
+
+    def _download_range(self, bucket: str, key: str, etag: str, start: int, end: int, download_path: str) -> None:
+        # IfMatch fails the request if the object changes mid-download instead of mixing two versions.
+        body = self.client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}", IfMatch=etag)["Body"]
+
+        with open(download_path, "r+b") as f:
+            f.seek(start)
+            written = 0
+            for block in iter(lambda: body.read(READ_BLOCK_SIZE), b""):
+                f.write(block)
+                written += len(block)
+
+        if written != end - start + 1:
+            raise IOError(f"Expected {end - start + 1} bytes for range {start}-{end}, got {written}.")
+
+    @staticmethod
+    def _resumable_parts(download_path: str, progress_path: str, header: str, size: int, parts: int) -> Set[int]:
+        """Indexes of parts finished by an earlier attempt at the same object version and part size, if any. Any
+        mismatch discards the progress, since the indexes would point at different byte ranges."""
+        try:
+            with open(progress_path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return set()
+
+        if not lines or lines[0] != header or not os.path.exists(download_path) or \
+                os.path.getsize(download_path) != size:
+            return set()
+
+        done = {int(line) for line in lines[1:] if line.strip().isdigit()}
+        if any(index >= parts for index in done):
+            logger.warning(f"Ignoring {progress_path}, it lists parts this download does not have.")
+            return set()
+
+        return done
+
+    def list_objects(self, bucket: str, prefix: str = "", pattern: str = None, modified_after: datetime = None,
+                     predicate: Callable[[Dict[str, Any]], bool] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yields object summaries (Key, Size, LastModified, ETag) under a prefix, one page of up to 1,000 keys at a
+        time. pattern is a glob matched against the key, e.g. "*.csv.gz". modified_after must be timezone aware.
+        """
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if pattern and not fnmatch.fnmatch(obj["Key"], pattern):
+                    continue
+                if modified_after and obj["LastModified"] <= modified_after:
+                    continue
+                if predicate and not predicate(obj):
+                    continue
+                yield obj
+
+    def download_many(self, bucket: str, keys: Iterable[str], download_dir: str, prefix: str = "",
+                      retry_count: int = 3) -> Iterator[S3ObjectResult]:
+        """
+        Downloads many objects concurrently, e.g. the keys from list_objects. Each key is written under
+        download_dir at its path relative to prefix. Yields a result per key in completion order; a key that
+        still fails after retry_count attempts is reported in its result's error instead of stopping the batch.
+        """
+        def download(key: str) -> Tuple[str, int]:
+            relative = key[len(prefix):] if prefix and key.startswith(prefix) else key
+            path = os.path.join(download_dir, relative.lstrip("/"))
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.download_file(bucket, key, path, retry_count)
+            return path, os.path.getsize(path)
+
+        keys = (obj["Key"] if isinstance(obj, dict) else obj for obj in keys)
+        yield from self._run_many(download, ((key, key) for key in keys))
+
+    def upload_many(self, file_paths: Iterable[str], bucket: str, prefix: str = "", base_dir: str = None,
+                    retry_count: int = 3) -> Iterator[S3ObjectResult]:
+        """
+        Uploads many local files concurrently. Keys are prefix plus the path relative to base_dir, or the file
+        name when base_dir is not set. Yields a result per file in completion order.
+        """
+        def upload(file_path: str) -> Tuple[str, int]:
+            self.upload_file(file_path, bucket, key_for(file_path), retry_count)
+            return file_path, os.path.getsize(file_path)
+
+        def key_for(file_path: str) -> str:
+            relative = os.path.relpath(file_path, base_dir) if base_dir else os.path.basename(file_path)
+            return prefix + relative.replace(os.sep, "/")
+
+        yield from self._run_many(upload, ((key_for(path), path) for path in file_paths))
+
+    def _run_many(self, transfer: Callable[[str], Tuple[str, int]],
+                  items: Iterable[Tuple[str, str]]) -> Iterator[S3ObjectResult]:
+        """Runs transfer(item) for (key, item) pairs on the connector's thread pool, keeping a bounded number in
+        flight so huge listings aren't queued up front, and yields results as they finish."""
+        executor = self._thread_pool()
+        max_in_flight = self.max_pool_connections * 2
+        in_flight = {}
+        items = iter(items)
+        exhausted = False
+
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                try:
+                    key, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[executor.submit(_timed, transfer, item)] = key
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = in_flight.pop(future)
+                path, size, seconds, error = future.result()
+                yield S3ObjectResult(key, path, size, seconds, error)
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_pool_connections,
+                                                thread_name_prefix="s3-connector")
+        return self._executor
+
+    def close(self) -> None:
+        """Shuts down the thread pool used by download_many and upload_many. The shared client stays open."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def _timed(transfer: Callable[[str], Tuple[str, int]],
+           item: str) -> Tuple[Optional[str], int, float, Optional[Exception]]:
+    started = time.monotonic()
+    try:
+        path, size = transfer(item)
+        return path, size, time.monotonic() - started, None
+    except Exception as e:
+        return None, 0, time.monotonic() - started, e
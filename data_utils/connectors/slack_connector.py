@@ -2,8 +2,6 @@ import logging
 from typing import Dict, Any, List
 
 from data_utils.settings import Settings
-from slack import WebClient
-from slack.errors import SlackApiError
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +10,16 @@ class SlackConnector:
     def __init__(self, settings: Settings):
         self.settings = settings
         self.environment = settings.get("DEFAULT", "environment")
-        self.client = WebClient(token=self.settings.get("slack", "api_token"))
+        self._client = None
+
+    @property
+    def client(self):
+        """Slack WebClient, created on the first message so scripts that never alert don't load slack."""
+        if self._client is None:
+            from slack import WebClient
+            self._client = WebClient(token=self.settings.get("slack", "api_token"))
+
+        return self._client
 
     def send_slack_alert(self, message: str, app_name: str = None, job_owner_id: str = None):
         if not self.settings.getboolean("slack", "enabled"):
@@ -40,6 +47,8 @@ class SlackConnector:
 
     def _slack_post_message(self, channel: str, attachments: List[Dict[str, Any]],
                             retry_count: int = 3):
+        from slack.errors import SlackApiError
+
         retries = retry_count
 
         while retries > 0:
@@ -1,5 +1,16 @@
+import atexit
+import gzip
+import hashlib
+import json
 import logging
 import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
 
 import snowflake.connector
 from data_utils.settings import Settings
@@ -7,10 +18,231 @@ from snowflake.connector.cursor import SnowflakeCursor, DictCursor
 
 logger = logging.getLogger(__name__)
 
+# Input bytes per chunk when splitting files for bulk loads, roughly 100-250MB once gzipped.
+DEFAULT_CHUNK_BYTES = 1024 * 1024 * 1024
+DEFAULT_PUT_PARALLEL = 8
+DEFAULT_PREFETCH_THREADS = 4
+DEFAULT_FETCH_BATCH_SIZE = 10000
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_IDLE_SECONDS = 600
+DEFAULT_POOL_HEALTH_CHECK_SECONDS = 60
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".zst", ".br", ".deflate", ".raw_deflate", ".parquet", ".orc", ".avro")
+
+
+class SnowflakeConnectionPoolTimeout(Exception):
+    pass
+
+
+class SnowflakeConnectionPool:
+    """
+    Thread-safe pool of authenticated Snowflake connections sharing one set of connection parameters. Up to
+    max_size connections are open at once; borrowers wait up to timeout seconds for one to be returned.
+    Connections idle longer than max_idle_seconds are closed, and connections idle longer than
+    health_check_seconds are checked with SELECT 1 before being handed out again. Returned connections have
+    their client-side settings reset to connect_args; borrowers should not leave ALTER SESSION changes behind.
+    """
+    def __init__(self, connect_args: Dict[str, Any], max_size: int = DEFAULT_POOL_SIZE,
+                 max_idle_seconds: float = DEFAULT_POOL_IDLE_SECONDS,
+                 health_check_seconds: float = DEFAULT_POOL_HEALTH_CHECK_SECONDS):
+        self.connect_args = connect_args
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_seconds = health_check_seconds
+        self.created_count = 0
+        self.reused_count = 0
+
+        self._idle = deque()  # (connection, returned at), most recently returned last
+        self._open = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float = None):
+        """Borrows a connection, opening a new one if none are idle and the pool is not full."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            with self._condition:
+                expired = self._evict_idle()
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._open < self.max_size:
+                    self._open += 1
+                    conn, returned_at = None, None
+                else:
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        _close_all(expired)
+                        raise SnowflakeConnectionPoolTimeout(
+                            f"No Snowflake connection available after {timeout} seconds.")
+                    self._condition.wait(remaining)
+                    _close_all(expired)
+                    continue
+
+            # Close, log in and health check outside the lock, so slow round trips don't block other borrowers.
+            _close_all(expired)
+
+            if conn is None:
+                return self._connect()
+
+            if time.monotonic() - returned_at < self.health_check_seconds or self._healthy(conn):
+                with self._condition:
+                    self.reused_count += 1
+                return conn
+
+            self._discard(conn)
+
+    def release(self, conn) -> None:
+        """Returns a borrowed connection. Closed connections are dropped instead of going back in the pool."""
+        if not conn.is_closed() and not self._reset(conn):
+            self._discard(conn)
+            return
+
+        with self._condition:
+            # The pool shrinks to zero once closed, so late returns are closed rather than kept.
+            if self._open <= self.max_size and not conn.is_closed():
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+                return
+
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Closes idle connections. Borrowed connections are closed when they are returned."""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._open -= len(idle)
+            self.max_size = 0
+            self._condition.notify_all()
+
+        for conn, _ in idle:
+            _close_quietly(conn)
+
+    def _connect(self):
+        try:
+            conn = snowflake.connector.connect(**self.connect_args)
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.created_count += 1
+        return conn
+
+    def _reset(self, conn) -> bool:
+        """Restores client-side settings a borrower may have changed, e.g. per-query prefetch threads."""
+        try:
+            conn.client_prefetch_threads = self.connect_args.get("client_prefetch_threads",
+                                                                 DEFAULT_PREFETCH_THREADS)
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding pooled Snowflake connection that could not be reset: {e}")
+            return False
+
+    def _healthy(self, conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1").fetchall()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy pooled Snowflake connection: {e}")
+            return False
+
+    def _discard(self, conn) -> None:
+        _close_quietly(conn)
+
+        with self._condition:
+            self._open -= 1
+            self._condition.notify()
+
+    def _evict_idle(self) -> list:
+        """Removes connections idle past max_idle_seconds and returns them to be closed once the lock is
+        released. Called with the lock held; the oldest are first."""
+        cutoff = time.monotonic() - self.max_idle_seconds
+        expired = []
+
+        while self._idle and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            self._open -= 1
+            expired.append(conn)
+
+        return expired
+
+
+# One pool per distinct set of connection parameters, shared by every SnowflakeConnector in the process.
+_pools: Dict[str, SnowflakeConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(settings: Settings, **pool_options) -> SnowflakeConnectionPool:
+    """Returns the process-wide pool for the connection parameters resolved from settings. Pool options default
+    to pool_size, pool_max_idle_seconds and pool_health_check_seconds under [snowflake]."""
+    connect_args = SnowflakeConnector.connect_args(settings)
+    key = hashlib.sha256(json.dumps(connect_args, sort_keys=True, default=str).encode()).hexdigest()
+
+    with _pools_lock:
+        pool = _pools.get(key)
+
+        if pool is None:
+            pool_options.setdefault("max_size", settings.getint(
+                "snowflake", "pool_size", fallback=DEFAULT_POOL_SIZE))
+            pool_options.setdefault("max_idle_seconds", settings.getfloat(
+                "snowflake", "pool_max_idle_seconds", fallback=DEFAULT_POOL_IDLE_SECONDS))
+            pool_options.setdefault("health_check_seconds", settings.getfloat(
+                "snowflake", "pool_health_check_seconds", fallback=DEFAULT_POOL_HEALTH_CHECK_SECONDS))
+            pool = _pools[key] = SnowflakeConnectionPool(connect_args, **pool_options)
+
+        return pool
+
+
+@atexit.register
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception as e:
+        logger.debug(f"Error closing Snowflake connection: {e}")
+
+
+def _close_all(conns: list) -> None:
+    for conn in conns:
+        _close_quietly(conn)
+
 
 class SnowflakeConnector:
-    def __init__(self, settings: Settings):
-        self.conn = snowflake.connector.connect(
+    """
+    Runs queries and loads against Snowflake. With pooled (or pool = true under [snowflake]) the connection is
+    borrowed from the process-wide pool for these settings and returned by close(), skipping the login
+    handshake when a connection is free. Use as a context manager so the connection is always closed or returned.
+    """
+    def __init__(self, settings: Settings, pooled: bool = None, timeout: float = None):
+        if pooled is None:
+            pooled = settings.getboolean("snowflake", "pool", fallback=False)
+
+        self._pool = get_pool(settings) if pooled else None
+        self.conn = self._pool.acquire(timeout) if pooled else \
+            snowflake.connector.connect(**self.connect_args(settings))
+
+    @staticmethod
+    def connect_args(settings: Settings) -> Dict[str, Any]:
+        return dict(
             user=settings.get("snowflake", "username"),
             password=settings.get("snowflake", "password"),
             account=settings.get("snowflake", "account"),
@@ -19,11 +251,34 @@ class SnowflakeConnector:
             database=settings.get("snowflake", "database"),
             role=settings.get("snowflake", "role"),
             schema=settings.get("snowflake", "schema"),
-            client_session_keep_alive=settings.getboolean("snowflake", "keep_alive", fallback=False)
+            client_session_keep_alive=settings.getboolean("snowflake", "keep_alive", fallback=False),
+            client_prefetch_threads=settings.getint("snowflake", "prefetch_threads",
+                                                    fallback=DEFAULT_PREFETCH_THREADS)
         )
 
+    @classmethod
+    @contextmanager
+    def borrow(cls, settings: Settings, timeout: float = None) -> Iterator["SnowflakeConnector"]:
+        """Borrows a pooled connector for the duration of a with block."""
+        with cls(settings, pooled=True, timeout=timeout) as connector:
+            yield connector
+
+    def close(self) -> None:
+        """Closes the connection, or returns it to the pool. Safe to call more than once."""
+        conn, self.conn = getattr(self, "conn", None), None
+        if conn is None:
+            return
+
+        if getattr(self, "_pool", None):
+            self._pool.release(conn)
+        else:
+            conn.close()
+
+    def __enter__(self) -> "SnowflakeConnector":
+        return self
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.close()
+        self.close()
 
     def query(self, querystring: str):
         logger.info(f"Executing query: {querystring}")
@@ -33,6 +288,64 @@ class SnowflakeConnector:
         logger.info(f"Executing query: {querystring}")
         return self.conn.cursor(DictCursor).execute(querystring)
 
+    def query_arrow_batches(self, querystring: str, batch_size: int = None,
+                            prefetch_threads: int = None) -> Iterator[Any]:
+        """
+        Streams query results as pyarrow RecordBatches instead of materializing every row. Result chunks are
+        downloaded ahead on prefetch_threads threads. With batch_size set, chunks are re-sliced so every batch
+        except the last has exactly batch_size rows, otherwise batches follow Snowflake's result chunks.
+        """
+        for table in self._arrow_tables(querystring, batch_size, prefetch_threads):
+            yield from table.combine_chunks().to_batches()
+
+    def query_pandas_batches(self, querystring: str, batch_size: int = None,
+                             prefetch_threads: int = None) -> Iterator[Any]:
+        """Streams query results as Pandas DataFrames, sized like query_arrow_batches."""
+        for table in self._arrow_tables(querystring, batch_size, prefetch_threads):
+            yield table.to_pandas()
+
+    def query_batches(self, querystring: str, batch_size: int = DEFAULT_FETCH_BATCH_SIZE,
+                      prefetch_threads: int = None, as_dict: bool = False) -> Iterator[List[Any]]:
+        """Streams query results as lists of at most batch_size tuples (or dicts with as_dict)."""
+        with self._prefetch_threads(prefetch_threads):
+            cursor = self.query_dict(querystring) if as_dict else self.query(querystring)
+
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+
+    def _arrow_tables(self, querystring: str, batch_size: int = None,
+                      prefetch_threads: int = None) -> Iterator[Any]:
+        with self._prefetch_threads(prefetch_threads):
+            cursor = self.query(querystring)
+
+            try:
+                tables = cursor.fetch_arrow_batches()
+                yield from _rebatch_tables(tables, batch_size) if batch_size else tables
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def _prefetch_threads(self, prefetch_threads: int = None) -> Iterator[None]:
+        """Uses prefetch_threads result download threads for one query. This is the connection's client-side
+        setting rather than an ALTER SESSION, and it is restored afterwards, so it never carries over to later
+        queries or to the next borrower of a pooled connection."""
+        if not prefetch_threads:
+            yield
+            return
+
+        previous = self.conn.client_prefetch_threads
+        self.conn.client_prefetch_threads = int(prefetch_threads)
+        try:
+            yield
+        finally:
+            self.conn.client_prefetch_threads = previous
+
     def stage_file(self, file_path: str, stage_name: str, table_name: str = None,
                    file_format: str = None, copy: bool = False) -> None:
         logger.info(f"Staging file {file_path} to stage {stage_name}")
@@ -51,6 +364,174 @@ class SnowflakeConnector:
                 logger.error(f"Error copying file: {e}.")
                 raise e
 
-    def copy_staged_file(self, stage_name: str, table_name: str) -> None:
-        pass
+    def copy_staged_file(self, stage_name: str, table_name: str, files: List[str] = None, file_format: str = None,
+                         pattern: str = None, on_error: str = None, purge: bool = False) -> List[Dict[str, Any]]:
+        """
+        COPY staged files into a table with a single statement. Limit to specific files (names relative to
+        stage_name) or a regex pattern. file_format is the clause value, e.g. "(FORMAT_NAME = 'my_csv')".
+        Returns the COPY output, one dict per file with its status, rows parsed/loaded, and first error.
+        """
+        statement = f"COPY INTO {table_name} FROM @{stage_name}"
+
+        if files:
+            file_list = ", ".join(f"'{os.path.basename(f)}'" for f in files)
+            statement += f" FILES = ({file_list})"
+        if pattern:
+            statement += f" PATTERN = '{pattern}'"
+        if file_format:
+            statement += f" FILE_FORMAT = {file_format}"
+        if on_error:
+            statement += f" ON_ERROR = {on_error}"
+        if purge:
+            statement += " PURGE = TRUE"
+
+        logger.info(f"Copying staged files: {statement}")
+
+        try:
+            results = self.conn.cursor(DictCursor).execute(statement).fetchall()
+        except Exception as e:
+            logger.error(f"Error copying files: {e}.")
+            raise e
+
+        for result in results:
+            if result.get("status") == "LOAD_FAILED":
+                logger.error(f"File {result.get('file')} failed to load: {result.get('first_error')}")
+            elif result.get("status") == "PARTIALLY_LOADED":
+                logger.warning(f"File {result.get('file')} partially loaded: {result.get('first_error')}")
+
+        loaded = sum(result.get("rows_loaded") or 0 for result in results)
+        logger.info(f"Loaded {loaded} rows from {len(results)} files into {table_name}.")
+
+        return results
+
+    def bulk_load(self, file_paths: Union[str, List[str]], stage_name: str, table_name: str, file_format: str,
+                  chunks: int = None, chunk_bytes: int = DEFAULT_CHUNK_BYTES, header_lines: int = 0,
+                  parallel: int = DEFAULT_PUT_PARALLEL, on_error: str = None,
+                  purge: bool = False) -> List[Dict[str, Any]]:
+        """
+        Loads one large delimited file, or a list of already chunked files (e.g. Parquet parts), with one parallel
+        PUT and one COPY INTO covering every staged file. A single file is first split on line boundaries into
+        gzip chunks of about chunk_bytes of input each, or into `chunks` equal chunks, repeating the first
+        header_lines lines in each chunk so SKIP_HEADER still applies. A list of files is linked into one
+        directory (one for compressed files, one for files PUT should gzip) so each directory is a single PUT.
+        Snowflake loads fastest from many 100-250MB compressed files. Returns the per-file COPY results.
+        """
+        # Stage under a unique prefix so the COPY only sees this load's files.
+        stage_path = f"{stage_name}/{table_name.lower()}_{uuid.uuid4().hex}"
+
+        with tempfile.TemporaryDirectory() as chunk_dir:
+            if isinstance(file_paths, str):
+                if chunks:
+                    chunk_bytes = max(os.path.getsize(file_paths) // chunks, 1)
+                files = split_file_gzip(file_paths, chunk_dir, chunk_bytes, header_lines)
+                # One PUT for every chunk lets Snowflake upload them on `parallel` threads.
+                sources = [(os.path.join(chunk_dir, "*.gz"), "FALSE")]
+            else:
+                files = list(file_paths)
+                sources = _link_for_put(files, chunk_dir)
+
+            logger.info(f"Staging {len(files)} files to {stage_path} with PARALLEL = {parallel}.")
+
+            for source, auto_compress in sources:
+                try:
+                    self.conn.cursor().execute(
+                        f"PUT 'file://{os.path.abspath(source)}' @{stage_path} PARALLEL = {parallel} "
+                        f"AUTO_COMPRESS = {auto_compress}")
+                except Exception as e:
+                    logger.error(f"Error staging files: {e}.")
+                    raise e
+
+        staged = [self._staged_name(f) for f in files]
+        return self.copy_staged_file(stage_path, table_name, files=staged, file_format=file_format,
+                                     on_error=on_error, purge=purge)
+
+    @staticmethod
+    def _staged_name(file_path: str) -> str:
+        # Files that aren't already compressed are gzipped by PUT, which adds a .gz extension.
+        name = os.path.basename(file_path)
+        return name if name.endswith(COMPRESSED_EXTENSIONS) else f"{name}.gz"
+
+
+def _link_for_put(files: List[str], directory: str) -> List[Tuple[str, str]]:
+    """Hard links (or symlinks, across filesystems) files into directory/compressed and directory/raw and returns
+    (glob, AUTO_COMPRESS) per non-empty directory, so a list of files is staged with one PUT per directory instead
+    of one each."""
+    names = [os.path.basename(f) for f in files]
+    if len(set(names)) != len(names):
+        raise ValueError("Files for a bulk load must have distinct names, since they are staged by name.")
+
+    sources = []
+    for group in ("compressed", "raw"):
+        group_files = [f for f in files if f.endswith(COMPRESSED_EXTENSIONS) == (group == "compressed")]
+        if not group_files:
+            continue
+
+        group_dir = os.path.join(directory, group)
+        os.makedirs(group_dir)
+        for f in group_files:
+            target = os.path.join(group_dir, os.path.basename(f))
+            try:
+                os.link(os.path.abspath(f), target)
+            except OSError:
+                os.symlink(os.path.abspath(f), target)
+        sources.append((os.path.join(group_dir, "*"), "FALSE" if group == "compressed" else "TRUE"))
+
+    return sources
+
+
+def _rebatch_tables(tables: Iterable[Any], batch_size: int) -> Iterator[Any]:
+    """Re-slices a stream of pyarrow Tables into Tables of exactly batch_size rows, plus a final partial one.
+    Slicing is zero-copy, so at most one result chunk plus one batch is held in memory."""
+    import pyarrow as pa
+
+    pending = []
+    pending_rows = 0
+
+    for table in tables:
+        if table.num_rows == 0:
+            continue
+
+        pending.append(table)
+        pending_rows += table.num_rows
+
+        while pending_rows >= batch_size:
+            combined = pa.concat_tables(pending) if len(pending) > 1 else pending[0]
+            yield combined.slice(0, batch_size)
+            rest = combined.slice(batch_size)
+            pending = [rest] if rest.num_rows else []
+            pending_rows = rest.num_rows
+
+    if pending_rows:
+        yield pa.concat_tables(pending) if len(pending) > 1 else pending[0]
+
+
+def split_file_gzip(file_path: str, output_dir: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+                    header_lines: int = 0, compresslevel: int = 1) -> List[str]:
+    """
+    Splits a delimited text file on line boundaries into gzip files of about chunk_bytes of input each,
+    repeating the first header_lines lines at the top of every chunk. Returns the chunk paths in order. A low
+    compression level keeps splitting fast, upload bandwidth is rarely the bottleneck at these sizes.
+    """
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    paths = []
+
+    with open(file_path, "rb") as f:
+        header = b"".join(f.readline() for _ in range(header_lines))
+        line = f.readline()
+
+        while line:
+            path = os.path.join(output_dir, f"{base}_{len(paths):05d}.gz")
+            written = 0
+
+            with gzip.open(path, "wb", compresslevel=compresslevel) as out:
+                out.write(header)
+                while line and written < chunk_bytes:
+                    out.write(line)
+                    written += len(line)
+                    line = f.readline()
+
+            paths.append(path)
+
+    logger.info(f"Split {file_path} into {len(paths)} gzip chunks.")
+    return paths
 
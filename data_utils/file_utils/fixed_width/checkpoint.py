@@ -0,0 +1,268 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader, Record
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PART_RECORDS = 500_000
+
+# Bytes hashed from each end of a source file to tell a rerun on the same file from one on a different file.
+FINGERPRINT_BYTES = 1024 * 1024
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class CommittedPart(NamedTuple):
+    """An output part that has been committed, covering source bytes [start, end)."""
+    name: str
+    start: int
+    end: int
+    records: int
+
+
+def source_fingerprint(file_path: Union[str, os.PathLike]) -> str:
+    """Size plus a hash of the first and last MB of a file. Cheap on huge files, and unchanged when the same file
+    is transferred again."""
+    size = os.path.getsize(file_path)
+    sha = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        sha.update(f.read(FINGERPRINT_BYTES))
+        if size > FINGERPRINT_BYTES:
+            f.seek(max(size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            sha.update(f.read())
+
+    return f"{size}:{sha.hexdigest()[:32]}"
+
+
+def part_name(prefix: str, start: int, end: int) -> str:
+    """Part names come from the source byte range they cover, so writing or loading the same records again reuses
+    the same name, e.g. replacing the file or letting Snowflake's load history skip it, instead of duplicating it."""
+    return f"{prefix}-{start:015d}-{end:015d}"
+
+
+class Checkpoint:
+    """
+    Durable progress of a file being parsed and loaded: the source fingerprint and every committed part. Kept as
+    JSON in a local file (replaced atomically) or an S3 object when location is "s3://bucket/key". offset is the
+    end of the contiguous run of committed parts from the start of the file, i.e. the record boundary to resume
+    from. ranges holds the planned part byte ranges when parts are cut up front (ParallelParser.write_parts).
+    """
+    def __init__(self, location: str, s3_connector=None):
+        self.location = location
+        self._s3_conn = s3_connector
+        self.source: Optional[str] = None
+        self.parts: List[CommittedPart] = []
+        self.ranges: Optional[List[Tuple[int, int]]] = None
+        self.updated: Optional[float] = None
+
+    @property
+    def s3_conn(self):
+        if self._s3_conn is None:
+            from data_utils.connectors.s3_connector import S3Connector
+            self._s3_conn = S3Connector()
+
+        return self._s3_conn
+
+    @property
+    def offset(self) -> int:
+        offset = 0
+        for part in sorted(self.parts, key=lambda part: part.start):
+            if part.start > offset:
+                break
+            offset = max(offset, part.end)
+        return offset
+
+    @property
+    def record_count(self) -> int:
+        return sum(part.records for part in self.parts)
+
+    def is_committed(self, start: int, end: int) -> bool:
+        return any(part.start == start and part.end == end for part in self.parts)
+
+    def load(self) -> "Checkpoint":
+        """Reads the stored checkpoint, if there is one."""
+        data = self._read()
+        if data is not None:
+            self.source = data.get("source")
+            self.parts = [CommittedPart(**part) for part in data.get("parts", [])]
+            ranges = data.get("ranges")
+            self.ranges = [tuple(byte_range) for byte_range in ranges] if ranges is not None else None
+            self.updated = data.get("updated")
+        return self
+
+    def start(self, source: str) -> None:
+        """Ties the checkpoint to a source fingerprint. Raises CheckpointError if it already belongs to a
+        different file, since its offsets would point into the wrong data; reset() to start over."""
+        if self.source is not None and self.source != source:
+            raise CheckpointError(f"Checkpoint {self.location} is for a different source file ({self.source}, "
+                                  f"now {source}). Reset it to start from the beginning.")
+        if self.source is None:
+            self.source = source
+            self.save()
+
+    def plan(self, ranges: List[Tuple[int, int]]) -> None:
+        """Ties the checkpoint to the part byte ranges a run will write. Raises CheckpointError if parts were
+        committed for different ranges, since resuming would write overlapping parts and load records twice;
+        reset() (and remove the old parts) to start over."""
+        ranges = [tuple(byte_range) for byte_range in ranges]
+        if self.ranges == ranges:
+            return
+
+        if self.parts:
+            raise CheckpointError(f"Checkpoint {self.location} has {len(self.parts)} parts committed for "
+                                  f"{len(self.ranges or [])} different part ranges (now {len(ranges)}). Rerun with "
+                                  f"the same shard settings, or reset it and remove its parts to start over.")
+        self.ranges = ranges
+        self.save()
+
+    def commit(self, part: CommittedPart) -> None:
+        """Records a committed part and saves. Call only after the part's output is durable."""
+        self.parts = [existing for existing in self.parts if existing.name != part.name] + [part]
+        self.save()
+
+    def reset(self) -> None:
+        self.source = None
+        self.parts = []
+        self.ranges = None
+        self.save()
+
+    def save(self) -> None:
+        self.updated = time.time()
+        data = json.dumps({"source": self.source, "parts": [part._asdict() for part in self.parts],
+                           "ranges": self.ranges, "updated": self.updated})
+
+        if self.location.startswith("s3://"):
+            bucket, key = self._s3_location()
+            self.s3_conn.upload_fileobj(io.BytesIO(data.encode()), bucket, key)
+            return
+
+        directory = os.path.dirname(os.path.abspath(self.location))
+        os.makedirs(directory, exist_ok=True)
+        # Written beside the checkpoint and renamed over it, so a crash never leaves a partial checkpoint.
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.location)
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if self.location.startswith("s3://"):
+            bucket, key = self._s3_location()
+            client = self.s3_conn.client
+            try:
+                body = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except client.exceptions.NoSuchKey:
+                return None
+            return json.loads(body)
+
+        if not os.path.exists(self.location):
+            return None
+
+        with open(self.location) as f:
+            return json.load(f)
+
+    def _s3_location(self) -> Tuple[str, str]:
+        bucket, _, key = self.location[len("s3://"):].partition("/")
+        return bucket, key
+
+
+class CheckpointedParser:
+    """
+    Parses a fixed-width file in parts of part_records records, handing each part to a commit callback (write a
+    file, upload it, COPY it into Snowflake) and recording it in a Checkpoint once the callback returns. A rerun
+    after a failure seeks straight to the last committed record boundary instead of starting from byte zero, and
+    a rerun of a finished file commits nothing.
+
+    Parts are committed at least once: if the process dies after the callback but before the checkpoint is
+    saved, the part is produced again with the same name (see part_name), so commits should overwrite or skip
+    existing parts by name.
+    """
+    def __init__(self, file_spec: FileSpec, checkpoint: Union[str, Checkpoint],
+                 part_records: int = DEFAULT_PART_RECORDS, record_length: int = None, cast: bool = True):
+        self.spec = file_spec
+        self.checkpoint = Checkpoint(checkpoint) if isinstance(checkpoint, str) else checkpoint
+        self.part_records = part_records
+        self.record_length = record_length
+        self.caster = TypeCaster(file_spec) if cast else None
+
+    def run(self, file_path: Union[str, os.PathLike],
+            commit: Callable[[str, List[Tuple[str, Record]]], None], prefix: str = "part") -> List[CommittedPart]:
+        """Parses the rest of the file, calling commit(part name, [(record_type, record), ...]) per part. Returns
+        every committed part, including those committed by earlier runs."""
+        checkpoint = self.checkpoint.load()
+        checkpoint.start(source_fingerprint(file_path))
+        if checkpoint.ranges is not None:
+            raise CheckpointError(f"Checkpoint {checkpoint.location} was written with fixed part ranges by "
+                                  f"ParallelParser.write_parts. Resume it there, or reset it to start over.")
+        start = checkpoint.offset
+
+        if start:
+            logger.info(f"Resuming {file_path} from byte {start}, {checkpoint.record_count} records already "
+                        f"committed in {len(checkpoint.parts)} parts.")
+
+        reader = FixedWidthReader(self.spec, record_length=self.record_length)
+        records = []
+        part_start = start
+
+        for record_type, record in reader.records(file_path, start=start):
+            if self.caster:
+                record = self.caster.cast_record(record_type, record)
+            records.append((record_type, record))
+
+            if len(records) >= self.part_records:
+                self._commit(commit, prefix, part_start, reader.offset, records)
+                part_start = reader.offset
+                records = []
+
+        if records:
+            self._commit(commit, prefix, part_start, reader.offset, records)
+
+        logger.info(f"Committed {checkpoint.record_count} records from {file_path} in {len(checkpoint.parts)} parts.")
+        return sorted(checkpoint.parts, key=lambda part: part.start)
+
+    def write_parts(self, file_path: Union[str, os.PathLike], output_dir: Union[str, os.PathLike],
+                    prefix: str = "part") -> List[CommittedPart]:
+        """Writes the file as JSON lines part files in output_dir, like ParallelParser.write_parts, resuming
+        from the checkpoint. Each part is written to a temporary file and renamed into place when complete."""
+        os.makedirs(output_dir, exist_ok=True)
+
+        def commit(name: str, records: List[Tuple[str, Record]]) -> None:
+            write_part(os.path.join(output_dir, f"{name}.jsonl"), records)
+
+        return self.run(file_path, commit, prefix)
+
+    def _commit(self, commit: Callable, prefix: str, start: int, end: int,
+                records: List[Tuple[str, Record]]) -> None:
+        name = part_name(prefix, start, end)
+        commit(name, records)
+        self.checkpoint.commit(CommittedPart(name, start, end, len(records)))
+        logger.debug(f"Committed {name}: {len(records)} records.")
+
+
+def write_part(part_path: str, records: Iterable[Tuple[str, Record]]) -> int:
+    """Writes records as JSON lines to a temporary file renamed to part_path once complete, so part_path only
+    ever holds a whole part. Returns the record count."""
+    count = 0
+    temp_path = f"{part_path}.tmp"
+
+    with open(temp_path, "w") as f:
+        for record_type, record in records:
+            f.write(json.dumps({"record_type": record_type, "record": record}, default=str))
+            f.write("\n")
+            count += 1
+
+    os.replace(temp_path, part_path)
+    return count
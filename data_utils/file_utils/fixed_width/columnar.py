@@ -0,0 +1,538 @@
+import logging
+import mmap
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from data_utils.file_utils.fixed_width.comp3 import unpack_comp3_matrix
+from data_utils.file_utils.fixed_width.file_spec import EBCDIC_TO_LATIN_1 as EBCDIC_TABLE, FileFormatEnum, FileSpec
+from data_utils.file_utils.fixed_width.occurs import OCCURRENCE, OccursGroup, occurs_groups
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import OVERPUNCH, TypeCaster
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 64 * 1024 * 1024
+
+SPACE, PLUS, MINUS, DOT, ZERO, NINE, OPEN_BRACE = (ord(c) for c in " +-.09{")
+EBCDIC_SPACE = 0x40
+
+# EBCDIC (cp037) is a byte-for-byte permutation of latin-1, so a 256 entry lookup table translates whole matrices.
+EBCDIC_TO_LATIN_1 = np.frombuffer(EBCDIC_TABLE, dtype=np.uint8)
+
+# Digit of each overpunch character by byte value (-1 for other bytes), and whether it makes the number negative.
+OVERPUNCH_DIGITS = np.full(256, -1, dtype=np.int64)
+OVERPUNCH_NEGATIVE = np.zeros(256, dtype=bool)
+for _char, (_digit, _sign) in OVERPUNCH.items():
+    OVERPUNCH_DIGITS[ord(_char)] = int(_digit)
+    OVERPUNCH_NEGATIVE[ord(_char)] = _sign == "-"
+
+# int64 holds any 18 digit number, wider zoned fields fall back to the scalar caster.
+MAX_INT64_DIGITS = 18
+
+
+class ColumnarDecoder:
+    """
+    Decodes fixed-width files a column at a time instead of a field at a time. The file is memory-mapped,
+    each record type's rows are viewed as a fixed-stride byte matrix, and every field is decoded for all rows
+    in a handful of NumPy operations. Nulls follow TypeCaster: blank values become null. Values TypeCaster
+    would leave as uncast strings also become null, since a typed column cannot hold them.
+
+    Packed (COMP-3) fields are unpacked with their pic clause scale. Numeric, date and time columns are
+    returned as numpy masked arrays (mask = null), text columns as object arrays with None for nulls, or
+    everything as pyarrow RecordBatches with output="arrow".
+
+    Repeating groups (sequence_fields) are decoded through a strided view over the repeating block, so every
+    occurrence of a field is decoded in one pass. They come out as NAME-1..NAME-n wide columns, or with
+    occurs="rows" as separate child batches keyed "<record type>/<group name>", one row per non-empty occurrence.
+    """
+    def __init__(self, file_spec: FileSpec, record_length: int = None, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.spec = file_spec
+        self.caster = TypeCaster(file_spec)
+        # Set for files that have no record delimiter, e.g. EBCDIC files transferred in binary mode.
+        self.record_length = record_length
+        self.window_size = window_size
+        self.pad = ord(" ".encode(file_spec.encoding))
+        self.field_names = {key: FixedWidthReader._unique_field_names(fields)
+                            for key, fields in file_spec.layout.items()}
+        self.widths = {key: max(field[2] - 1 + field[4] for field in fields)
+                       for key, fields in file_spec.layout.items() if fields}
+        self.decoders = {key: [self._field_decoder(field) for field in fields]
+                         for key, fields in file_spec.layout.items()}
+        self.occurs = occurs_groups(file_spec)
+        self.steps = {key: self._decode_steps(key) for key in file_spec.layout}
+
+    def iter_batches(self, file_path: Union[str, os.PathLike], output: str = "numpy", occurs: str = "wide",
+                     parent_fields: Sequence[str] = ()) -> Iterator[Tuple[str, Any]]:
+        """Yields (record_type, batch) for each record type in each window of the file. Batches are a dict of
+        field name to array, or a pyarrow.RecordBatch when output="arrow". With occurs="rows", repeating groups
+        are left out of record batches and each is followed by its child batches (see decode_children), which
+        repeat the record's parent_fields."""
+        if output not in ("numpy", "arrow"):
+            raise ValueError(f"Unsupported output {output!r}, expected 'numpy' or 'arrow'.")
+        if occurs not in ("wide", "rows"):
+            raise ValueError(f"Unsupported occurs {occurs!r}, expected 'wide' or 'rows'.")
+
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                buf = np.frombuffer(mm, dtype=np.uint8)
+
+                try:
+                    for starts, lengths in self._iter_windows(buf):
+                        for record_type, rows in self._split_record_types(buf, starts).items():
+                            matrix = self._record_matrix(buf, starts[rows], lengths[rows], self.widths[record_type])
+                            columns = self.decode_matrix(record_type, matrix, occurs=occurs)
+                            batches = [(record_type, columns)]
+
+                            if occurs == "rows":
+                                batches += self.decode_children(record_type, matrix, columns, parent_fields).items()
+
+                            for key, batch in batches:
+                                if output == "arrow":
+                                    yield key, self._to_record_batch(key, batch)
+                                else:
+                                    yield key, batch
+                finally:
+                    # Release the numpy view so the mmap can close.
+                    del buf
+
+    def read_arrow(self, file_path: Union[str, os.PathLike], occurs: str = "wide",
+                   parent_fields: Sequence[str] = ()) -> Dict[str, Any]:
+        """Decodes a whole file into one pyarrow.Table per record type (and per repeating group with
+        occurs="rows")."""
+        import pyarrow as pa
+
+        batches = defaultdict(list)
+        for record_type, batch in self.iter_batches(file_path, output="arrow", occurs=occurs,
+                                                    parent_fields=parent_fields):
+            batches[record_type].append(batch)
+
+        return {record_type: pa.Table.from_batches(record_batches) for record_type, record_batches in batches.items()}
+
+    def decode_matrix(self, record_type: str, matrix: np.ndarray, occurs: str = "wide") -> Dict[str, Any]:
+        """Decodes every field of a (rows, record width) uint8 matrix of records of a single record type.
+        occurs="rows" leaves out the fields of repeating groups."""
+        text = self._text(matrix)
+        rows = len(matrix)
+        columns = {}
+
+        for names, group, field, decoder in self.steps[record_type]:
+            if group is not None and occurs == "rows":
+                continue
+
+            # Packed fields are binary, so they are never translated.
+            source = matrix if FileSpec.is_packed(field[6]) else text
+
+            if group is None or group.stride is None:
+                start = field[2] - 1
+                columns[names[0]] = decoder(source[:, start:start + field[4]], field[0])
+            else:
+                values = decoder(occurrence_matrix(source, field[2] - 1, field[4], group.stride, group.count),
+                                 field[0])
+                # One contiguous row per occurrence, so each column is a cheap view.
+                values = values.reshape(rows, group.count).T.copy()
+                for i, name in enumerate(names):
+                    columns[name] = values[i]
+
+        return columns
+
+    def decode_children(self, record_type: str, matrix: np.ndarray, parent_columns: Dict[str, Any] = None,
+                        parent_fields: Sequence[str] = ()) -> Dict[str, Dict[str, Any]]:
+        """
+        Normalizes each repeating group of a record matrix into child columns keyed "<record type>/<group name>":
+        OCCURRENCE (1-based), each field of the group under its copybook name, and parent_fields copied from the
+        decoded parent_columns. Occurrences where every field is blank are dropped before they are decoded.
+        """
+        text = self._text(matrix)
+        children = {}
+
+        for group in self.occurs.get(record_type, []):
+            fields = self.spec.layout[record_type]
+            packed = [FileSpec.is_packed(fields[field.indexes[0]][6]) for field in group.fields]
+            occurrences = [self._occurrences(matrix if is_packed else text, field, group, fields)
+                           for field, is_packed in zip(group.fields, packed)]
+            keep = ~np.logical_and.reduce([_blank_rows(values, is_packed)
+                                           for values, is_packed in zip(occurrences, packed)])
+
+            parent_rows = np.repeat(np.arange(len(matrix)), group.count)[keep]
+            columns = {name: parent_columns[name][parent_rows] for name in parent_fields}
+            occurrence = np.tile(np.arange(1, group.count + 1), len(matrix))[keep]
+            columns[OCCURRENCE] = np.ma.MaskedArray(occurrence, mask=np.zeros(len(occurrence), dtype=bool))
+
+            for field, values in zip(group.fields, occurrences):
+                columns[field.name] = self.decoders[record_type][field.indexes[0]](values[keep], field.name)
+
+            children[f"{record_type}/{group.name}"] = columns
+
+        return children
+
+    def _text(self, matrix: np.ndarray) -> np.ndarray:
+        return EBCDIC_TO_LATIN_1[matrix] if self.spec.file_format == FileFormatEnum.EBCDIC else matrix
+
+    @staticmethod
+    def _occurrences(source: np.ndarray, field, group: OccursGroup, fields: List[tuple]) -> np.ndarray:
+        """(rows * count, width) matrix of every occurrence of a field, row by row."""
+        if group.stride is not None:
+            return occurrence_matrix(source, field.offset, field.width, group.stride, group.count)
+
+        starts = [fields[i][2] - 1 for i in field.indexes]
+        stacked = np.stack([source[:, start:start + field.width] for start in starts], axis=1)
+        return stacked.reshape(len(source) * len(starts), field.width)
+
+    def _decode_steps(self, record_type: str) -> List[Tuple[List[str], Optional[OccursGroup], tuple, Callable]]:
+        """(names, repeating group or None, field, decoder) per decode step. All evenly spaced occurrences of a
+        repeating group field are one step."""
+        names = self.field_names[record_type]
+        fields = self.spec.layout[record_type]
+        occurrences = {}
+        skip = set()
+
+        for group in self.occurs.get(record_type, []):
+            for field in group.fields:
+                if group.stride is None:
+                    occurrences.update({i: ([names[i]], group) for i in field.indexes})
+                else:
+                    occurrences[field.indexes[0]] = ([names[i] for i in field.indexes], group)
+                    skip.update(field.indexes[1:])
+
+        return [(*occurrences.get(i, ([names[i]], None)), field, decoder)
+                for i, (field, decoder) in enumerate(zip(fields, self.decoders[record_type])) if i not in skip]
+
+    def _iter_windows(self, buf: np.ndarray) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Splits the file into windows of whole records, yielding record start offsets and lengths."""
+        size = len(buf)
+        position = 0
+        window_size = self.window_size
+
+        while position < size:
+            end = min(position + window_size, size)
+
+            if self.record_length:
+                if end < size:
+                    end = max(end - (end - position) % self.record_length, position + self.record_length)
+                starts = np.arange(position, end, self.record_length, dtype=np.int64)
+                lengths = np.minimum(self.record_length, end - starts)
+            else:
+                newlines = np.flatnonzero(buf[position:end] == 10) + position
+                if end < size:
+                    if len(newlines) == 0:
+                        # A single record larger than the window, grow this window until it fits.
+                        window_size *= 2
+                        continue
+                    end = int(newlines[-1]) + 1
+                else:
+                    newlines = np.append(newlines, size) if newlines[-1:].tolist() != [size - 1] else newlines
+
+                starts = np.concatenate(([position], newlines[:-1] + 1)).astype(np.int64)
+                lengths = newlines - starts
+                # Drop carriage returns and blank lines.
+                has_cr = (lengths > 0) & (buf[np.maximum(starts + lengths - 1, 0)] == 13)
+                lengths = lengths - has_cr
+                keep = lengths > 0
+                starts, lengths = starts[keep], lengths[keep]
+
+            position = end
+            window_size = self.window_size
+            yield starts, lengths
+
+    def _split_record_types(self, buf: np.ndarray, starts: np.ndarray) -> Dict[str, np.ndarray]:
+        """Returns the row indexes of each record type within a window."""
+        if not self.spec.record_type_start:
+            if len(self.spec.layout) > 1:
+                raise ValueError("Layout has multiple record types, so file_config must set record_type_start.")
+            return {record_type: np.arange(len(starts)) for record_type in self.spec.layout}
+
+        offset = int(self.spec.record_type_start) - 1
+        length = int(self.spec.record_type_length)
+        type_matrix = buf[np.minimum(starts[:, None] + offset + np.arange(length), len(buf) - 1)]
+        rows = {}
+
+        for record_type in self.spec.layout:
+            key = np.frombuffer(record_type.encode(self.spec.encoding).ljust(length, bytes([self.pad])),
+                                dtype=np.uint8)
+            matches = np.flatnonzero((type_matrix == key).all(axis=1))
+            if len(matches):
+                rows[record_type] = matches
+
+        return rows
+
+    def _record_matrix(self, buf: np.ndarray, starts: np.ndarray, lengths: np.ndarray, width: int) -> np.ndarray:
+        """Gathers records into a (rows, width) matrix, padding short records with blanks."""
+        positions = np.arange(width)
+        matrix = buf[np.minimum(starts[:, None] + positions, len(buf) - 1)]
+        short = lengths < width
+
+        if short.any():
+            matrix[short] = np.where(positions < lengths[short, None], matrix[short], self.pad)
+
+        return matrix
+
+    def _to_record_batch(self, record_type: str, columns: Dict[str, Any]):
+        import pyarrow as pa
+
+        arrays = []
+        for name, column in columns.items():
+            if isinstance(column, np.ma.MaskedArray):
+                data = column.data
+                if data.dtype.kind == "m":
+                    arrays.append(pa.array(data.astype("int64").astype("int32"), type=pa.time32("s"),
+                                           mask=np.ma.getmaskarray(column)))
+                else:
+                    arrays.append(pa.array(data, mask=np.ma.getmaskarray(column)))
+            else:
+                arrays.append(pa.array(column.tolist(), type=pa.string()))
+
+        return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+    def _field_decoder(self, field: tuple) -> Callable[[np.ndarray, str], Any]:
+        """Chooses the column decoder for a layout field, mirroring the branches of TypeCaster.cast_data_types."""
+        data_type, pic_clause = field[1], field[6]
+
+        if FileSpec.is_packed(pic_clause):
+            scale = FileSpec.pic_scale(pic_clause)
+            return lambda column, name: decode_packed(column, name, scale)
+        elif data_type == "N" and "." not in pic_clause and "V" not in pic_clause:
+            return decode_zoned_int
+        elif data_type == "N":
+            integer_digits = TypeCaster._decimal_integer_digits(pic_clause)
+            return lambda column, name: decode_zoned_decimal(column, name, integer_digits)
+        elif data_type == "D":
+            return lambda column, name: self._decode_dates(column, name, pic_clause)
+        elif data_type == "T":
+            return decode_time
+        else:
+            return decode_text
+
+    def _decode_dates(self, column: np.ndarray, name: str, pic_clause: str) -> np.ma.MaskedArray:
+        """Dates have very few distinct values, so each distinct value goes through the scalar caster once."""
+        unique, inverse = _unique_values(column)
+        dates = np.full(len(unique), np.datetime64("NaT"), dtype="datetime64[D]")
+
+        for i, value in enumerate(unique):
+            parsed = self.caster._parse_date_field(value, name, pic_clause) if value else None
+            try:
+                dates[i] = np.datetime64(parsed, "D")
+            except (TypeError, ValueError):
+                pass
+
+        dates = dates[inverse]
+        return _null_errors(np.ma.MaskedArray(dates, mask=np.isnat(dates)), column, name)
+
+
+def decode_packed(column: np.ndarray, name: str, scale: int) -> np.ma.MaskedArray:
+    """Unpacks COMP-3 fields with the pic clause scale applied."""
+    return _null_errors(unpack_comp3_matrix(column, scale), column, name)
+
+
+def decode_text(column: np.ndarray, name: str) -> np.ndarray:
+    """Decodes and strips text, replacing null characters and casting empty strings to None."""
+    # Widening latin-1 bytes to UCS-4 code points decodes every value at once.
+    text = np.ascontiguousarray(column, dtype=np.uint32).view(f"U{column.shape[1]}").ravel()
+    if (column == 0).any():
+        text = np.char.replace(text, "\u0000", "")
+    text = np.char.strip(text)
+    decoded = text.astype(object)
+    decoded[text == ""] = None
+    return decoded
+
+
+def decode_zoned_int(column: np.ndarray, name: str) -> np.ma.MaskedArray:
+    """Decodes zoned numbers, e.g. "-00123", to int64."""
+    if column.shape[1] > MAX_INT64_DIGITS:
+        return _decode_wide(column, name, lambda value: int(TypeCaster.unpunch(value)))
+
+    values, valid, _ = _zoned_digits(column)
+    return _null_errors(np.ma.MaskedArray(values, mask=~valid), column, name)
+
+
+def decode_zoned_decimal(column: np.ndarray, name: str, integer_digits: int) -> np.ma.MaskedArray:
+    """Decodes zoned numbers with an implied or explicit decimal point to float64. The implied point falls
+    after integer_digits characters (plus a leading sign), the same as TypeCaster._parse_decimal_field."""
+    if column.shape[1] > MAX_INT64_DIGITS:
+        return _decode_wide(column, name,
+                            lambda value: TypeCaster._parse_decimal_value(TypeCaster.unpunch(value), integer_digits))
+
+    values, valid, scale = _zoned_digits(column, integer_digits)
+    result = values.astype(np.float64) / np.power(10.0, scale)
+    return _null_errors(np.ma.MaskedArray(result, mask=~valid), column, name)
+
+
+def decode_time(column: np.ndarray, name: str) -> np.ma.MaskedArray:
+    """Decodes HHMMSS prefixes to timedelta64 seconds since midnight, ignoring any extra precision."""
+    if column.shape[1] < 6:
+        values = np.zeros(len(column), dtype="timedelta64[s]")
+        return _null_errors(np.ma.MaskedArray(values, mask=True), column, name)
+
+    digits = column[:, :6].astype(np.int64) - ZERO
+    hours, minutes, seconds = (digits[:, i] * 10 + digits[:, i + 1] for i in (0, 2, 4))
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1) & (hours < 24) & (minutes < 60) & (seconds < 60)
+    values = np.where(valid, hours * 3600 + minutes * 60 + seconds, 0).astype("timedelta64[s]")
+    return _null_errors(np.ma.MaskedArray(values, mask=~valid), column, name)
+
+
+def _zoned_digits(column: np.ndarray, integer_digits: int = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized equivalent of int(TypeCaster.unpunch(value.strip())). Returns the unsigned-digit value with sign
+    applied, a validity mask, and for decimals (integer_digits set) the number of digits after the point.
+    """
+    rows, width = column.shape
+    index = np.arange(rows)
+    positions = np.arange(width)
+
+    is_digit = (column >= ZERO) & (column <= NINE)
+
+    if is_digit.all():
+        # Fast path for the usual case of unsigned, zero-filled values.
+        values = (column.astype(np.int64) - ZERO) @ np.power(np.int64(10), np.arange(width - 1, -1, -1))
+        scale = np.full(rows, max(width - integer_digits, 0) if integer_digits is not None else 0)
+        return values, np.ones(rows, dtype=bool), scale
+
+    column, punched_negative = _overpunch(column, is_digit)
+    is_digit = (column >= ZERO) & (column <= NINE)
+
+    is_space = column == SPACE
+    is_brace = column == OPEN_BRACE
+    is_dot = column == DOT
+
+    # The "core" runs from the first to the last character that is not a blank or a brace.
+    core_chars = ~(is_space | is_brace)
+    has_core = core_chars.any(axis=1)
+    first = core_chars.argmax(axis=1)
+    last = width - 1 - core_chars[:, ::-1].argmax(axis=1)
+    in_core = (positions >= first[:, None]) & (positions <= last[:, None])
+
+    first_char = column[index, first]
+    signed = (first_char == PLUS) | (first_char == MINUS)
+    negative = (first_char == MINUS) | punched_negative
+
+    invalid = in_core & ~is_digit & ~is_brace
+    invalid[index, first] &= ~signed
+    if integer_digits is not None:
+        invalid &= ~is_dot
+
+    valid = has_core & ~invalid.any(axis=1) & (is_digit & in_core).any(axis=1)
+    if integer_digits is not None:
+        valid &= is_dot.sum(axis=1) <= 1
+
+    digits = np.where(is_digit & in_core, column.astype(np.int64) - ZERO, 0)
+    # Each digit is weighted by the number of digits that follow it.
+    digits_after = np.cumsum((is_digit & in_core)[:, ::-1], axis=1)[:, ::-1] - (is_digit & in_core)
+    values = (digits * np.power(np.int64(10), digits_after)).sum(axis=1)
+    values = np.where(valid, np.where(negative, -values, values), 0)
+
+    scale = np.zeros(rows, dtype=np.int64)
+    if integer_digits is not None:
+        # Character position within value.strip().replace("{", "").
+        leading_blanks = (~is_space).argmax(axis=1)
+        stripped_position = np.cumsum(~is_brace, axis=1) - ~is_brace - leading_blanks[:, None]
+        has_dot = is_dot.any(axis=1)
+        dot_position = np.where(has_dot, is_dot.argmax(axis=1), width)
+
+        # Blanks that were between braces and the core, e.g. "{ 97 {" -> " 97 ". TypeCaster inserts the implied
+        # point into that text before calling float(), which only tolerates them at either end of the result.
+        last_non_blank = width - 1 - (~is_space)[:, ::-1].argmax(axis=1)
+        inner_blanks = is_space & (positions > leading_blanks[:, None]) & (positions < last_non_blank[:, None])
+        blanks_before = (inner_blanks & (positions < first[:, None])).sum(axis=1)
+        has_blanks_after = (inner_blanks & (positions > last[:, None])).any(axis=1)
+        # A sign only counts as the scalar caster's leading sign if no blanks come before it.
+        signed &= blanks_before == 0
+        point = integer_digits + signed
+        blanks_after_start = stripped_position[index, last] + 1
+
+        blanks_before_valid = (blanks_before == 0) | \
+            (blanks_before <= integer_digits - (first_char == PLUS) - (first_char == MINUS))
+        implied_valid = blanks_before_valid & (~has_blanks_after | (blanks_after_start >= point))
+        valid &= has_dot | implied_valid
+
+        after_dot = is_digit & in_core & (positions > dot_position[:, None])
+        after_implied = is_digit & in_core & (stripped_position >= point[:, None])
+        scale = np.where(has_dot, after_dot.sum(axis=1), after_implied.sum(axis=1))
+
+    return values, valid, scale
+
+
+def _overpunch(column: np.ndarray, is_digit: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized TypeCaster.unpunch: replaces a trailing overpunch character that follows only digits with its
+    digit, through the OVERPUNCH_DIGITS lookup table. Returns the column (copied only if anything changed) and
+    which rows had a negative overpunch.
+    """
+    rows, width = column.shape
+    index = np.arange(rows)
+    positions = np.arange(width)
+
+    non_blank = column != SPACE
+    first = non_blank.argmax(axis=1)
+    last = width - 1 - non_blank[:, ::-1].argmax(axis=1)
+    last_char = column[index, last]
+    digit = OVERPUNCH_DIGITS[last_char]
+
+    before_last = (positions >= first[:, None]) & (positions < last[:, None])
+    punched = non_blank.any(axis=1) & (digit >= 0) & (is_digit | ~before_last).all(axis=1)
+
+    if not punched.any():
+        return column, np.zeros(rows, dtype=bool)
+
+    column = column.copy()
+    column[index[punched], last[punched]] = ZERO + digit[punched]
+    return column, punched & OVERPUNCH_NEGATIVE[last_char]
+
+
+def _decode_wide(column: np.ndarray, name: str, cast: Callable[[str], Any]) -> np.ma.MaskedArray:
+    """Scalar fallback for numbers too wide for int64, cast once per distinct value."""
+    unique, inverse = _unique_values(column)
+    parsed = np.empty(len(unique), dtype=object)
+
+    for i, value in enumerate(unique):
+        try:
+            parsed[i] = cast(value) if value else None
+        except ValueError:
+            parsed[i] = None
+
+    parsed = parsed[inverse]
+    return _null_errors(np.ma.MaskedArray(parsed, mask=np.equal(parsed, None)), column, name)
+
+
+def occurrence_matrix(matrix: np.ndarray, offset: int, width: int, stride: int, count: int) -> np.ndarray:
+    """
+    Gathers every occurrence of a repeating field into a (rows * count, width) matrix, row by row. Occurrence i
+    starts at offset + i * stride; a strided view over the repeating block finds them all without any Python
+    loop, and a single copy lays them out for the column decoders.
+    """
+    block = matrix[:, offset:]
+    view = np.lib.stride_tricks.as_strided(block, shape=(len(matrix), count, width),
+                                           strides=(block.strides[0], block.strides[1] * stride, block.strides[1]),
+                                           writeable=False)
+    return view.reshape(len(matrix) * count, width)
+
+
+def _blank_rows(column: np.ndarray, packed: bool = False) -> np.ndarray:
+    """Rows that are all blanks or low values. Packed fields are untranslated, so EBCDIC blanks count too."""
+    blank = (column == SPACE) | (column == 0)
+    if packed:
+        blank |= column == EBCDIC_SPACE
+    return blank.all(axis=1)
+
+
+def _unique_values(column: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """Returns the distinct stripped values of a column and the index of each row's value among them."""
+    values = np.ascontiguousarray(column).view(f"S{column.shape[1]}").ravel()
+    unique, inverse = np.unique(values, return_inverse=True)
+    return [value.decode("latin-1").strip() for value in unique], inverse.ravel()
+
+
+def _null_errors(result: np.ma.MaskedArray, column: np.ndarray, name: str) -> np.ma.MaskedArray:
+    """Logs how many non-blank values could not be cast. They stay null, like blanks."""
+    blank = ((column == SPACE) | (column == 0)).all(axis=1)
+    errors = int((np.ma.getmaskarray(result) & ~blank).sum())
+
+    if errors:
+        logger.debug(f"{name}: {errors} values could not be cast and were set to null.")
+
+    return result
+
@@ -0,0 +1,92 @@
+import logging
+from decimal import Decimal
+from typing import Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# Sign nibbles. C, A, E and F are positive, D and B are negative.
+NEGATIVE_SIGNS = frozenset("bd")
+POSITIVE_SIGNS = frozenset("acef")
+
+# int64 holds any 18 digit number, wider fields are decoded to Decimal.
+MAX_INT64_DIGITS = 18
+
+
+def unpack_comp3(value: bytes) -> int:
+    """
+    Unpacks a single COMP-3 packed decimal to an exact int, ignoring scale. Every byte holds two digit
+    nibbles except the last, which holds one digit and the sign, so the hex form of the bytes is the digits
+    followed by the sign, e.g. b"\\x12\\x34\\x5d" -> "12345d" -> -12345.
+    """
+    digits = value.hex()
+
+    if not digits or digits[-1] not in NEGATIVE_SIGNS and digits[-1] not in POSITIVE_SIGNS:
+        raise ValueError(f"Invalid COMP-3 sign nibble: {value!r}")
+    if not digits[:-1].isdigit():
+        raise ValueError(f"Invalid COMP-3 digit nibble: {value!r}")
+
+    number = int(digits[:-1])
+    return -number if digits[-1] in NEGATIVE_SIGNS else number
+
+
+def unpack_comp3_column(buffer: Union[bytes, bytearray, memoryview], offsets: Sequence[int], length: int,
+                        scale: int = 0, as_decimal: bool = False):
+    """
+    Unpacks a whole column of COMP-3 fields of the same length, one per offset into buffer, with NumPy bit
+    operations. Returns a numpy masked array (mask = invalid value) of:
+      - int64 when scale is 0,
+      - float64 with the scale applied when scale > 0,
+      - Decimal objects with the exact scale applied when as_decimal is set or the field has more than
+        18 digits.
+    """
+    import numpy as np
+
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    matrix = data[offsets[:, None] + np.arange(length)]
+    return unpack_comp3_matrix(matrix, scale, as_decimal)
+
+
+def unpack_comp3_matrix(matrix, scale: int = 0, as_decimal: bool = False):
+    """Same as unpack_comp3_column for a (rows, field length) uint8 matrix of packed fields."""
+    import numpy as np
+
+    rows, length = matrix.shape
+    high = matrix >> 4
+    low = matrix & 0x0F
+    # Interleave the nibbles into one digit per column, dropping the trailing sign nibble.
+    digits = np.stack((high, low), axis=2).reshape(rows, length * 2)[:, :-1].astype(np.int64)
+    sign = low[:, -1]
+
+    valid = (digits <= 9).all(axis=1) & (sign >= 0x0A)
+    negative = (sign == 0x0B) | (sign == 0x0D)
+    digit_count = digits.shape[1]
+
+    if digit_count <= MAX_INT64_DIGITS:
+        values = digits @ np.power(np.int64(10), np.arange(digit_count - 1, -1, -1))
+        values = np.where(valid, np.where(negative, -values, values), 0)
+
+        if as_decimal:
+            return np.ma.MaskedArray(_to_decimals(values.tolist(), scale, valid), mask=~valid)
+        elif scale:
+            return np.ma.MaskedArray(values / np.power(10.0, scale), mask=~valid)
+
+        return np.ma.MaskedArray(values, mask=~valid)
+
+    # Too wide for int64, so combine two int64 halves as Python ints.
+    split = digit_count - MAX_INT64_DIGITS
+    powers = np.power(np.int64(10), np.arange(MAX_INT64_DIGITS - 1, -1, -1))
+    high_values = (digits[:, :split] @ powers[-split:]).tolist()
+    low_values = (digits[:, split:] @ powers).tolist()
+    values = [(h * 10 ** MAX_INT64_DIGITS + l) * (-1 if n else 1)
+              for h, l, n in zip(high_values, low_values, negative.tolist())]
+
+    return np.ma.MaskedArray(_to_decimals(values, scale, valid), mask=~valid)
+
+
+def _to_decimals(values, scale: int, valid):
+    import numpy as np
+
+    result = np.empty(len(values), dtype=object)
+    result[:] = [Decimal(value).scaleb(-scale) if ok else None for value, ok in zip(values, valid.tolist())]
+    return result
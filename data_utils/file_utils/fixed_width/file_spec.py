@@ -1,14 +1,14 @@
+import copy
 import csv
 import logging
 import re
 import os
-from collections import defaultdict
+from collections import Counter, defaultdict
 from enum import Enum
 from typing import Any, Dict
 
-from data_utils.connectors.s3_connector import S3Connector
+from data_utils.file_utils.fixed_width import layout_cache
 from data_utils.settings import Settings
-from sqlalchemy import NUMERIC, VARCHAR, DATE, JSON, TIME
 
 logger = logging.getLogger(__name__)
 
@@ -25,23 +25,55 @@ FORMAT_ENCODING_MAP = {
     FileFormatEnum.LATIN_1: "latin-1"
 }
 
+# cp037 maps every byte to exactly one latin-1 character, so this 256 byte table translates EBCDIC text to latin-1
+# with a single bytes.translate call, however long the buffer.
+EBCDIC_TO_LATIN_1 = bytes(range(256)).decode("cp037").encode("latin-1")
+
 
 class FileSpec:
     def __init__(self, settings: Settings, file_config: Dict[str, Any]):
         self.settings = settings
-        self.s3_conn = S3Connector()
+        self._s3_conn = None
         self.layout_filename = file_config.get("layout_name")
         self.record_type_field_name = file_config.get("record_type_field_name") or "Record Type"
         self.cast_fields = file_config.get("cast_fields", {})
         self.sequence_fields = file_config.get("sequence_fields", {})
         self.nested_field_name = file_config.get("nested_field_name")
         self.nest_json_fields = file_config.get("nest_json_fields", {})
+        self.file_format = FileFormatEnum(file_config.get("file_format", "ASCII").upper())
+        self.encoding = FORMAT_ENCODING_MAP[self.file_format]
+        # Position of the record type in each data record, using the same 1-based "Start" as the layout CSV.
+        self.record_type_start = file_config.get("record_type_start")
+        self.record_type_length = file_config.get("record_type_length", 1)
+        # Pin the layout version (e.g. its S3 ETag) to skip the HEAD request when the layout cache is enabled.
+        self.layout_version = file_config.get("layout_version")
         self.layout = defaultdict(list)
-        self.dtypes = {"DETAIL_RECORD_NUMBER": NUMERIC(11, 0)}
+        self.dtypes = {"DETAIL_RECORD_NUMBER": _sqlalchemy_types().NUMERIC(11, 0)}
         self.struct_fmt_str = defaultdict(str)
 
         self._generate_layout()
 
+    @property
+    def s3_conn(self):
+        """S3 client for the layout file, created on first use so local layouts never load boto3."""
+        if self._s3_conn is None:
+            from data_utils.connectors.s3_connector import S3Connector
+            self._s3_conn = S3Connector()
+
+        return self._s3_conn
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Settings hold an SSM client and S3Connector a boto3 client, neither of which can be pickled. The
+        # compiled layout is all that is needed once the spec has been built.
+        state = self.__dict__.copy()
+        state["settings"] = None
+        state["_s3_conn"] = None
+        return state
+
+    def snapshot(self) -> "FileSpec":
+        """Returns a copy of the spec without settings or the S3 client, safe to send to worker processes."""
+        return copy.copy(self)
+
     def _generate_layout(self) -> None:
         """
         Reads CSV layout file and builds a dict of tuples, with a key for each "Record Type". E.g.
@@ -50,8 +82,22 @@ class FileSpec:
         """
         download_path = self.settings.get("file_config", "download_path")
         file_path = f"{download_path}{self.layout_filename}"
+        use_s3 = self.settings.getboolean("file_config", "use_s3")
 
-        if self.settings.getboolean("file_config", "use_s3"):
+        # Optional compiled layout cache, on local disk and/or in process.
+        cache_dir = self.settings.get("file_config", "layout_cache_dir", fallback=None)
+        use_registry = self.settings.getboolean("file_config", "layout_cache_registry", fallback=False)
+        cache_key = None
+
+        if cache_dir or use_registry:
+            cache_key = self._layout_cache_key(file_path, use_s3)
+            compiled = layout_cache.load(cache_key, cache_dir, use_registry)
+
+            if compiled:
+                self._load_compiled_layout(compiled)
+                return
+
+        if use_s3:
             bucket = self.settings.get("file_config", "layout_bucket")
             self.s3_conn.download_file(bucket, self.layout_filename, file_path)
 
@@ -90,10 +136,15 @@ class FileSpec:
                 # Add sqlalchemy type to dtypes for use in loading
                 self._build_dtypes(name, data_type, length, pic_clause)
 
+        self._expand_sequence_fields()
+
         # Add dtypes for nested JSON columns
         self._add_json_dtypes()
 
-        if self.settings.getboolean("file_config", "use_s3"):
+        if cache_key:
+            layout_cache.store(cache_key, self._compiled_layout(), cache_dir, use_registry)
+
+        if use_s3:
             # Try to clean up downloaded layout after dict is created, but leave test files.
             if "sample_test_files" not in file_path:
                 try:
@@ -101,6 +152,74 @@ class FileSpec:
                 except Exception as e:
                     logger.error(f"Error trying to clean up layout file: {e}")
 
+    def _layout_cache_key(self, file_path: str, use_s3: bool) -> str:
+        """
+        Cache key for the compiled layout. The layout version is the pinned file_config "layout_version" when
+        set (no request at all), otherwise the S3 ETag (one HEAD request), or the local file's content hash.
+        """
+        if self.layout_version:
+            version = self.layout_version
+        elif use_s3:
+            bucket = self.settings.get("file_config", "layout_bucket")
+            version = self.s3_conn.head_object(bucket, self.layout_filename)["ETag"]
+        else:
+            version = layout_cache.content_hash(file_path)
+
+        return layout_cache.cache_key(self.layout_filename, version, {
+            "record_type_field_name": self.record_type_field_name,
+            "cast_fields": self.cast_fields,
+            "sequence_fields": self.sequence_fields,
+            "nested_field_name": self.nested_field_name,
+            "nest_json_fields": self.nest_json_fields,
+        })
+
+    def _expand_sequence_fields(self) -> None:
+        """
+        A sequence field (COBOL OCCURS) listed once in the layout spans all of its occurrences. It is split into
+        one field per occurrence, so each occurrence is sliced and cast on its own and FixedWidthReader names
+        them NAME-1..NAME-n, matching the NAME_1..NAME_n dtypes. Sequence fields already listed once per
+        occurrence are left as they are.
+        """
+        for key, fields in list(self.layout.items()):
+            totals = Counter(field[0] for field in fields)
+            expanded = []
+
+            for field in fields:
+                name, data_type, start, end, length, logic, pic_clause = field
+                count = self.sequence_fields.get(name)
+
+                if not count or count == 1 or totals[name] > 1:
+                    expanded.append(field)
+                    continue
+
+                if length % count:
+                    logger.error(f"Sequence field {name} length {length} is not a multiple of its {count} "
+                                 f"occurrences, leaving it as one field.")
+                    expanded.append(field)
+                    continue
+
+                width = length // count
+                for i in range(count):
+                    occurrence_start = start + i * width
+                    expanded.append((name, data_type, occurrence_start, occurrence_start + width - 1, width, logic,
+                                     pic_clause))
+
+                # Each occurrence column only needs to hold one occurrence.
+                self._build_dtypes(name, data_type, width, pic_clause)
+
+            if len(expanded) != len(fields):
+                self.layout[key] = expanded
+                self.struct_fmt_str[key] = "".join(f"{field[4]}s" for field in expanded)
+
+    def _compiled_layout(self) -> Dict[str, Any]:
+        return {"layout": dict(self.layout), "dtypes": self.dtypes, "struct_fmt_str": dict(self.struct_fmt_str)}
+
+    def _load_compiled_layout(self, compiled: Dict[str, Any]) -> None:
+        # Copy so specs sharing a registry entry can't change each other's layout.
+        self.layout = defaultdict(list, {key: list(fields) for key, fields in compiled["layout"].items()})
+        self.dtypes = dict(compiled["dtypes"])
+        self.struct_fmt_str = defaultdict(str, compiled["struct_fmt_str"])
+
     def _build_dtypes(self, name: str, data_type: str, length: int, pic_clause: str):
         """
         Adds the field's SQLAlchemy type to dtypes dicts. For use in loading with Pandas.
@@ -120,6 +239,8 @@ class FileSpec:
         into JSON blobs, so we need to provide a dtype for the field and its corresponding
         "STRUCTURE" field, which tells what dtype each child attr is.
         """
+        JSON = _sqlalchemy_types().JSON
+
         # EVT File is too large to load to SQL. Fields are nested by event type.
         if self.nested_field_name:
             self.dtypes[self.nested_field_name.upper()] = JSON
@@ -135,7 +256,9 @@ class FileSpec:
     @staticmethod
     def _sqlalchemy_type(data_type: str, length: int, pic_clause: str):
         """Returns SQLAlchemy column type based on provided data_type, length, and pic_clause."""
-        if "C" in pic_clause:
+        types = _sqlalchemy_types()
+        NUMERIC, VARCHAR, DATE, TIME = types.NUMERIC, types.VARCHAR, types.DATE, types.TIME
+        if FileSpec.is_packed(pic_clause):
             # Packed numbers take up more space unpacked, so use the pic clause length instead.
             match = re.findall(r'\((.*?) *\)', pic_clause)
             if len(match) == 1:
@@ -162,6 +285,21 @@ class FileSpec:
         else:
             return VARCHAR(length)
 
+    @staticmethod
+    def is_packed(pic_clause: str) -> bool:
+        """Returns True for COMP-3 packed fields, which are stored as raw bytes rather than encoded text."""
+        return "C" in pic_clause
+
+    @staticmethod
+    def pic_scale(pic_clause: str) -> int:
+        """Number of digits after the implied or explicit decimal point, e.g. 2 for S9(7)V9(2) COMP-3."""
+        parts = re.split(r"[V.]", pic_clause.upper(), 1)
+        if len(parts) == 1:
+            return 0
+
+        fraction = parts[1]
+        return sum(int(n) for n in re.findall(r"9\((\d+)\)", fraction)) + len(re.findall(r"9(?!\()", fraction))
+
     @staticmethod
     def parse_field_name(name: str) -> str:
         """Converts original copybook element name to SQL friendly version using only underscores
@@ -170,3 +308,9 @@ class FileSpec:
         convert_to_underscores = name.upper().replace("-", "_").replace("(", "_").replace(")", "_").strip("_")
         strip_prefix = ''.join(convert_to_underscores.split("_", 1)[1:]).strip()
         return strip_prefix
+
+
+def _sqlalchemy_types():
+    """SQLAlchemy is only imported once a spec is built, so importing the fixed-width modules stays cheap."""
+    import sqlalchemy
+    return sqlalchemy
@@ -0,0 +1,125 @@
+import json
+import logging
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+
+logger = logging.getLogger(__name__)
+
+
+def json_dumps() -> Callable[[Any], str]:
+    """Fastest available JSON encoder: orjson when installed, otherwise the standard library with compact
+    separators. Values it can't encode natively (Decimal, bytes) are written as strings. orjson rejects ints
+    wider than 64 bits, which wide COMP-3 and zoned fields produce, so those values fall back to the standard
+    library."""
+    def stdlib_dumps(value: Any) -> str:
+        return json.dumps(value, separators=(",", ":"), default=str)
+
+    try:
+        import orjson
+    except ImportError:
+        return stdlib_dumps
+
+    def dumps(value: Any) -> str:
+        try:
+            return orjson.dumps(value, default=str).decode()
+        except orjson.JSONEncodeError:
+            return stdlib_dumps(value)
+
+    return dumps
+
+
+class _Group:
+    """One JSON blob column: the record keys packed into it, their keys in the blob, and its structure."""
+    def __init__(self, column: str, fields: List[Tuple[str, str]], structure: str):
+        self.column = column
+        self.structure_column = f"{column}_STRUCTURE"
+        self.record_keys = [record_key for record_key, _ in fields]
+        self.child_keys = [child_key for _, child_key in fields]
+        self.structure = structure
+
+
+class JsonPacker:
+    """
+    Packs parsed records into the JSON blob columns declared by nested_field_name and nest_json_fields (see
+    FileSpec._add_json_dtypes), for files like EVT and AUD that are too wide for a SQL row.
+
+    With nested_field_name, fields shared by every record type stay as columns and each record type's own fields
+    go into the nested_field_name blob. With nest_json_fields, fields whose column name (FileSpec.parse_field_name)
+    or copybook name starts with a prefix go into that prefix's json_field_name blob.
+
+    Which fields go where, their keys in the blob and the _STRUCTURE document (each child key's SQL type) are
+    worked out once per record type. The structure is identical for every row of a record type, so rows share one
+    pre-serialized string instead of rebuilding it, and pack_batch can leave it out of rows entirely.
+    """
+    def __init__(self, file_spec: FileSpec, dumps: Callable[[Any], str] = None):
+        self.spec = file_spec
+        self.dumps = dumps or json_dumps()
+        self.plans = {record_type: self._compile(record_type) for record_type in file_spec.layout}
+
+    def _compile(self, record_type: str) -> Tuple[List[Tuple[str, str]], List[_Group]]:
+        """(record key, column) pairs kept as columns, and the JSON groups for a record type."""
+        fields = self.spec.layout[record_type]
+        names = FixedWidthReader._unique_field_names(fields)
+        shared = self._shared_field_names() if self.spec.nested_field_name else None
+        prefixes = [(prefix, options["json_field_name"].upper())
+                    for prefix, options in (self.spec.nest_json_fields or {}).items()]
+
+        columns = []
+        grouped: Dict[str, List[Tuple[str, str]]] = {}
+
+        for record_key, field in zip(names, fields):
+            column = FileSpec.parse_field_name(record_key)
+            if column == "" or "FILLER" in column or column not in self.spec.dtypes:
+                continue
+
+            group = next((json_column for prefix, json_column in prefixes
+                          if column.startswith(prefix.upper()) or field[0].startswith(prefix)), None)
+
+            if group is None and shared is not None and field[0] not in shared:
+                group = self.spec.nested_field_name.upper()
+
+            if group is None:
+                columns.append((record_key, column))
+            else:
+                grouped.setdefault(group, []).append((record_key, column))
+
+        groups = []
+        for json_column, group_fields in grouped.items():
+            structure = {child_key: str(self.spec.dtypes[child_key]) for _, child_key in group_fields}
+            # Interned, so every row of every batch refers to the same string object.
+            groups.append(_Group(json_column, group_fields, sys.intern(self.dumps(structure))))
+
+        return columns, groups
+
+    def _shared_field_names(self) -> set:
+        """Copybook names present in every record type, which stay as columns when nesting by record type."""
+        names = [{field[0] for field in fields} for fields in self.spec.layout.values()]
+        return set.intersection(*names) if names else set()
+
+    def structures(self, record_type: str) -> Dict[str, str]:
+        """The _STRUCTURE column values for a record type, e.g. {"EVENT_DATA_STRUCTURE": '{"AMOUNT":...}'}."""
+        return {group.structure_column: group.structure for group in self.plans[record_type][1]}
+
+    def pack(self, record_type: str, record: Dict[str, Any], include_structure: bool = True) -> Dict[str, Any]:
+        """Returns a row keyed by column name, with grouped fields serialized into their JSON columns."""
+        columns, groups = self.plans[record_type]
+        dumps = self.dumps
+        row = {column: record.get(record_key) for record_key, column in columns}
+
+        for group in groups:
+            row[group.column] = dumps(dict(zip(group.child_keys, [record.get(key) for key in group.record_keys])))
+            if include_structure:
+                row[group.structure_column] = group.structure
+
+        return row
+
+    def pack_batch(self, record_type: str,
+                   records: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """Packs a batch of one record type, returning the rows without _STRUCTURE columns and the structures
+        once for the whole batch."""
+        rows = [self.pack(record_type, record, include_structure=False) for record in records]
+        return rows, self.structures(record_type)
+
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of the compiled layout changes so stale artifacts are ignored.
+LAYOUT_CACHE_FORMAT = 2
+
+# In-process registry of compiled layouts, shared by every FileSpec in the process.
+_registry: Dict[str, Dict[str, Any]] = {}
+
+
+def cache_key(layout_name: str, version: str, file_config: Dict[str, Any]) -> str:
+    """
+    Identifies a compiled layout by layout file name, layout version (S3 ETag or content hash), and the
+    file_config options that change how the layout compiles, e.g. cast_fields.
+    """
+    config = json.dumps(file_config, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{LAYOUT_CACHE_FORMAT}:{layout_name}:{version}:{config}".encode()).hexdigest()
+    return digest[:32]
+
+
+def content_hash(file_path: str) -> str:
+    """sha256 of a local layout file, used as its version when it does not come from S3."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def load(key: str, cache_dir: Optional[str], use_registry: bool) -> Optional[Dict[str, Any]]:
+    """Returns the compiled layout from the in-process registry or local disk cache, or None on a miss."""
+    if use_registry and key in _registry:
+        logger.debug(f"Layout cache registry hit: {key}")
+        return _registry[key]
+
+    if cache_dir:
+        path = _artifact_path(cache_dir, key)
+        try:
+            with open(path, "rb") as f:
+                compiled = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable layout cache artifact {path}: {e}")
+            return None
+
+        logger.debug(f"Layout cache disk hit: {path}")
+        if use_registry:
+            _registry[key] = compiled
+        return compiled
+
+    return None
+
+
+def store(key: str, compiled: Dict[str, Any], cache_dir: Optional[str], use_registry: bool) -> None:
+    """Saves a compiled layout to the registry and/or disk. Disk writes are atomic, so concurrent jobs sharing
+    a cache directory never read a partial artifact."""
+    if use_registry:
+        _registry[key] = compiled
+
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, _artifact_path(cache_dir, key))
+        except Exception as e:
+            # Best effort, a failed write only costs a recompile next run.
+            logger.warning(f"Could not write layout cache artifact: {e}")
+
+
+def clear_registry() -> None:
+    _registry.clear()
+
+
+def _artifact_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"layout-{key}.pickle")
@@ -0,0 +1,156 @@
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import Record, TypeCaster
+
+logger = logging.getLogger(__name__)
+
+OCCURRENCE = "OCCURRENCE"
+
+# Raw packed bytes that mean "no value": low values, and ASCII or EBCDIC blanks.
+_BLANK_BYTES = frozenset(b"\x00\x20\x40")
+
+
+class OccursField(NamedTuple):
+    """One field of an OCCURS group: its copybook name, the 0-based offset and width of its first occurrence,
+    and the layout index of every occurrence."""
+    name: str
+    offset: int
+    width: int
+    indexes: List[int]
+
+
+class OccursGroup(NamedTuple):
+    """
+    Sequence fields repeated together, e.g. CIF-AMOUNT and CIF-DATE under one OCCURS 12 TIMES. Occurrence i of
+    every field starts at its first occurrence's offset + i * stride. stride is None when the occurrences are
+    not evenly spaced, in which case the group holds a single field.
+    """
+    name: str
+    count: int
+    stride: Optional[int]
+    fields: List[OccursField]
+
+
+def occurs_groups(file_spec: FileSpec) -> Dict[str, List[OccursGroup]]:
+    """Finds the OCCURS groups of every record type from the layout's sequence_fields."""
+    groups = {}
+
+    for record_type, fields in file_spec.layout.items():
+        occurs = []
+        for name in dict.fromkeys(field[0] for field in fields):
+            if name not in file_spec.sequence_fields:
+                continue
+
+            indexes = [i for i, field in enumerate(fields) if field[0] == name]
+            starts = [fields[i][2] for i in indexes]
+            widths = {fields[i][4] for i in indexes}
+            steps = {b - a for a, b in zip(starts, starts[1:])}
+            stride = steps.pop() if len(steps) == 1 and len(widths) == 1 else None
+
+            if len(indexes) > 1 and stride is None:
+                logger.debug(f"Occurrences of {name} are not evenly spaced, casting them one at a time.")
+
+            occurs.append((OccursField(name, starts[0] - 1, fields[indexes[0]][4], indexes), stride))
+
+        record_groups = []
+        for field, stride in sorted(occurs, key=lambda item: item[0].offset):
+            group = record_groups[-1] if record_groups else None
+            # Fields belong to the same group when they repeat the same way within the same block.
+            if (group is not None and stride is not None and group.stride == stride
+                    and group.count == len(field.indexes)
+                    and field.offset < group.fields[0].offset + stride):
+                group.fields.append(field)
+            else:
+                record_groups.append(OccursGroup(field.name, len(field.indexes), stride, [field]))
+
+        if record_groups:
+            groups[record_type] = record_groups
+
+    return groups
+
+
+class OccursExpander:
+    """
+    Turns repeating groups (COBOL OCCURS, configured as file_config sequence_fields) into a normalized stream of
+    child rows, one per occurrence, instead of NAME-1..NAME-n wide columns. FixedWidthReader and TypeCaster
+    already produce the wide columns, since FileSpec splits sequence fields into one field per occurrence.
+
+    Occurrences whose raw values are all blank are dropped before anything is cast, so a group declared with 50
+    occurrences but usually holding a few costs a few casts per record. Each field's caster is compiled once and
+    shared by all of its occurrences.
+    """
+    def __init__(self, file_spec: FileSpec, caster: TypeCaster = None):
+        self.spec = file_spec
+        self.caster = caster or TypeCaster(file_spec)
+        self.groups = occurs_groups(file_spec)
+        self.field_names = {key: FixedWidthReader._unique_field_names(fields)
+                            for key, fields in file_spec.layout.items()}
+        self._name_indexes = {key: {name: i for i, name in enumerate(names)}
+                              for key, names in self.field_names.items()}
+        self._occurs_indexes = {
+            record_type: frozenset(i for group in groups for field in group.fields for i in field.indexes)
+            for record_type, groups in self.groups.items()
+        }
+
+    def parent(self, record_type: str, record: Record) -> Dict[str, Any]:
+        """The record without its occurrence fields, keyed like FixedWidthReader records."""
+        skip = self._occurs_indexes.get(record_type, frozenset())
+        values = record.values() if isinstance(record, dict) else record
+        return {name: value for i, (name, value) in enumerate(zip(self.field_names[record_type], values))
+                if i not in skip}
+
+    def child_rows(self, record_type: str, record: Record, parent_fields: Iterable[str] = (),
+                   cast: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields (group name, row) for every non-empty occurrence of every OCCURS group in a record. Rows hold the
+        occurrence number (1-based) under OCCURRENCE, each field's value under its copybook name, and the record's
+        parent_fields (e.g. the account number) so child rows can be joined back. record is a FixedWidthReader
+        record, a dict or a sequence in layout order; set cast=False if it was already cast.
+        """
+        groups = self.groups.get(record_type)
+        if not groups:
+            return
+
+        values = list(record.values()) if isinstance(record, dict) else record
+        plan = self.caster.plans[record_type]
+        parent = {}
+        if parent_fields:
+            indexes = self._name_indexes[record_type]
+            parent = {name: plan[indexes[name]](values[indexes[name]]) if cast else values[indexes[name]]
+                      for name in parent_fields}
+
+        for group in groups:
+            casts = [plan[field.indexes[0]] for field in group.fields]
+            for occurrence in range(group.count):
+                raw = [values[field.indexes[occurrence]] for field in group.fields]
+                if all(_is_blank(value) for value in raw):
+                    continue
+
+                row = dict(parent)
+                row[OCCURRENCE] = occurrence + 1
+                for field, field_cast, value in zip(group.fields, casts, raw):
+                    row[field.name] = field_cast(value) if cast else value
+
+                yield group.name, row
+
+    def cast_occurrences(self, record_type: str, record: Record, name: str) -> List[Any]:
+        """Casts every occurrence of one sequence field, in occurrence order."""
+        values = list(record.values()) if isinstance(record, dict) else record
+        for group in self.groups.get(record_type, []):
+            for field in group.fields:
+                if field.name == name:
+                    cast = self.caster.plans[record_type][field.indexes[0]]
+                    return [cast(values[i]) for i in field.indexes]
+
+        raise KeyError(f"{name} is not a sequence field of record type {record_type}.")
+
+
+def _is_blank(value: Any) -> bool:
+    if value is None or value == "":
+        return True
+    if isinstance(value, (bytes, bytearray)):
+        return all(byte in _BLANK_BYTES for byte in value)
+    return isinstance(value, str) and not value.strip()
@@ -0,0 +1,200 @@
+import logging
+import math
+import os
+import pickle
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Iterator, List, Tuple, Union
+
+from data_utils.file_utils.fixed_width.checkpoint import (Checkpoint, CommittedPart, part_name,
+                                                          source_fingerprint, write_part)
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader, Record
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+logger = logging.getLogger(__name__)
+
+# Shards are sized by bytes rather than counted per worker, so the work held by each in-flight shard stays the same
+# on a 40 MB file and a 40 GB one.
+DEFAULT_SHARD_BYTES = 64 * 1024 * 1024
+
+# Records per pickled batch when workers spool a shard's records back to parse().
+SPOOL_BATCH_RECORDS = 10_000
+
+# Set once per worker process by _init_worker, so the spec is only pickled once per worker.
+_worker_reader = None
+_worker_caster = None
+
+
+def split_file(file_path: Union[str, os.PathLike], shards: int, record_length: int = None) -> List[Tuple[int, int]]:
+    """
+    Splits a fixed-width file into up to `shards` (start, end) byte ranges that begin and end on record
+    boundaries. Boundaries are rounded to a multiple of record_length, or moved forward past the next newline.
+    """
+    size = os.path.getsize(file_path)
+    target = max(size // max(shards, 1), 1)
+    boundaries = [0]
+
+    with open(file_path, "rb") as f:
+        while boundaries[-1] < size:
+            position = boundaries[-1] + target
+
+            if position >= size:
+                position = size
+            elif record_length:
+                position = max(position - position % record_length, boundaries[-1] + record_length)
+            else:
+                position = _next_line_start(f, position, size)
+
+            boundaries.append(position)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _next_line_start(f, position: int, size: int, block_size: int = 64 * 1024) -> int:
+    """Returns the offset just after the first newline at or after position, or the end of the file."""
+    f.seek(position)
+
+    while position < size:
+        block = f.read(block_size)
+        newline = block.find(b"\n")
+
+        if newline >= 0:
+            return position + newline + 1
+
+        position += len(block)
+
+    return size
+
+
+class ParallelParser:
+    """
+    Parses a fixed-width file across a ProcessPoolExecutor. The file is split into record-aligned byte ranges
+    of about shard_bytes each (or exactly `shards` ranges, if given) and each worker reads and casts its range
+    independently. Workers receive a picklable, S3-free snapshot of the FileSpec (see FileSpec.snapshot) instead
+    of rebuilding it from the layout.
+    """
+    def __init__(self, file_spec: FileSpec, workers: int = None, shards: int = None, record_length: int = None,
+                 cast: bool = True, shard_bytes: int = DEFAULT_SHARD_BYTES):
+        self.spec = file_spec.snapshot()
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = shards
+        self.shard_bytes = shard_bytes
+        self.record_length = record_length
+        self.cast = cast
+
+    def split(self, file_path: Union[str, os.PathLike]) -> List[Tuple[int, int]]:
+        """The shard byte ranges for a file. Without an explicit shard count they depend only on the file size and
+        shard_bytes, not on the number of workers."""
+        shards = self.shards or math.ceil(os.path.getsize(file_path) / self.shard_bytes)
+        return split_file(file_path, shards, self.record_length)
+
+    def parse(self, file_path: Union[str, os.PathLike]) -> Iterator[Tuple[str, Record]]:
+        """Yields (record_type, record) for the whole file in original order. Workers spool their records to
+        temporary files in pickled batches and at most two shards per worker are in flight, so memory is bounded
+        by the batch size rather than the shard or file size."""
+        ranges = self.split(file_path)
+        logger.info(f"Parsing {file_path} in {len(ranges)} shards across {self.workers} workers.")
+
+        with tempfile.TemporaryDirectory(prefix="parallel-") as spool_dir, self._executor() as executor:
+            pending = deque()
+
+            for i, (start, end) in enumerate(ranges):
+                spool_path = os.path.join(spool_dir, f"{i:05d}.pickle")
+                pending.append(executor.submit(_spool_range, str(file_path), start, end, spool_path))
+
+                if len(pending) >= self.workers * 2:
+                    yield from _read_spool(pending.popleft().result())
+
+            while pending:
+                yield from _read_spool(pending.popleft().result())
+
+    def write_parts(self, file_path: Union[str, os.PathLike], output_dir: Union[str, os.PathLike],
+                    prefix: str = "part", checkpoint: Union[str, Checkpoint] = None) -> List[Tuple[str, int]]:
+        """
+        Parses each shard to its own JSON lines part file in output_dir. Returns (part path, record count) for
+        each part, in file order. With a checkpoint (a Checkpoint, or a local path or s3:// URL for one), each
+        part is recorded as soon as it is written and a rerun only writes the shards that are missing. Parts are
+        named by their byte range (see part_name). The shard ranges are stored in the checkpoint and a rerun that
+        would cut the file differently raises CheckpointError instead of writing overlapping parts.
+        """
+        ranges = self.split(file_path)
+        os.makedirs(output_dir, exist_ok=True)
+
+        if isinstance(checkpoint, str):
+            checkpoint = Checkpoint(checkpoint)
+        if checkpoint is not None:
+            checkpoint.load().start(source_fingerprint(file_path))
+            checkpoint.plan(ranges)
+
+        parts = [(part_name(prefix, start, end), start, end) for start, end in ranges]
+        todo = [part for part in parts if checkpoint is None or not checkpoint.is_committed(part[1], part[2])]
+        counts = {} if checkpoint is None else {part.name: part.records for part in checkpoint.parts}
+        logger.info(f"Writing {file_path} as {len(ranges)} parts across {self.workers} workers, "
+                    f"{len(parts) - len(todo)} already committed.")
+
+        with self._executor() as executor:
+            futures = {
+                executor.submit(_write_range, str(file_path), start, end, os.path.join(output_dir, f"{name}.jsonl")):
+                    (name, start, end)
+                for name, start, end in todo
+            }
+
+            for future in as_completed(futures):
+                name, start, end = futures[future]
+                _, counts[name] = future.result()
+                if checkpoint is not None:
+                    checkpoint.commit(CommittedPart(name, start, end, counts[name]))
+
+        return [(os.path.join(output_dir, f"{name}.jsonl"), counts[name]) for name, _, _ in parts]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.spec, self.record_length, self.cast))
+
+
+def _init_worker(file_spec: FileSpec, record_length: int, cast: bool) -> None:
+    global _worker_reader, _worker_caster
+    _worker_reader = FixedWidthReader(file_spec, record_length=record_length)
+    _worker_caster = TypeCaster(file_spec) if cast else None
+
+
+def _iter_range(file_path: str, start: int, end: int) -> Iterator[Tuple[str, Any]]:
+    for record_type, record in _worker_reader.records(file_path, start, end):
+        if _worker_caster:
+            record = _worker_caster.cast_record(record_type, record)
+        yield record_type, record
+
+
+def _spool_range(file_path: str, start: int, end: int, spool_path: str) -> str:
+    """Pickles a range's records to spool_path in batches of SPOOL_BATCH_RECORDS, so neither the worker nor the
+    parent ever holds a whole shard."""
+    with open(spool_path, "wb") as f:
+        batch = []
+        for record in _iter_range(file_path, start, end):
+            batch.append(record)
+            if len(batch) >= SPOOL_BATCH_RECORDS:
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+                batch = []
+        if batch:
+            pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+
+    return spool_path
+
+
+def _read_spool(spool_path: str) -> Iterator[Tuple[str, Record]]:
+    try:
+        with open(spool_path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    break
+                yield from batch
+    finally:
+        os.remove(spool_path)
+
+
+def _write_range(file_path: str, start: int, end: int, part_path: str) -> Tuple[str, int]:
+    return part_path, write_part(part_path, _iter_range(file_path, start, end))
@@ -0,0 +1,207 @@
+import logging
+from datetime import date, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Union
+
+from sqlalchemy import DATE, JSON, NUMERIC, TIME
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+
+# Widest decimal Arrow's decimal128 can hold.
+MAX_DECIMAL128_PRECISION = 38
+
+
+def arrow_type(sqlalchemy_type: Any, dictionary: bool = False):
+    """Maps a FileSpec dtype to an Arrow type: NUMERIC to decimal128, DATE to date32, TIME to time32 and
+    VARCHAR (or JSON) to string, or a dictionary-encoded string when dictionary is set."""
+    import pyarrow as pa
+
+    if isinstance(sqlalchemy_type, NUMERIC):
+        precision, scale = sqlalchemy_type.precision, sqlalchemy_type.scale or 0
+        if precision > MAX_DECIMAL128_PRECISION:
+            return pa.decimal256(precision, scale)
+        return pa.decimal128(precision, scale)
+    elif isinstance(sqlalchemy_type, DATE):
+        return pa.date32()
+    elif isinstance(sqlalchemy_type, TIME):
+        return pa.time32("s")
+    elif dictionary and not (sqlalchemy_type is JSON or isinstance(sqlalchemy_type, JSON)):
+        return pa.dictionary(pa.int32(), pa.string())
+
+    return pa.string()
+
+
+class ParquetWriter:
+    """
+    Streams parsed records of one record type into a Parquet file, buffering row_group_size rows at a time.
+    The Arrow schema comes from the same FileSpec dtypes used for SQL loads, with columns named the same way
+    (FileSpec.parse_field_name) and FILLER fields dropped. Records are dicts keyed by layout field name, as
+    yielded by FixedWidthReader and cast by TypeCaster. Values that don't fit the column type are written as
+    null, mirroring how TypeCaster treats values it cannot cast.
+
+    The output can be staged directly with SnowflakeConnector.stage_file and a Parquet file format.
+    """
+    def __init__(self, file_spec: FileSpec, record_type: str, path: str,
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+                 dictionary_fields: Union[bool, Iterable[str]] = (), extra_columns: Iterable[str] = (),
+                 compression: str = "snappy"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.spec = file_spec
+        self.record_type = record_type
+        self.path = path
+        self.row_group_size = row_group_size
+        self.row_count = 0
+
+        self._columns = self._build_columns(dictionary_fields, extra_columns)
+        self.schema = pa.schema([(name, type_) for _, name, type_, _ in self._columns])
+        self._buffers: List[List[Any]] = [[] for _ in self._columns]
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def _build_columns(self, dictionary_fields: Union[bool, Iterable[str]],
+                       extra_columns: Iterable[str]) -> List[Tuple[str, str, Any, Callable[[Any], Any]]]:
+        """(record key, column name, Arrow type, value converter) for each output column."""
+        dictionary_fields = dictionary_fields if dictionary_fields is True else set(dictionary_fields)
+        fields = self.spec.layout[self.record_type]
+        names = FixedWidthReader._unique_field_names(fields)
+        columns = []
+
+        for key, field in zip(names, fields):
+            column = FileSpec.parse_field_name(key)
+            if column == "" or "FILLER" in column:
+                continue
+
+            dtype = self.spec.dtypes.get(column) or self.spec.dtypes.get(FileSpec.parse_field_name(field[0]))
+            if dtype is None:
+                continue
+
+            dictionary = dictionary_fields is True or column in dictionary_fields or key in dictionary_fields
+            columns.append(self._column(key, column, dtype, dictionary))
+
+        for column in extra_columns:
+            columns.append(self._column(column, column, self.spec.dtypes[column], False))
+
+        return columns
+
+    @staticmethod
+    def _column(key: str, column: str, dtype: Any, dictionary: bool) -> Tuple[str, str, Any, Callable]:
+        type_ = arrow_type(dtype, dictionary)
+
+        if isinstance(dtype, NUMERIC):
+            return key, column, type_, _decimal_converter(column, dtype.precision, dtype.scale or 0)
+        elif isinstance(dtype, DATE):
+            return key, column, type_, _converter(column, date, date.fromisoformat)
+        elif isinstance(dtype, TIME):
+            return key, column, type_, _converter(column, time, time.fromisoformat)
+
+        return key, column, type_, _string
+
+    def write(self, record: Dict[str, Any]) -> None:
+        for buffer, (key, _, _, convert) in zip(self._buffers, self._columns):
+            buffer.append(convert(record.get(key)))
+
+        self.row_count += 1
+
+        if len(self._buffers[0]) >= self.row_group_size:
+            self.flush()
+
+    def write_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Writes buffered rows as a row group."""
+        import pyarrow as pa
+
+        if not self._buffers or not self._buffers[0]:
+            return
+
+        arrays = []
+        for buffer, (_, _, type_, _) in zip(self._buffers, self._columns):
+            if pa.types.is_dictionary(type_):
+                arrays.append(pa.array(buffer, type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(buffer, type=type_))
+
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema),
+                                 row_group_size=self.row_group_size)
+        self._buffers = [[] for _ in self._columns]
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+        logger.info(f"Wrote {self.row_count} {self.record_type} records to {self.path}.")
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def write_parquet(file_spec: FileSpec, records: Iterable[Tuple[str, Dict[str, Any]]], path_template: str,
+                  **writer_options) -> Dict[str, str]:
+    """
+    Writes (record_type, record) pairs, e.g. from FixedWidthReader.records, to one Parquet file per record
+    type. path_template is formatted with record_type, e.g. "/tmp/cif_{record_type}.parquet". Returns the
+    path written for each record type.
+    """
+    writers: Dict[str, ParquetWriter] = {}
+
+    try:
+        for record_type, record in records:
+            writer = writers.get(record_type)
+            if writer is None:
+                path = path_template.format(record_type=record_type)
+                writer = writers[record_type] = ParquetWriter(file_spec, record_type, path, **writer_options)
+            writer.write(record)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return {record_type: writer.path for record_type, writer in writers.items()}
+
+
+def _decimal_converter(column: str, precision: int, scale: int) -> Callable[[Any], Any]:
+    exponent = Decimal(1).scaleb(-scale)
+
+    def convert(value):
+        if value is None or isinstance(value, str):
+            return None
+        try:
+            # str() gives the shortest repr of a float, so 123.45 doesn't become 123.4500000000000028...
+            number = Decimal(str(value)).quantize(exponent)
+        except (InvalidOperation, ValueError):
+            logger.debug(f"{column} value cannot be converted to decimal: {value}")
+            return None
+
+        if len(number.as_tuple().digits) > precision:
+            logger.debug(f"{column} value does not fit NUMERIC({precision}, {scale}): {value}")
+            return None
+
+        return number
+
+    return convert
+
+
+def _converter(column: str, type_: type, parse: Callable[[str], Any]) -> Callable[[Any], Any]:
+    def convert(value):
+        if value is None or isinstance(value, type_):
+            return value
+        try:
+            return parse(value)
+        except (TypeError, ValueError):
+            logger.debug(f"{column} value cannot be converted to {type_.__name__}: {value}")
+            return None
+
+    return convert
+
+
+def _string(value: Any) -> Any:
+    return value if value is None or isinstance(value, str) else str(value)
@@ -0,0 +1,299 @@
+import logging
+import os
+import struct
+from collections import Counter
+from contextlib import nullcontext
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from data_utils.file_utils.fixed_width.file_spec import EBCDIC_TO_LATIN_1, FileFormatEnum, FileSpec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+Record = Union[Dict[str, Any], Tuple[Any, ...]]
+
+# What the raw newline and carriage return bytes become once an EBCDIC buffer is translated.
+_TRANSLATED_NEWLINE = chr(EBCDIC_TO_LATIN_1[ord("\n")])
+_TRANSLATED_CR = chr(EBCDIC_TO_LATIN_1[ord("\r")])
+
+
+class FixedWidthReader:
+    """
+    Streams records out of a fixed-width file using the FileSpec layout. One struct.Struct is compiled per
+    record type from FileSpec.struct_fmt_str, and the file is read in large binary chunks, so memory stays
+    flat no matter how large the file is.
+
+    EBCDIC files are translated a whole chunk at a time with one bytes.translate and one latin-1 decode, and
+    fields are sliced out of the decoded text, instead of decoding every field with the cp037 codec. Packed
+    (COMP-3) fields are sliced from the raw bytes, so their binary values are never translated.
+    """
+    def __init__(self, file_spec: FileSpec, as_dict: bool = True, decode: bool = True,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, record_length: int = None):
+        self.spec = file_spec
+        self.as_dict = as_dict
+        self.decode = decode
+        self.chunk_size = chunk_size
+        # Set for files that have no record delimiter, e.g. EBCDIC files transferred in binary mode.
+        self.record_length = record_length
+        self.encoding = file_spec.encoding
+        self.structs = {key: struct.Struct(fmt) for key, fmt in file_spec.struct_fmt_str.items()}
+        self.field_names = {key: self._unique_field_names(fields) for key, fields in file_spec.layout.items()}
+        self.packed_indexes = {
+            key: frozenset(i for i, field in enumerate(fields) if FileSpec.is_packed(field[6]))
+            for key, fields in file_spec.layout.items()
+        }
+        # Field offsets within a record, in struct order, for slicing translated EBCDIC text.
+        self.slices = {key: self._field_slices(fields) for key, fields in file_spec.layout.items()}
+        self.translate = decode and file_spec.file_format == FileFormatEnum.EBCDIC
+        self.record_count = 0
+        self.unknown_record_count = 0
+        # File offset just past the last record read, i.e. the record boundary to resume from.
+        self.offset = 0
+
+        self._pad = " ".encode(self.encoding)
+        self._record_type_slice = None
+        self._default_record_type = None
+        self._record_type_lookup = {}
+
+        if file_spec.record_type_start:
+            start = int(file_spec.record_type_start) - 1
+            self._record_type_slice = slice(start, start + int(file_spec.record_type_length))
+            self._record_type_lookup = {key.encode(self.encoding): key for key in self.structs}
+        elif len(self.structs) == 1:
+            self._default_record_type = next(iter(self.structs))
+        elif self.structs:
+            raise ValueError("Layout has multiple record types, so file_config must set record_type_start.")
+
+    @staticmethod
+    def _unique_field_names(fields: List[tuple]) -> List[str]:
+        """Layout names can repeat within a record type (FILLER, repeating groups). Repeats get a numbered
+        suffix, e.g. CIF-FILLER-1, CIF-FILLER-2, matching the NAME_1..NAME_n columns built in FileSpec.dtypes."""
+        totals = Counter(field[0] for field in fields)
+        seen = Counter()
+        names = []
+
+        for field in fields:
+            name = field[0]
+            if totals[name] > 1:
+                seen[name] += 1
+                name = f"{name}-{seen[name]}"
+            names.append(name)
+
+        return names
+
+    @staticmethod
+    def _field_slices(fields: List[tuple]) -> List[Tuple[int, int]]:
+        slices = []
+        offset = 0
+        for field in fields:
+            slices.append((offset, offset + field[4]))
+            offset += field[4]
+        return slices
+
+    def records(self, source: Union[str, os.PathLike, BinaryIO], start: int = 0,
+                end: int = None) -> Iterator[Tuple[str, Record]]:
+        """Yields (record_type, record) for every record in a file path or binary file object. Records
+        with a record type not in the layout are skipped and counted in unknown_record_count. start and end
+        limit reading to a byte range, which must begin and end on record boundaries. While iterating, offset
+        is the file offset just past the record last yielded."""
+        self.record_count = 0
+        self.unknown_record_count = 0
+        self.offset = start
+        parse = self.parse_record
+
+        with self._open(source) as f:
+            if start:
+                f.seek(start)
+
+            limit = end - start if end is not None else None
+
+            if self.translate:
+                for line, text in self._iter_translated(f, limit):
+                    record = parse(line, text)
+                    if record is not None:
+                        yield record
+            else:
+                lines = self._iter_fixed_records(f, limit) if self.record_length else self._iter_lines(f, limit)
+
+                for line in lines:
+                    record = parse(line)
+                    if record is not None:
+                        yield record
+
+        if self.unknown_record_count:
+            logger.info(f"Skipped {self.unknown_record_count} records with unknown record types.")
+
+        logger.info(f"Read {self.record_count} records.")
+
+    def parse_record(self, line: bytes, text: str = None) -> Optional[Tuple[str, Record]]:
+        """Splits a single raw record into its fields. Returns None for unknown record types. For EBCDIC files,
+        text is the record already translated to latin-1, otherwise it is translated here."""
+        record_type = self._record_type(line)
+        record_struct = self.structs.get(record_type)
+
+        if record_struct is None:
+            self.unknown_record_count += 1
+            logger.debug(f"Unknown record type {record_type!r}, skipping record.")
+            return None
+
+        if self.translate:
+            if text is None:
+                text = line.translate(EBCDIC_TO_LATIN_1).decode("latin-1")
+            values = self._slice_values(line, text, record_type, record_struct.size)
+        else:
+            if len(line) < record_struct.size:
+                # Trailing blanks are often trimmed from the last field, so pad back out to the full length.
+                line = line.rstrip(b"\r").ljust(record_struct.size, self._pad)
+
+            values = record_struct.unpack_from(line)
+
+            if self.decode:
+                values = self._decode_values(values, record_type)
+
+        self.record_count += 1
+
+        if self.as_dict:
+            return record_type, dict(zip(self.field_names[record_type], values))
+
+        return record_type, values
+
+    def _decode_values(self, values: Tuple[bytes, ...], record_type: str) -> Tuple[Any, ...]:
+        """Decodes text fields and strips whitespace. Packed fields are left as bytes for TypeCaster."""
+        encoding = self.encoding
+        packed = self.packed_indexes[record_type]
+
+        if not packed:
+            return tuple([value.decode(encoding).strip() for value in values])
+
+        return tuple([value if i in packed else value.decode(encoding).strip() for i, value in enumerate(values)])
+
+    def _slice_values(self, line: bytes, text: str, record_type: str, size: int) -> Tuple[Any, ...]:
+        """Slices stripped text fields out of a translated EBCDIC record, and packed fields out of its raw bytes."""
+        if len(line) < size:
+            line = line.rstrip(b"\r").ljust(size, self._pad)
+            text = text.rstrip(_TRANSLATED_CR).ljust(size)
+
+        slices = self.slices[record_type]
+        packed = self.packed_indexes[record_type]
+
+        if not packed:
+            return tuple([text[start:end].strip() for start, end in slices])
+
+        return tuple([line[start:end] if i in packed else text[start:end].strip()
+                      for i, (start, end) in enumerate(slices)])
+
+    def _record_type(self, line: bytes) -> Optional[str]:
+        if self._record_type_slice is None:
+            return self._default_record_type
+
+        raw = line[self._record_type_slice]
+        record_type = self._record_type_lookup.get(raw)
+
+        if record_type is None:
+            record_type = raw.decode(self.encoding, errors="replace").strip()
+
+        return record_type
+
+    def _iter_lines(self, f: BinaryIO, limit: int = None) -> Iterator[bytes]:
+        """Reads newline delimited records in chunks, carrying any partial record over to the next chunk."""
+        remainder = b""
+
+        for chunk in self._iter_chunks(f, self.chunk_size, limit):
+            lines = (remainder + chunk).split(b"\n") if remainder else chunk.split(b"\n")
+            remainder = lines.pop()
+
+            for line in lines:
+                self.offset += len(line) + 1
+                if line and line != b"\r":
+                    yield line
+
+        self.offset += len(remainder)
+        if remainder.strip():
+            yield remainder
+
+    def _iter_fixed_records(self, f: BinaryIO, limit: int = None) -> Iterator[bytes]:
+        """Reads undelimited records of exactly record_length bytes."""
+        record_length = self.record_length
+
+        for chunk in self._iter_record_chunks(f, limit):
+            for offset in range(0, len(chunk), record_length):
+                record = chunk[offset:offset + record_length]
+                self.offset += len(record)
+                yield record
+
+    def _iter_record_chunks(self, f: BinaryIO, limit: int = None) -> Iterator[bytes]:
+        """Reads chunks of whole record_length records. A trailing partial record comes last, on its own."""
+        record_length = self.record_length
+        # Keep chunks aligned to whole records so nothing is carried over between reads.
+        chunk_size = max(self.chunk_size // record_length, 1) * record_length
+        remainder = b""
+
+        for chunk in self._iter_chunks(f, chunk_size, limit):
+            if remainder:
+                chunk = remainder + chunk
+
+            end = len(chunk) - len(chunk) % record_length
+            remainder = chunk[end:]
+
+            if end:
+                yield chunk[:end] if remainder else chunk
+
+        if remainder:
+            logger.warning(f"File ended with a partial record of {len(remainder)} bytes.")
+            yield remainder
+
+    def _iter_translated(self, f: BinaryIO, limit: int = None) -> Iterator[Tuple[bytes, str]]:
+        """
+        Yields each raw EBCDIC record with its latin-1 text. Every chunk is translated and decoded once, and
+        records are sliced out of both at the same offsets. The translation is a byte-for-byte permutation, so
+        delimited chunks split on the translated newline exactly where the raw bytes split on newline.
+        """
+        if self.record_length:
+            record_length = self.record_length
+            for chunk in self._iter_record_chunks(f, limit):
+                text = chunk.translate(EBCDIC_TO_LATIN_1).decode("latin-1")
+                for offset in range(0, len(chunk), record_length):
+                    record = chunk[offset:offset + record_length]
+                    self.offset += len(record)
+                    yield record, text[offset:offset + record_length]
+            return
+
+        remainder = b""
+
+        for chunk in self._iter_chunks(f, self.chunk_size, limit):
+            buffer = remainder + chunk if remainder else chunk
+            lines = buffer.split(b"\n")
+            remainder = lines.pop()
+            # The remainder is translated again with the next chunk, it is at most one record.
+            texts = buffer.translate(EBCDIC_TO_LATIN_1).decode("latin-1").split(_TRANSLATED_NEWLINE)
+            texts.pop()
+
+            for line, text in zip(lines, texts):
+                self.offset += len(line) + 1
+                if line and line != b"\r":
+                    yield line, text
+
+        self.offset += len(remainder)
+        if remainder.strip():
+            yield remainder, remainder.translate(EBCDIC_TO_LATIN_1).decode("latin-1")
+
+    @staticmethod
+    def _iter_chunks(f: BinaryIO, chunk_size: int, limit: int = None) -> Iterator[bytes]:
+        """Reads chunks until the end of the file, or until limit bytes have been read."""
+        while limit is None or limit > 0:
+            chunk = f.read(chunk_size if limit is None else min(chunk_size, limit))
+            if not chunk:
+                break
+
+            if limit is not None:
+                limit -= len(chunk)
+
+            yield chunk
+
+    @staticmethod
+    def _open(source: Union[str, os.PathLike, BinaryIO]):
+        if isinstance(source, (str, os.PathLike)):
+            return open(source, "rb")
+
+        return nullcontext(source)
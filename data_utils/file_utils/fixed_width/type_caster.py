@@ -1,25 +1,127 @@
 import logging
 import re
-from array import array
 from datetime import datetime
-from typing import Union
-
-import pendulum
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional, Sequence, Union
 
+from data_utils.file_utils.fixed_width.comp3 import unpack_comp3
 from data_utils.file_utils.fixed_width.file_spec import FileSpec
 
 logger = logging.getLogger(__name__)
 
 
+Record = Union[Dict[str, Any], Sequence[Any]]
+
+
+# Zoned decimal overpunch: the last character of a signed zoned number carries both its last digit and its sign,
+# e.g. "12J" is -121. Maps each overpunch character to (digit, sign prefix).
+OVERPUNCH = {"{": ("0", ""), "}": ("0", "-")}
+OVERPUNCH.update({chr(ord("A") + i): (str(i + 1), "") for i in range(9)})
+OVERPUNCH.update({chr(ord("J") + i): (str(i + 1), "-") for i in range(9)})
+
+# Distinct raw values remembered per date field. Posting and expiration dates repeat heavily within a file.
+DATE_CACHE_SIZE = 4096
+
+
 class TypeCaster:
-    def __init__(self, file_spec: FileSpec):
+    def __init__(self, file_spec: FileSpec, date_cache_size: int = DATE_CACHE_SIZE):
         self.spec = file_spec
+        self.date_cache_size = date_cache_size
+        self._date_parsers = {}
+        # One caster per layout field, compiled once so no pic clause inspection happens per value.
+        self.plans = {record_type: [self.compile_field(*field) for field in fields]
+                      for record_type, fields in file_spec.layout.items()}
+
+    def cast_record(self, record_type: str, record: Record) -> Record:
+        """Casts every field of a record through the record type's compiled plan. Accepts a dict or sequence
+        of values in layout order (as yielded by FixedWidthReader) and returns the same shape."""
+        plan = self.plans[record_type]
+
+        if isinstance(record, dict):
+            return dict(zip(record, [cast(value) for cast, value in zip(plan, record.values())]))
+
+        return [cast(value) for cast, value in zip(plan, record)]
+
+    def compile_field(self, name: str, data_type: str, start: int, end: int, length: int, logic: str,
+                      pic_clause: str) -> Callable[[Any], Any]:
+        """
+        Returns a single-argument caster for a layout field with the same results as cast_data_types. The
+        data type branch, decimal split, packed scale and custom date format are resolved here, once.
+        """
+        if FileSpec.is_packed(pic_clause):
+            scale = FileSpec.pic_scale(pic_clause)
+            generic = self._compile_generic(name, data_type, pic_clause)
+
+            def cast_packed(value):
+                if isinstance(value, (bytes, bytearray)):
+                    return self._parse_packed_value(value, name, scale)
+                return generic(value)
+
+            return cast_packed
+        elif data_type == "N" and "." not in pic_clause and "V" not in pic_clause:
+            unpunch = self.unpunch
+
+            def cast_int(value):
+                try:
+                    value = int(unpunch(value))
+                except ValueError:
+                    logger.debug(f"{name} value with type N cannot be cast to int: {value}")
+                return None if value == "" else value
+
+            return cast_int
+        elif data_type == "N":
+            try:
+                integer_digits = self._decimal_integer_digits(pic_clause)
+            except (IndexError, ValueError):
+                # Unusual pic clause, let the generic path report it per value.
+                return self._compile_generic(name, data_type, pic_clause)
+
+            parse_decimal = self._parse_decimal_value
+            unpunch = self.unpunch
+
+            def cast_decimal(value):
+                value = unpunch(value)
+                try:
+                    value = parse_decimal(value, integer_digits)
+                except ValueError:
+                    logger.debug(f"{name} value with type N and decimal pic cannot be cast to float: {value}")
+                return None if value == "" else value
+
+            return cast_decimal
+        elif data_type == "D":
+            parse_date = self._date_parser(name, pic_clause)
+
+            def cast_date(value):
+                value = parse_date(value, _julian_year_prefix() if len(value) == 4 else None)
+                return None if value == "" else value
+
+            return cast_date
+        elif data_type == "T":
+            parse_time = self._parse_time_field
+
+            def cast_time(value):
+                value = parse_time(value)
+                return None if value == "" else value
+
+            return cast_time
+
+        def cast_string(value):
+            if isinstance(value, str):
+                value = value.replace("\u0000", "")
+            return None if value == "" else value
+
+        return cast_string
+
+    def _compile_generic(self, name: str, data_type: str, pic_clause: str) -> Callable[[Any], Any]:
+        return lambda value: self.cast_data_types(value, data_type, pic_clause, name)
 
     def cast_data_types(self, value: str, data_type: str, pic_clause: str, field_name: str) -> Union[str, int]:
         """Best effort try to cast data types to the types specified in the layout spec."""
-        if data_type == "N" and "." not in pic_clause and "V" not in pic_clause:
+        if isinstance(value, (bytes, bytearray)) and FileSpec.is_packed(pic_clause):
+            value = self._parse_packed_value(value, field_name, FileSpec.pic_scale(pic_clause))
+        elif data_type == "N" and "." not in pic_clause and "V" not in pic_clause:
             try:
-                value = int(value.replace("{", ""))
+                value = int(self.unpunch(value))
             except ValueError:
                 logger.debug(f"{field_name} value with type N cannot be cast to int: {value}")
         elif data_type == "N" and ("." in pic_clause or "V" in pic_clause):
@@ -36,29 +138,108 @@ class TypeCaster:
 
         return value
 
+    @staticmethod
+    def unpunch(value: str) -> str:
+        """
+        Moves a trailing overpunch sign out of a zoned number, e.g. "12J" to "-121" and "12{" to "120", using
+        OVERPUNCH. Values that are not digits followed by an overpunch character just have any "{" removed, as
+        older files padded with it.
+        """
+        punch = OVERPUNCH.get(value[-1:])
+
+        if punch is not None:
+            digits = value[:-1]
+            if not digits or digits.isdigit():
+                return f"{punch[1]}{digits}{punch[0]}"
+
+        return value.replace("{", "") if "{" in value else value
+
+    @staticmethod
+    def _parse_packed_value(value: bytes, field_name: str, scale: int) -> Union[bytes, int, float]:
+        """Unpacks raw COMP-3 bytes, applying the pic clause scale."""
+        try:
+            number = unpack_comp3(value)
+        except ValueError:
+            logger.debug(f"{field_name} packed value cannot be unpacked: {value!r}")
+            return value
+
+        return number / 10 ** scale if scale else number
+
     @staticmethod
     def _parse_decimal_field(value: str, field_name: str, pic_clause: str) -> Union[str, None]:
         """Uses decimal-based pic_clause to try and convert string to float."""
         parts = re.findall(r'\((.*?) *\)', pic_clause)
         try:
-            value = value.replace("{", "")
+            value = TypeCaster.unpunch(value)
             if "." in value:
                 value = float(value)
-            elif value.startswith(('-', '+')):
-                value = float(f"{value[0]}{value[1:int(parts[0]) + 1]}.{value[int(parts[0]) + 1:]}")
             else:
-                value = float(f"{value[:int(parts[0])]}.{value[int(parts[0]):]}")
+                value = TypeCaster._parse_decimal_value(value, int(parts[0]))
         except ValueError:
             logger.debug(
                 f"{field_name} value with type N and decimal pic cannot be cast to float: {value}")
 
         return value
 
+    @staticmethod
+    def _parse_decimal_value(value: str, integer_digits: int) -> float:
+        """Places the implied decimal point after integer_digits digits, allowing for a leading sign."""
+        if "." in value:
+            return float(value)
+        elif value.startswith(('-', '+')):
+            return float(f"{value[0]}{value[1:integer_digits + 1]}.{value[integer_digits + 1:]}")
+        else:
+            return float(f"{value[:integer_digits]}.{value[integer_digits:]}")
+
+    @staticmethod
+    def _decimal_integer_digits(pic_clause: str) -> int:
+        """Number of digits before the decimal point in a pic clause, e.g. 7 for 9(7)V9(2)."""
+        return int(re.findall(r'\((.*?) *\)', pic_clause)[0])
+
     def _parse_date_field(self, value: str, field_name: str, pic_clause: str) -> Union[str, None]:
         """Tries to parse a myriad of inconsistent TSYS date formats to a consistent ISO8601 date string."""
+        parse_date = self._date_parser(field_name, pic_clause)
+        return parse_date(value, _julian_year_prefix() if len(value) == 4 else None)
+
+    def _date_parser(self, field_name: str, pic_clause: str) -> Callable[[str, Optional[str]], Optional[str]]:
+        """
+        Returns the field's memoized date parser, keyed by raw value. The current decade, which 4 character
+        Julian dates depend on, is passed in as part of the key so cached values never go stale.
+        """
+        key = (field_name, pic_clause)
+        parser = self._date_parsers.get(key)
+
+        if parser is None:
+            date_format = self._date_format(field_name)
+
+            @lru_cache(maxsize=self.date_cache_size)
+            def parser(value: str, year_prefix: Optional[str]) -> Optional[str]:
+                return self._parse_date_value(value, field_name, pic_clause, date_format, year_prefix)
+
+            self._date_parsers[key] = parser
+
+        return parser
+
+    def date_cache_info(self) -> Dict[str, Any]:
+        """Hit/miss counters for each date field's cache, keyed by field name."""
+        return {field_name: parser.cache_info() for (field_name, _), parser in self._date_parsers.items()}
+
+    def clear_date_cache(self) -> None:
+        for parser in self._date_parsers.values():
+            parser.cache_clear()
+
+    def _date_format(self, field_name: str) -> Union[str, None]:
+        """Custom date format for the field from the file config "cast_fields" item, if any."""
+        return self.spec.cast_fields[field_name].get("date_format") if \
+            field_name in self.spec.cast_fields else None
+
+    @staticmethod
+    def _parse_date_value(value: str, field_name: str, pic_clause: str, date_format: Union[str, None],
+                          year_prefix: str = None) -> Union[str, None]:
+        """Parses a date value once the field's custom date format has been resolved."""
         if len(value) == 8:  # e.g. 20200813
             try:
-                value = self._parse_date_string(value)
+                value = TypeCaster._parse_date_string(value)
             except ValueError:
                 logger.debug(f"{field_name} value with type D cannot be converted to date: {value}")
                 value = None
@@ -70,20 +251,15 @@ class TypeCaster:
                 value = None
         elif len(value) == 6 or len(value) == 5:  # e.g. 082023
             try:
-                date_format = self.spec.cast_fields[field_name].get("date_format") if \
-                    field_name in self.spec.cast_fields else None
-                value = self._parse_expiration_date(value, date_format)
+                value = TypeCaster._parse_expiration_date(value, date_format)
             except ValueError:
                 logger.debug(f"{field_name} value with type D cannot be converted to date: {value}")
                 value = None
         elif len(value) == 4:  # e.g. 0153 last digit of year + julian day
-            date_format = self.spec.cast_fields[field_name].get("date_format") if \
-                field_name in self.spec.cast_fields else None
-
             if date_format and date_format in {"%y%m", "%m%y"}:
                 try:
                     exp_date = datetime.strptime(value, date_format)
-                    return self._parse_expiration_date(exp_date.strftime("%m%Y"))
+                    return TypeCaster._parse_expiration_date(exp_date.strftime("%m%Y"))
                 except ValueError:
                     logger.debug(f"{field_name} value with type D cannot be converted to date: {value}")
                     value = None
@@ -92,7 +268,7 @@ class TypeCaster:
             try:
                 year_last_digit = value[0]
                 julian_date = value[1:]
-                year_prefix = str(datetime.now().date().year)[:-1]
+                year_prefix = year_prefix or _julian_year_prefix()
                 full_julian_date = year_prefix + year_last_digit + julian_date
                 value = datetime.strptime(full_julian_date, '%Y%j').date().strftime('%Y-%m-%d')
             except ValueError:
@@ -101,13 +277,11 @@ class TypeCaster:
         elif len(value) == 3 and pic_clause == "9(6)":
             # Special case where dates are listed as 9(6), are really YYMM, but arrive as 3 digits: 923 instead of 0923
             value = "0" + value
-            date_format = self.spec.cast_fields[field_name].get("date_format") if \
-                field_name in self.spec.cast_fields else None
 
             if date_format and date_format in {"%y%m", "%m%y"}:
                 exp_date = datetime.strptime(value, date_format)
                 try:
-                    return self._parse_expiration_date(exp_date.strftime("%m%Y"))
+                    return TypeCaster._parse_expiration_date(exp_date.strftime("%m%Y"))
                 except ValueError:
                     logger.debug(
                         f"{field_name} value with type D cannot be converted to date: {value}")
@@ -159,27 +333,22 @@ class TypeCaster:
         if not exp:
             raise ValueError
         else:
+            import pendulum
             last_day = pendulum.parse(str(exp)).end_of("month")
             return last_day.strftime('%Y-%m-%d')
 
     @staticmethod
-    def unpack_number(number):
-        """ Unpack a COMP-3 number. """
-        a = array('B', number)
-        v = float(0)
-
-        # For all but last digit (half byte)
-        for i in a[:-1]:
-            v = (v * 100) + (((i & 0xf0) >> 4) * 10) + (i & 0xf)
-
-        # Last digit
-        i = a[-1]
-        v = (v * 10) + ((i & 0xf0) >> 4)
-
-        # Negative/Positve check.
-        if (i & 0xf) == 0xd:
-            v = -v
-
-        # Decimal points are determined by a COBOL program's PICtrue clauses, not
-        # the data on disk.
-        return int(v)
+    def unpack_number(number: bytes) -> Optional[int]:
+        """Unpack a COMP-3 number to an exact int. Decimal points are determined by a COBOL program's PIC
+        clauses, not the data on disk, see FileSpec.pic_scale. Both D and B sign nibbles are negative. Values
+        with invalid nibbles are logged and return None; use comp3.unpack_comp3 to have them raise."""
+        try:
+            return unpack_comp3(number)
+        except ValueError as e:
+            logger.warning(e)
+            return None
+
+
+def _julian_year_prefix() -> str:
+    """First three digits of the current year, e.g. "202", used to expand 4 character Julian dates."""
+    return str(datetime.now().date().year)[:-1]
@@ -1,14 +1,73 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
 import gnupg
 
+logger = logging.getLogger(__name__)
+
+# Bytes copied into gpg's stdin per write when streaming.
+STREAM_BLOCK_SIZE = 1024 * 1024
+
 
 class FileDecryptError(Exception):
     pass
 
 
-def decrypt_pgp(input_filepath: str, output_filepath: str, private_key: str, passphrase: str) -> str:
+class PGPResult(NamedTuple):
+    input_filepath: str
+    output_filepath: str
+    seconds: float
+    error: Optional[Exception] = None
+
+
+class PGPBatchError(FileDecryptError):
+    """Raised by decrypt_many/encrypt_many once every file has been tried, listing all the files that failed."""
+    def __init__(self, results: List[PGPResult]):
+        self.results = results
+        self.failures = [result for result in results if result.error is not None]
+        super().__init__(f"{len(self.failures)} of {len(results)} files failed: " +
+                         "; ".join(f"{result.input_filepath}: {result.error}" for result in self.failures))
+
+
+# One GPG instance per home directory, and the fingerprints of every key already imported into it, so a key is
+# imported once per process no matter how many files use it.
+_keyrings: Dict[str, gnupg.GPG] = {}
+_imported_keys: Dict[Tuple[str, str], List[str]] = {}
+_keyring_lock = threading.Lock()
+
+
+def prepare_keyring(key: str, homedir: str = None) -> Tuple[gnupg.GPG, List[str]]:
+    """Returns the shared GPG instance for homedir with key imported, and the key's fingerprints. Keys already
+    imported by this process are not imported again."""
+    key_hash = hashlib.sha256(key.encode()).hexdigest()
+
+    with _keyring_lock:
+        gpg = _keyrings.get(homedir)
+        if gpg is None:
+            gpg = _keyrings[homedir] = gnupg.GPG(gnupghome=homedir)
+
+        fingerprints = _imported_keys.get((homedir, key_hash))
+        if fingerprints is None:
+            result = gpg.import_keys(key)
+            fingerprints = [item["fingerprint"] for item in result.results if item.get("fingerprint")]
+            if not fingerprints:
+                raise FileDecryptError(f"Could not import PGP key: {result.stderr}")
+            _imported_keys[(homedir, key_hash)] = fingerprints
+
+    return gpg, fingerprints
+
+
+def decrypt_pgp(input_filepath: str, output_filepath: str, private_key: str, passphrase: str,
+                homedir: str = None) -> str:
     """Decrypt PGP file using private key and passphrase."""
-    gpg = gnupg.GPG()
-    gpg.import_keys(private_key)
+    gpg, _ = prepare_keyring(private_key, homedir)
 
     with open(input_filepath, "rb") as encrypted_f:
         result = gpg.decrypt_file(encrypted_f,
@@ -21,16 +80,214 @@ def decrypt_pgp(input_filepath: str, output_filepath: str, private_key: str, pas
             raise FileDecryptError(result.stderr)
 
 
-def encrypt_pgp(input_filepath: str, output_filepath: str, public_key: str) -> str:
+def encrypt_pgp(input_filepath: str, output_filepath: str, public_key: str, homedir: str = None) -> str:
     """Encrypt PGP file using public key."""
-    gpg = gnupg.GPG()
-    key = gpg.import_keys(public_key)
+    gpg, fingerprints = prepare_keyring(public_key, homedir)
 
-    recipient = key.results[0]["fingerprint"]
+    recipient = fingerprints[0]
 
     with open(input_filepath, "rb") as f:
-        result = gpg.encrypt_file(file=f, recipients=[recipient], output=output_filepath, always_trust=True)
+        result = gpg.encrypt_file(f, recipients=[recipient], output=output_filepath, always_trust=True)
         if result.ok:
             return output_filepath
         else:
             raise FileDecryptError(result.stderr)
+
+
+def decrypt_many(input_filepaths: Iterable[str], output_dir: str, private_key: str, passphrase: str,
+                 workers: int = None, homedir: str = None) -> List[PGPResult]:
+    """
+    Decrypts many files into output_dir across a pool of workers, each running its own gpg process against one
+    shared keyring, with the key imported once up front. Output names drop a .pgp, .gpg or .asc extension.
+    Returns a result per file in input order, or raises PGPBatchError listing every failure once all files
+    have been tried.
+    """
+    gpg, fingerprints = prepare_keyring(private_key, homedir)
+    _unlock_key(gpg, fingerprints[0], passphrase)
+
+    def decrypt(input_filepath: str, output_filepath: str) -> None:
+        with decrypt_stream(input_filepath, private_key, passphrase, homedir) as stream, \
+                open(output_filepath, "wb") as f:
+            shutil.copyfileobj(stream, f, STREAM_BLOCK_SIZE)
+
+    return _run_many(decrypt, input_filepaths, output_dir, _decrypted_name, workers)
+
+
+def encrypt_many(input_filepaths: Iterable[str], output_dir: str, public_key: str, workers: int = None,
+                 homedir: str = None) -> List[PGPResult]:
+    """Encrypts many files into output_dir as ASCII armored .pgp files, like encrypt_pgp. Runs like
+    decrypt_many."""
+    prepare_keyring(public_key, homedir)
+
+    def encrypt(input_filepath: str, output_filepath: str) -> None:
+        with encrypt_stream(input_filepath, public_key, homedir, armor=True) as stream, \
+                open(output_filepath, "wb") as f:
+            shutil.copyfileobj(stream, f, STREAM_BLOCK_SIZE)
+
+    return _run_many(encrypt, input_filepaths, output_dir, lambda name: f"{name}.pgp", workers)
+
+
+def _run_many(process: Callable[[str, str], None], input_filepaths: Iterable[str], output_dir: str,
+              output_name: Callable[[str], str], workers: int = None) -> List[PGPResult]:
+    input_filepaths = list(input_filepaths)
+    # gpg does the work in its own process, so threads are enough to keep every core busy.
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    def timed(input_filepath: str) -> PGPResult:
+        output_filepath = os.path.join(output_dir, output_name(os.path.basename(input_filepath)))
+        started = time.monotonic()
+        try:
+            process(input_filepath, output_filepath)
+            return PGPResult(input_filepath, output_filepath, time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Error processing {input_filepath}: {e}")
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+            return PGPResult(input_filepath, output_filepath, time.monotonic() - started, e)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(timed, input_filepaths))
+
+    logger.info(f"Processed {len(results)} files with {workers} workers in {time.monotonic() - started:.1f}s.")
+
+    if any(result.error is not None for result in results):
+        raise PGPBatchError(results)
+
+    return results
+
+
+def _unlock_key(gpg: gnupg.GPG, fingerprint: str, passphrase: str) -> None:
+    """Decrypts a throwaway message so gpg-agent caches the key's passphrase. Concurrent gpg processes asking the
+    agent for the same uncached passphrase can fail with "Bad passphrase"."""
+    message = gpg.encrypt("unlock", fingerprint, always_trust=True)
+    if not gpg.decrypt(str(message), passphrase=passphrase).ok:
+        raise FileDecryptError(f"Could not unlock PGP key {fingerprint}, check the passphrase.")
+
+
+def _decrypted_name(name: str) -> str:
+    root, extension = os.path.splitext(name)
+    return root if extension.lower() in (".pgp", ".gpg", ".asc") else f"{name}.decrypted"
+
+
+def decrypt_stream(source: Union[str, BinaryIO], private_key: str, passphrase: str,
+                   homedir: str = None) -> "PGPStream":
+    """
+    Decrypts a PGP file path or readable binary stream (e.g. an S3 response body) on the fly. Returns a readable
+    binary stream of plaintext, which can be passed straight to FixedWidthReader.records, so plaintext is never
+    written to disk. Use as a context manager; closing checks gpg's exit status and raises FileDecryptError.
+    """
+    gpg, _ = prepare_keyring(private_key, homedir)
+    args = ["--decrypt", "--ignore-mdc-error", "--passphrase-fd", "0"]
+    # gpg reads the passphrase line from stdin before the ciphertext.
+    return PGPStream(gpg, args, source, f"{passphrase}\n".encode())
+
+
+def encrypt_stream(source: Union[str, BinaryIO], public_key: str, homedir: str = None,
+                   armor: bool = False) -> "PGPStream":
+    """Encrypts a file path or readable binary stream on the fly, returning a readable stream of ciphertext, e.g.
+    for S3Connector.upload_fileobj. Set armor for ASCII armored output."""
+    gpg, fingerprints = prepare_keyring(public_key, homedir)
+    args = ["--encrypt", "--recipient", fingerprints[0], "--trust-model", "always"] + (["--armor"] if armor else [])
+    return PGPStream(gpg, args, source)
+
+
+class PGPStream:
+    """
+    Readable binary stream over a gpg subprocess. A feeder thread copies the source into gpg's stdin and another
+    drains stderr, so gpg never blocks on a full pipe while the caller reads stdout at its own pace.
+    """
+    def __init__(self, gpg: gnupg.GPG, args: List[str], source: Union[str, BinaryIO], preamble: bytes = b""):
+        command = [gpg.gpgbinary, "--batch", "--yes", "--no-tty"]
+        if gpg.gnupghome:
+            command += ["--homedir", gpg.gnupghome]
+        if gpg.version and gpg.version >= (2, 1):
+            command += ["--pinentry-mode", "loopback"]
+
+        self._source = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+        self._owns_source = isinstance(source, (str, os.PathLike))
+        self._process = subprocess.Popen(command + args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        self._stderr = []
+        self._feed_error = None
+        self._eof = False
+        self._closed = False
+
+        self._feeder = threading.Thread(target=self._feed, args=(preamble,), daemon=True)
+        self._drainer = threading.Thread(target=self._drain, daemon=True)
+        self._feeder.start()
+        self._drainer.start()
+
+    def _feed(self, preamble: bytes) -> None:
+        stdin = self._process.stdin
+        try:
+            if preamble:
+                stdin.write(preamble)
+            for block in iter(lambda: self._source.read(STREAM_BLOCK_SIZE), b""):
+                stdin.write(block)
+        except BrokenPipeError:
+            # gpg exited early, its exit status and stderr explain why.
+            pass
+        except Exception as e:
+            self._feed_error = e
+        finally:
+            try:
+                stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def _drain(self) -> None:
+        self._stderr.append(self._process.stderr.read())
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._process.stdout.read(size)
+        if not data and size != 0:
+            self._eof = True
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self._process.stdout.readinto(buffer)
+        if not count and len(buffer):
+            self._eof = True
+        return count
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        """Waits for gpg to finish and raises FileDecryptError if it or the source failed."""
+        if self._closed:
+            return
+        self._closed = True
+
+        self._process.stdout.close()
+        self._feeder.join()
+        returncode = self._process.wait()
+        self._drainer.join()
+
+        if self._owns_source:
+            self._source.close()
+
+        if self._feed_error is not None:
+            raise FileDecryptError(f"Error reading PGP stream source: {self._feed_error}")
+        if returncode != 0 and self._eof:
+            raise FileDecryptError(b"".join(self._stderr).decode(errors="replace"))
+        elif returncode != 0:
+            # Closed before the end, so gpg failing to write the rest isn't an error in the data that was read.
+            logger.debug(f"gpg exited with {returncode} after the stream was closed early.")
+
+    def __enter__(self) -> "PGPStream":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+            return
+
+        # Already failing, don't mask the original error with gpg's.
+        try:
+            self.close()
+        except FileDecryptError as e:
+            logger.debug(f"gpg also failed: {e}")
+
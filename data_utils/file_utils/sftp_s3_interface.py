@@ -1,20 +1,46 @@
+import fnmatch
 import logging
+import os
+import posixpath
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 from datetime import datetime
+from typing import Any, Iterable, List, NamedTuple, Optional, Union
 
-from data_utils.connectors.s3_connector import S3Connector
+from data_utils.connectors.s3_connector import DEFAULT_MAX_CONCURRENCY, DEFAULT_PART_SIZE, S3Connector
 from data_utils.connectors.sftp_connector import SftpConnector
 from data_utils.settings import Settings
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TRANSFER_WORKERS = 4
+
 
 class TransferException(Exception):
     pass
 
 
+class TransferResult(NamedTuple):
+    filename: str
+    s3_key: str
+    local_path: Optional[str]
+    bytes: int
+    seconds: float
+    attempts: int
+    error: Optional[Exception] = None
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
 class SftpS3Interface:
     def __init__(self, settings: Settings, vendor: str = None):
         self.section = f"{vendor}_sftp" if vendor else "sftp"
+        self.vendor = vendor
         self.settings = settings
         logger.info("Connecting to SFTP...")
         self.sftp_conn = SftpConnector(self.settings, vendor=vendor)
@@ -24,15 +50,13 @@ class SftpS3Interface:
     def transfer_sftp_to_s3(self, filename: str, download_path: str, s3_bucket: str, s3_key: str,
                             sftp_directory: str) -> str:
         """Download file from SFTP server, then upload it to S3."""
-        self.sftp_conn.chdir(sftp_directory)
-
         t1 = datetime.now()
         logger.info(f"Transfer start time: {t1}")
 
         download_file_path = f"{download_path}{filename}"
 
         try:
-            self.sftp_conn.get(filename, download_file_path)
+            self.sftp_conn.get(posixpath.join(sftp_directory, filename), download_file_path)
 
             if self.settings.getboolean("file_config", "use_s3"):
                 self.s3_client.upload_file(download_file_path, s3_bucket, s3_key)
@@ -47,8 +71,6 @@ class SftpS3Interface:
 
     def transfer_s3_to_sftp(self, s3_bucket: str, s3_key: str, file_name: str, sftp_directory: str) -> str:
         """Download file from S3, then put it on SFTP server"""
-        self.sftp_conn.chdir(sftp_directory)
-
         t1 = datetime.now()
         logger.info(f"Transfer start time: {t1}")
 
@@ -57,7 +79,7 @@ class SftpS3Interface:
         self.s3_client.download_file(s3_bucket, s3_key, file_path)
 
         try:
-            self.sftp_conn.put(file_path)
+            self.sftp_conn.put(file_path, posixpath.join(sftp_directory, file_name))
         except Exception as e:
             logger.error(f"Error transferring file {file_name}: {e}.")
             raise TransferException(e)
@@ -66,3 +88,246 @@ class SftpS3Interface:
         logger.info(f"File transfer took {t2 - t1}")
 
         return file_name
+
+    def stream_sftp_to_s3(self, filename: str, sftp_directory: str, s3_bucket: str, s3_key: str,
+                          part_size: int = DEFAULT_PART_SIZE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                          retry_count: int = 3) -> TransferResult:
+        """
+        Copies a file from SFTP straight into an S3 multipart upload without touching local disk. The remote
+        file is read a part at a time with pipelined SFTP reads, and memory stays around part_size x
+        (max_concurrency + 1). A failed attempt restarts from the beginning of the file.
+        """
+        remote_path = posixpath.join(sftp_directory, filename)
+        started = time.monotonic()
+        attempts = 0
+
+        while True:
+            attempts += 1
+            try:
+                size = self.sftp_conn.stat(remote_path).st_size
+                with self.sftp_conn.open(remote_path, "rb") as f:
+                    self.s3_client.upload_fileobj(_SftpPartReader(f, size, part_size), s3_bucket, s3_key,
+                                                  part_size, max_concurrency)
+                break
+            except Exception as e:
+                logger.warning(f"Attempt {attempts} of {retry_count} streaming {filename} to s3 failed: {e}.")
+                if attempts >= retry_count:
+                    raise TransferException(e)
+
+        result = TransferResult(filename, s3_key, None, size, time.monotonic() - started, attempts)
+        logger.info(f"Streamed {filename} to s3: {size} bytes in {result.seconds:.1f}s "
+                    f"({result.bytes_per_second / 1024 ** 2:.1f} MB/s).")
+        return result
+
+    def stream_s3_to_sftp(self, s3_bucket: str, s3_key: str, file_name: str, sftp_directory: str,
+                          retry_count: int = 3) -> TransferResult:
+        """Copies an S3 object straight to the SFTP server from the S3 response stream, without a local copy."""
+        remote_path = posixpath.join(sftp_directory, file_name)
+        started = time.monotonic()
+        attempts = 0
+
+        while True:
+            attempts += 1
+            try:
+                response = self.s3_client.get_object(s3_bucket, s3_key)
+                size = response["ContentLength"]
+                with closing(response["Body"]) as body:
+                    self.sftp_conn.putfo(body, remote_path, file_size=size)
+                break
+            except Exception as e:
+                logger.warning(f"Attempt {attempts} of {retry_count} streaming {s3_key} to sftp failed: {e}.")
+                if attempts >= retry_count:
+                    raise TransferException(e)
+
+        result = TransferResult(file_name, s3_key, None, size, time.monotonic() - started, attempts)
+        logger.info(f"Streamed {s3_key} to sftp: {size} bytes in {result.seconds:.1f}s "
+                    f"({result.bytes_per_second / 1024 ** 2:.1f} MB/s).")
+        return result
+
+    def list_sftp_files(self, sftp_directory: str, pattern: str = "*") -> List[str]:
+        """File names in an SFTP directory matching a glob pattern, e.g. "*.pgp"."""
+        return sorted(fnmatch.filter(self.sftp_conn.listdir(sftp_directory), pattern))
+
+    def transfer_many_sftp_to_s3(self, files: Union[str, Iterable[str]], sftp_directory: str, download_path: str,
+                                 s3_bucket: str, s3_prefix: str, workers: int = DEFAULT_TRANSFER_WORKERS,
+                                 retry_count: int = 3) -> List[TransferResult]:
+        """
+        Transfers many files from an SFTP directory to S3 concurrently. files is a list of file names or a glob
+        pattern matched against the directory. Each worker thread uses its own SFTP session (paramiko sessions
+        are not thread-safe), and sessions are reused across files. A failed file is retried up to retry_count
+        times on a fresh session without affecting the others. Returns a result per file in completion order,
+        and raises TransferException listing every failed file once all transfers have finished.
+        """
+        filenames = self.list_sftp_files(sftp_directory, files) if isinstance(files, str) else list(files)
+        workers = max(min(workers, len(filenames)), 1)
+        sessions = _SftpSessionPool(self, workers)
+        results = []
+
+        logger.info(f"Transferring {len(filenames)} files from {sftp_directory} with {workers} workers.")
+        started = time.monotonic()
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._transfer_with_retry, sessions, filename, sftp_directory, download_path,
+                                    s3_bucket, posixpath.join(s3_prefix, filename), retry_count)
+                    for filename in filenames
+                ]
+
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+
+                    if result.error is None:
+                        logger.info(f"Transferred {result.filename}: {result.bytes} bytes in "
+                                    f"{result.seconds:.1f}s ({result.bytes_per_second / 1024 ** 2:.1f} MB/s).")
+        finally:
+            sessions.close()
+
+        total_bytes = sum(result.bytes for result in results)
+        elapsed = time.monotonic() - started
+        logger.info(f"Transferred {total_bytes} bytes in {elapsed:.1f}s "
+                    f"({total_bytes / elapsed / 1024 ** 2 if elapsed else 0:.1f} MB/s).")
+
+        failed = [result for result in results if result.error is not None]
+        if failed:
+            error = TransferException(
+                f"{len(failed)} of {len(results)} files failed: " +
+                ", ".join(f"{result.filename} ({result.error})" for result in failed))
+            error.results = results
+            raise error
+
+        return results
+
+    def _transfer_with_retry(self, sessions: "_SftpSessionPool", filename: str, sftp_directory: str,
+                             download_path: str, s3_bucket: str, s3_key: str, retry_count: int) -> TransferResult:
+        download_file_path = os.path.join(download_path, filename)
+        remote_path = posixpath.join(sftp_directory, filename)
+        use_s3 = self.settings.getboolean("file_config", "use_s3")
+        error = None
+        attempts = 0
+        started = time.monotonic()
+
+        while attempts < retry_count:
+            attempts += 1
+            session = None
+            healthy = False
+
+            try:
+                session = sessions.acquire()
+                session.get(remote_path, download_file_path)
+                healthy = True
+
+                if use_s3:
+                    self.s3_client.upload_file(download_file_path, s3_bucket, s3_key)
+
+                return TransferResult(filename, s3_key, download_file_path, os.path.getsize(download_file_path),
+                                      time.monotonic() - started, attempts)
+            except Exception as e:
+                error = e
+                logger.warning(f"Attempt {attempts} of {retry_count} transferring {filename} failed: {e}.")
+            finally:
+                if session is not None:
+                    sessions.release(session, healthy)
+
+        logger.error(f"Error transferring file {filename}: {error}.")
+        return TransferResult(filename, s3_key, download_file_path, 0, time.monotonic() - started, attempts, error)
+
+
+class _SftpSessionPool:
+    """SFTP sessions for transfer workers. The interface's own connection is lent out first, and extra sessions
+    are opened on demand up to size. Sessions released after an error are dropped and replaced on next use."""
+    def __init__(self, interface: SftpS3Interface, size: int):
+        self.interface = interface
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._idle.put(interface.sftp_conn)
+        self._open = 1
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> SftpConnector:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._open < self.size
+            if can_open:
+                self._open += 1
+
+        if not can_open:
+            # Every worker holds at most one session, so one is always idle or about to be.
+            return self._idle.get()
+
+        try:
+            session = SftpConnector(self.interface.settings, vendor=self.interface.vendor)
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+
+        with self._lock:
+            self._opened.append(session)
+        return session
+
+    def release(self, session: SftpConnector, healthy: bool = True) -> None:
+        if healthy:
+            self._idle.put(session)
+            return
+
+        with self._lock:
+            self._open -= 1
+            if session in self._opened:
+                self._opened.remove(session)
+                session.close()
+
+    def close(self) -> None:
+        """Closes the extra sessions, leaving the interface's own connection open."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+
+        for session in opened:
+            session.close()
+
+
+class _SftpPartReader:
+    """
+    Read-only file object over a remote SFTP file that fetches one part at a time with SFTPFile.readv, which
+    pipelines the part's SFTP read requests instead of waiting on each round trip. Unlike SFTPFile.prefetch
+    of the whole file, at most one part is held, so a slow S3 upload can't pile the file up in memory.
+    """
+    def __init__(self, sftp_file: Any, size: int, part_size: int):
+        self.sftp_file = sftp_file
+        self.size = size
+        self.part_size = part_size
+        self._offset = 0
+        self._buffer = memoryview(b"")
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.size
+
+        chunks = []
+        while size > 0:
+            if not self._buffer:
+                if self._offset >= self.size:
+                    break
+                self._fill()
+
+            chunk = self._buffer[:size]
+            self._buffer = self._buffer[len(chunk):]
+            chunks.append(chunk)
+            size -= len(chunk)
+
+        return b"".join(chunks)
+
+    def _fill(self) -> None:
+        length = min(self.part_size, self.size - self._offset)
+        data = b"".join(self.sftp_file.readv([(self._offset, length)]))
+        if not data:
+            raise IOError(f"Unexpected end of remote file at byte {self._offset} of {self.size}.")
+
+        self._offset += len(data)
+        self._buffer = memoryview(data)
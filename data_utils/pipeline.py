@@ -0,0 +1,207 @@
+import asyncio
+import collections.abc
+import inspect
+import logging
+import queue
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 4
+
+# How often blocked queue operations wake up to check for cancellation, in seconds.
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """Raised inside a stage when another stage failed or the pipeline was interrupted."""
+    pass
+
+
+def run_pipeline(stages: List[Callable], queue_size: int = DEFAULT_QUEUE_SIZE, mode: str = "threads") -> Any:
+    """
+    Runs stages concurrently, connected by bounded queues of batches. The first stage is called with no
+    arguments and returns an iterable of batches (e.g. a generator). Every later stage is called with an iterator
+    over the previous stage's batches; middle stages return an iterable of batches, and the last stage's return
+    value is returned from run_pipeline.
+
+    A full queue blocks the stage feeding it, so a fast producer never gets more than queue_size batches ahead.
+    If any stage raises, the others are cancelled (blocked stages see PipelineCancelled, generators are closed so
+    their finally blocks run) and the first error is re-raised.
+
+    mode "threads" runs each stage in its own thread. mode "asyncio" runs each stage as a task on one event
+    loop; stages may then be async generators, and later stages receive async iterators.
+    """
+    if mode == "threads":
+        return _ThreadedPipeline(stages, queue_size).run()
+    elif mode == "asyncio":
+        return asyncio.run(_run_async(stages, queue_size))
+
+    raise ValueError(f"Unknown pipeline mode: {mode}")
+
+
+class _ThreadedPipeline:
+    def __init__(self, stages: List[Callable], queue_size: int):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages[1:]]
+        self.cancelled = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.result = None
+        self._lock = threading.Lock()
+
+    def run(self) -> Any:
+        threads = [threading.Thread(target=self._run_stage, args=(i,), name=f"pipeline-{_name(stage)}", daemon=True)
+                   for i, stage in enumerate(self.stages)]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(_POLL_INTERVAL)
+        except BaseException as e:
+            # e.g. KeyboardInterrupt, stop every stage before giving up.
+            self._fail(e)
+            for thread in threads:
+                thread.join()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+    def _run_stage(self, index: int) -> None:
+        stage = self.stages[index]
+        output = None
+
+        try:
+            output = stage() if index == 0 else stage(self._iter_queue(self.queues[index - 1]))
+
+            if index == len(self.stages) - 1:
+                # A lazy iterator (generator, map, filter) as the last stage still needs draining for its side
+                # effects.
+                self.result = list(output) if isinstance(output, collections.abc.Iterator) else output
+                # Stops any upstream stage still producing batches nobody will read.
+                self.cancelled.set()
+                return
+
+            if output is None:
+                raise TypeError(f"Pipeline stage {_name(stage)} must return an iterable of batches.")
+
+            for batch in output:
+                self._put(self.queues[index], batch)
+            self._put(self.queues[index], _DONE)
+        except PipelineCancelled:
+            pass
+        except BaseException as e:
+            logger.error(f"Pipeline stage {_name(stage)} failed: {e}")
+            self._fail(e)
+        finally:
+            if inspect.isgenerator(output):
+                output.close()
+
+    def _iter_queue(self, q: queue.Queue) -> Iterator[Any]:
+        while True:
+            try:
+                batch = q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                if self.cancelled.is_set():
+                    raise PipelineCancelled()
+                continue
+
+            if batch is _DONE:
+                return
+            yield batch
+
+    def _put(self, q: queue.Queue, batch: Any) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise PipelineCancelled()
+            try:
+                q.put(batch, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self.cancelled.set()
+
+
+async def _run_async(stages: List[Callable], queue_size: int) -> Any:
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages[1:]]
+    last = len(stages) - 1
+
+    async def run_stage(index: int) -> Any:
+        stage = stages[index]
+        output = stage() if index == 0 else stage(_aiter_queue(queues[index - 1]))
+
+        if index == last:
+            if inspect.isawaitable(output):
+                return await output
+            elif inspect.isasyncgen(output):
+                return [batch async for batch in output]
+            return list(output) if isinstance(output, collections.abc.Iterator) else output
+
+        if output is None:
+            raise TypeError(f"Pipeline stage {_name(stage)} must return an iterable of batches.")
+
+        try:
+            async for batch in _aiter(output):
+                await queues[index].put(batch)
+            await queues[index].put(_DONE)
+        finally:
+            if inspect.isasyncgen(output):
+                await output.aclose()
+            elif inspect.isgenerator(output):
+                output.close()
+
+    tasks = [asyncio.ensure_future(run_stage(i)) for i in range(len(stages))]
+    pending = set(tasks)
+    error = None
+
+    try:
+        # Runs until a stage fails or the last stage finishes, which may be before upstream stages run dry.
+        while pending and error is None and not tasks[-1].done():
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            error = next((task.exception() for task in done if task.exception() is not None), None)
+    finally:
+        # Cancelling unblocks stages waiting on a full or empty queue, and runs their cleanup.
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if error is not None:
+        raise error
+
+    return tasks[-1].result()
+
+
+async def _aiter_queue(q: asyncio.Queue) -> AsyncIterator[Any]:
+    while True:
+        batch = await q.get()
+        if batch is _DONE:
+            return
+        yield batch
+
+
+async def _aiter(iterable: Any) -> AsyncIterator[Any]:
+    """Iterates async and plain iterables alike. Plain iterables block the loop while producing each batch."""
+    if hasattr(iterable, "__aiter__"):
+        async for batch in iterable:
+            yield batch
+    else:
+        for batch in iterable:
+            yield batch
+            await asyncio.sleep(0)
+
+
+def _name(stage: Callable) -> str:
+    return getattr(stage, "__name__", type(stage).__name__)
@@ -2,21 +2,47 @@ import argparse
 import logging.config
 
 from data_utils.settings import Settings
-from data_utils.connectors.slack_connector import SlackConnector
 
 logger = logging.getLogger(__name__)
 
 
 class Script:
+    """
+    Base class for jobs. By default run() calls extract(), transform() and load() one after another.
+
+    Set streaming = True to run them concurrently as a pipeline of batches instead (see
+    data_utils.pipeline.run_pipeline): extract() returns an iterable of batches, transform(batches) takes an
+    iterator of batches and returns one, and load(batches) consumes them. Stages are connected by queues of
+    queue_size batches, so memory holds a few batches rather than the whole dataset. stream_mode "threads" runs
+    each stage in a thread; "asyncio" runs them on an event loop, where stages can be async generators. If
+    transform is not overridden, batches go straight from extract to load.
+    """
+    streaming = False
+    stream_mode = "threads"
+    queue_size = 4
+
     def __init__(self, args=None):
         self.parser = argparse.ArgumentParser()
         self._configure_args()
         self.args = self.parser.parse_args(args or [])
         self.settings = Settings(self.args.config) if getattr(self.args, "config", None) else None
-        self.slack_connector = SlackConnector(self.settings)
+        self._slack_connector = None
 
         logging.config.fileConfig(self.settings, disable_existing_loggers=False)
 
+    @property
+    def slack_connector(self):
+        """SlackConnector, created the first time a script sends an alert."""
+        if self._slack_connector is None:
+            from data_utils.connectors.slack_connector import SlackConnector
+            self._slack_connector = SlackConnector(self.settings)
+
+        return self._slack_connector
+
+    @slack_connector.setter
+    def slack_connector(self, slack_connector):
+        self._slack_connector = slack_connector
+
     def __call__(self, *args, **kwargs):
         return self.run()
 
@@ -31,10 +57,21 @@ class Script:
         pass
 
     def run(self):
+        if self.streaming:
+            from data_utils.pipeline import run_pipeline
+            return run_pipeline(self.stream_stages(), queue_size=self.queue_size, mode=self.stream_mode)
+
         self.extract()
         self.transform()
         self.load()
 
+    def stream_stages(self):
+        """Stages run in streaming mode. Override to add stages, e.g. [extract, parse, transform, load]."""
+        if type(self).transform is Script.transform:
+            return [self.extract, self.load]
+
+        return [self.extract, self.transform, self.load]
+
     def extract(self):
         """Override with your code"""
         pass
@@ -1,18 +1,56 @@
-import boto3
+import atexit
+import json
 import logging
 import os
+import tempfile
+import threading
+import time
 
-from botocore.exceptions import ClientError
 from configparser import ConfigParser, BasicInterpolation
 from dotenv import find_dotenv, load_dotenv
 
 logger = logging.getLogger(__name__)
 
+# GetParameters accepts at most 10 names per call.
+SSM_BATCH_SIZE = 10
+
+# TTL in seconds for values cached on disk when no cache_ttl is given, so a rotated secret is picked up by the next
+# process within this window instead of living in the cache file indefinitely.
+DEFAULT_CACHE_FILE_TTL = 15 * 60
+
 
 class Settings(ConfigParser):
     class EnvironmentInterpolation(BasicInterpolation):
-        def __init__(self):
-            self.ssm = boto3.client("ssm", region_name="us-east-1")
+        """
+        Resolves environment variable overrides, ssm: parameters and $VARS. SSM values are cached after the
+        first fetch, for cache_ttl seconds if set, otherwise for the life of the process. With cache_file and a
+        Fernet cache_key, cached values are also kept encrypted on disk for the next process to start warm; disk
+        caching always expires values, after DEFAULT_CACHE_FILE_TTL seconds unless cache_ttl is set. The file is
+        written once per prefetch, and values fetched one at a time are written at exit or on flush_cache().
+        """
+        def __init__(self, cache_ttl: float = None, cache_file: str = None, cache_key: str = None):
+            self._ssm = None
+            self.cache_ttl = DEFAULT_CACHE_FILE_TTL if cache_file and cache_ttl is None else cache_ttl
+            self.cache_file = cache_file
+            self.cache_key = cache_key
+            self.hits = 0
+            self.misses = 0
+            self._cache = {}  # name: (value, fetched at, epoch seconds)
+            self._dirty = False
+            self._lock = threading.Lock()
+
+            if cache_file:
+                self._load_cache_file()
+                atexit.register(self.flush_cache)
+
+        @property
+        def ssm(self):
+            """SSM client, created the first time an ssm: value is fetched so boto3 is only loaded if needed."""
+            if self._ssm is None:
+                import boto3
+                self._ssm = boto3.client("ssm", region_name="us-east-1")
+
+            return self._ssm
 
         def before_get(self, parser, section, option, value, defaults):
             # If env variable is not set, try to fetch from SSM path, or return value.
@@ -21,20 +59,145 @@ class Settings(ConfigParser):
             if env_var in os.environ:
                 return os.environ.get(self._env_name(section, option))
             elif value.startswith("ssm:"):
-                try:
-                    param = self.ssm.get_parameter(
-                        Name=value.replace("ssm:", ""),
-                        WithDecryption=True
-                    )
-
-                    if param.get("Parameter"):
-                        return param["Parameter"]["Value"]
-                except ClientError as e:
-                    # Best effort to load parameter
-                    logger.error(e)
+                return self.get_parameter(value.replace("ssm:", ""))
             else:
                 return os.path.expandvars(value)
 
+        def get_parameter(self, name: str):
+            """Returns a decrypted SSM parameter value from the cache, or fetches it on a miss."""
+            value = self._cached(name)
+            if value is not None:
+                return value
+
+            with self._lock:
+                self.misses += 1
+
+            from botocore.exceptions import ClientError
+
+            try:
+                param = self.ssm.get_parameter(
+                    Name=name,
+                    WithDecryption=True
+                )
+
+                if param.get("Parameter"):
+                    self._store({name: param["Parameter"]["Value"]})
+                    return param["Parameter"]["Value"]
+            except ClientError as e:
+                # Best effort to load parameter
+                logger.error(e)
+
+        def prefetch(self, names) -> None:
+            """Fetches every uncached parameter in names with GetParameters, 10 names per call."""
+            names = sorted({name for name in names if self._cached(name, count=False) is None})
+            if not names:
+                return
+
+            try:
+                self._prefetch(names)
+            finally:
+                self.flush_cache()
+
+        def _prefetch(self, names) -> None:
+            from botocore.exceptions import BotoCoreError, ClientError
+
+            for i in range(0, len(names), SSM_BATCH_SIZE):
+                batch = names[i:i + SSM_BATCH_SIZE]
+                try:
+                    response = self.ssm.get_parameters(Names=batch, WithDecryption=True)
+                except (ClientError, BotoCoreError) as e:
+                    # Best effort, anything not prefetched is fetched on first use, e.g. missing credentials
+                    # only fail when an ssm: value is read, as they did before prefetching.
+                    logger.error(e)
+                    continue
+
+                self._store({param["Name"]: param["Value"] for param in response.get("Parameters", [])})
+
+                if response.get("InvalidParameters"):
+                    logger.error(f"SSM parameters not found: {response['InvalidParameters']}")
+
+        def cache_info(self) -> dict:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+        def clear_cache(self) -> None:
+            with self._lock:
+                self._cache.clear()
+
+        def flush_cache(self) -> None:
+            """Writes values fetched since the last write to the cache file."""
+            if self.cache_file and self._dirty:
+                self._save_cache_file()
+
+        def _cached(self, name: str, count: bool = True):
+            entry = self._cache.get(name)
+
+            if entry is not None and not self._expired(entry):
+                if count:
+                    with self._lock:
+                        self.hits += 1
+                return entry[0]
+
+            return None
+
+        def _expired(self, entry: tuple) -> bool:
+            return self.cache_ttl is not None and time.time() - entry[1] >= self.cache_ttl
+
+        def _store(self, values: dict) -> None:
+            if not values:
+                return
+
+            fetched_at = time.time()
+            with self._lock:
+                self._cache.update({name: (value, fetched_at) for name, value in values.items()})
+                self._dirty = True
+
+        def _fernet(self):
+            if not self.cache_key:
+                logger.warning("SSM cache file is set without a cache key, not using it.")
+                return None
+
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError as e:
+                raise ImportError("The encrypted SSM cache file needs the cryptography package, install data-utils "
+                                  "with the ssm-cache extra.") from e
+
+            return Fernet(self.cache_key)
+
+        def _load_cache_file(self) -> None:
+            fernet = self._fernet()
+            if fernet is None or not os.path.exists(self.cache_file):
+                return
+
+            try:
+                with open(self.cache_file, "rb") as f:
+                    entries = json.loads(fernet.decrypt(f.read()))
+            except Exception as e:
+                # A stale key or corrupt file only costs a cold start.
+                logger.warning(f"Ignoring unreadable SSM cache file {self.cache_file}: {e}")
+                return
+
+            entries = {name: tuple(entry) for name, entry in entries.items()}
+            self._cache.update({name: entry for name, entry in entries.items() if not self._expired(entry)})
+
+        def _save_cache_file(self) -> None:
+            fernet = self._fernet()
+            if fernet is None:
+                return
+
+            with self._lock:
+                data = fernet.encrypt(json.dumps(self._cache).encode())
+                self._dirty = False
+
+            try:
+                cache_dir = os.path.dirname(os.path.abspath(self.cache_file))
+                fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")  # Created with 0600 permissions
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.cache_file)
+            except OSError as e:
+                logger.warning(f"Could not write SSM cache file {self.cache_file}: {e}")
+
         @classmethod
         def _env_name(cls, section, option):
             def munge(name):
@@ -42,8 +205,20 @@ class Settings(ConfigParser):
 
             return "%s_%s" % (munge(section), munge(option))
 
-    def __init__(self, config_file=os.environ.get("PROJECT_SETTINGS", "local.ini")):
-        super(Settings, self).__init__(interpolation=Settings.EnvironmentInterpolation())
+    def __init__(self, config_file=os.environ.get("PROJECT_SETTINGS", "local.ini"),
+                 ssm_cache_ttl: float = None, ssm_cache_file: str = None, ssm_cache_key: str = None):
+        """
+        SSM caching options fall back to the SSM_CACHE_TTL, SSM_CACHE_FILE and SSM_CACHE_KEY environment
+        variables. SSM_CACHE_KEY is a Fernet key, e.g. from cryptography.fernet.Fernet.generate_key().
+        """
+        if ssm_cache_ttl is None and os.environ.get("SSM_CACHE_TTL"):
+            ssm_cache_ttl = float(os.environ["SSM_CACHE_TTL"])
+
+        super(Settings, self).__init__(interpolation=Settings.EnvironmentInterpolation(
+            cache_ttl=ssm_cache_ttl,
+            cache_file=ssm_cache_file or os.environ.get("SSM_CACHE_FILE"),
+            cache_key=ssm_cache_key or os.environ.get("SSM_CACHE_KEY")
+        ))
 
         if not os.path.exists(config_file):
             raise OSError("Could not load the default or provided settings file.")
@@ -55,3 +230,21 @@ class Settings(ConfigParser):
         load_dotenv(find_dotenv(env_file, usecwd=True), verbose=True)
 
         self.read(config_file)
+
+        # Fetch every ssm: value up front in a few batched calls, instead of one call per get.
+        self._interpolation.prefetch(self._ssm_parameter_names())
+
+    def _ssm_parameter_names(self):
+        names = set()
+
+        for section in [self.default_section] + self.sections():
+            for option, value in self.items(section, raw=True):
+                env_var = self.EnvironmentInterpolation._env_name(section, option)
+                if value.startswith("ssm:") and env_var not in os.environ:
+                    names.add(value.replace("ssm:", ""))
+
+        return names
+
+    def ssm_cache_info(self) -> dict:
+        """SSM parameter cache hits, misses and size."""
+        return self._interpolation.cache_info()
@@ -0,0 +1,35 @@
+import pytest
+
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.settings import Settings
+
+LAYOUT_CSV = """Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause
+5,CIF-RECORD-TYPE,A,1,1,1,,X(1)
+5,CIF-ACCOUNT-NUMBER,A,2,11,10,,X(10)
+5,CIF-BALANCE,N,12,20,9,,9(7)V9(2)
+5,CIF-OPEN-DATE,D,21,28,8,,9(8)
+5,CIF-OPEN-TIME,T,29,34,6,,9(6)
+6,CIF-RECORD-TYPE,A,1,1,1,,X(1)
+6,CIF-TXN-COUNT,N,2,6,5,,9(5)
+6,CIF-FILLER,A,7,8,2,,X(2)
+6,CIF-FILLER,A,9,10,2,,X(2)
+"""
+
+
+@pytest.fixture
+def settings(tmp_path):
+    config_file = tmp_path / "test.ini"
+    config_file.write_text(f"[file_config]\ndownload_path = {tmp_path}/\nuse_s3 = false\n")
+    return Settings(str(config_file))
+
+
+@pytest.fixture
+def make_file_spec(settings, tmp_path):
+    """Builds a FileSpec from a local layout CSV, defaulting to a small two record type CIF layout."""
+    def _make_file_spec(layout_csv: str = LAYOUT_CSV, **file_config) -> FileSpec:
+        (tmp_path / "layout.csv").write_text(layout_csv)
+        file_config.setdefault("layout_name", "layout.csv")
+        file_config.setdefault("record_type_start", 1)
+        return FileSpec(settings, file_config)
+
+    return _make_file_spec
@@ -0,0 +1,162 @@
+import io
+import json
+import os
+
+import pytest
+
+from data_utils.file_utils.fixed_width.checkpoint import (Checkpoint, CheckpointedParser, CheckpointError,
+                                                          CommittedPart)
+from data_utils.file_utils.fixed_width.parallel import ParallelParser
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+
+CIF_DATA = b"5ACCT00000100001234520210328123045\n600042AABB\n\n"
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 10)
+    return path
+
+
+def test_reader_offset_is_next_record_boundary(make_file_spec, data_file):
+    reader = FixedWidthReader(make_file_spec(), chunk_size=7)
+    offsets = [reader.offset for _ in reader.records(str(data_file))]
+
+    assert offsets[:3] == [35, 46, 82]
+    assert reader.offset == len(CIF_DATA) * 10
+
+
+def test_rerun_resumes_after_last_committed_part(make_file_spec, data_file, tmp_path):
+    checkpoint = str(tmp_path / "cif.checkpoint")
+    committed = {}
+
+    def failing_commit(name, records):
+        if len(committed) == 2:
+            raise RuntimeError("warehouse unavailable")
+        committed[name] = records
+
+    with pytest.raises(RuntimeError):
+        CheckpointedParser(make_file_spec(), checkpoint, part_records=6).run(data_file, failing_commit)
+
+    assert Checkpoint(checkpoint).load().record_count == 12
+
+    calls = []
+
+    def commit(name, records):
+        calls.append(name)
+        committed[name] = records
+
+    parts = CheckpointedParser(make_file_spec(), checkpoint, part_records=6).run(data_file, commit)
+
+    assert len(calls) == 2
+    assert [part.records for part in parts] == [6, 6, 6, 2]
+    assert parts[-1].end == len(CIF_DATA) * 10
+    records = [record for part in parts for record in committed[part.name]]
+    assert len(records) == 20
+    assert records[12] == records[0]
+    assert records[0][1]["CIF-BALANCE"] == 123.45
+
+    # A finished file commits nothing more.
+    assert CheckpointedParser(make_file_spec(), checkpoint, part_records=6).run(data_file, commit) == parts
+    assert len(calls) == 2
+
+
+def test_write_parts_names_parts_by_byte_range(make_file_spec, data_file, tmp_path):
+    parser = CheckpointedParser(make_file_spec(), str(tmp_path / "cif.checkpoint"), part_records=15)
+
+    parts = parser.write_parts(data_file, tmp_path / "out")
+
+    assert [part.name for part in parts] == ["part-000000000000000-000000000000364",
+                                             "part-000000000000364-000000000000470"]
+    assert sorted(os.listdir(tmp_path / "out")) == [f"{part.name}.jsonl" for part in parts]
+    assert sum(1 for _ in open(tmp_path / "out" / f"{parts[1].name}.jsonl")) == 5
+
+
+def test_checkpoint_for_a_different_file_is_rejected(make_file_spec, data_file, tmp_path):
+    checkpoint = str(tmp_path / "cif.checkpoint")
+    CheckpointedParser(make_file_spec(), checkpoint).run(data_file, lambda name, records: None)
+
+    data_file.write_bytes(CIF_DATA * 11)
+
+    with pytest.raises(CheckpointError):
+        CheckpointedParser(make_file_spec(), checkpoint).run(data_file, lambda name, records: None)
+
+    Checkpoint(checkpoint).load().reset()
+    parts = CheckpointedParser(make_file_spec(), checkpoint).run(data_file, lambda name, records: None)
+    assert parts[0].records == 22
+
+
+def test_parallel_write_parts_skips_committed_shards(make_file_spec, data_file, tmp_path):
+    checkpoint = str(tmp_path / "cif.checkpoint")
+    parser = ParallelParser(make_file_spec(), workers=2, shards=3)
+
+    first = parser.write_parts(data_file, tmp_path / "out", checkpoint=checkpoint)
+    os.remove(first[1][0])
+    stored = Checkpoint(checkpoint).load()
+    stored.parts = [part for part in stored.parts if f"{part.name}.jsonl" != os.path.basename(first[1][0])]
+    stored.save()
+
+    second = parser.write_parts(data_file, tmp_path / "out", checkpoint=checkpoint)
+
+    assert second == first
+    assert os.path.exists(first[1][0])
+    assert Checkpoint(checkpoint).load().offset == len(CIF_DATA) * 10
+
+
+def test_parallel_write_parts_refuses_changed_shards(make_file_spec, data_file, tmp_path):
+    checkpoint = str(tmp_path / "cif.checkpoint")
+    first = ParallelParser(make_file_spec(), workers=2, shards=3).write_parts(data_file, tmp_path / "out",
+                                                                              checkpoint=checkpoint)
+
+    assert os.path.basename(first[0][0]) == "part-000000000000000-000000000000176.jsonl"
+
+    with pytest.raises(CheckpointError):
+        ParallelParser(make_file_spec(), workers=2, shards=2).write_parts(data_file, tmp_path / "out",
+                                                                          checkpoint=checkpoint)
+    with pytest.raises(CheckpointError):
+        CheckpointedParser(make_file_spec(), checkpoint).run(data_file, lambda name, records: None)
+
+    Checkpoint(checkpoint).load().reset()
+    second = ParallelParser(make_file_spec(), workers=2, shards=2).write_parts(data_file, tmp_path / "other",
+                                                                               checkpoint=checkpoint)
+
+    assert sum(count for _, count in second) == 20
+    assert Checkpoint(checkpoint).load().record_count == 20
+
+
+class FakeS3Client:
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.exceptions.NoSuchKey()
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+
+class FakeS3Connector:
+    def __init__(self):
+        self.client = FakeS3Client()
+
+    def upload_fileobj(self, fileobj, bucket, key):
+        self.client.objects[(bucket, key)] = fileobj.read()
+
+
+def test_checkpoint_in_s3():
+    s3 = FakeS3Connector()
+    checkpoint = Checkpoint("s3://bucket/checkpoints/cif.json", s3_connector=s3)
+
+    assert checkpoint.load().offset == 0
+
+    checkpoint.start("10:abc")
+    checkpoint.commit(CommittedPart("part-1", 0, 10, 2))
+
+    stored = json.loads(s3.client.objects[("bucket", "checkpoints/cif.json")])
+    assert stored["source"] == "10:abc"
+    reloaded = Checkpoint("s3://bucket/checkpoints/cif.json", s3_connector=s3).load()
+    assert (reloaded.offset, reloaded.record_count) == (10, 2)
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from data_utils.file_utils.fixed_width.columnar import ColumnarDecoder, decode_zoned_decimal, decode_zoned_int
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+CIF_DATA = (
+    b"5ACCT00000100001234520210328123045\n"
+    b"600042AABB\n"
+    b"5ACCT000002-00000123              \n"
+    b"5          notanumbr        999999\r\n"
+    b"600000\n"
+)
+
+
+def _column(*values: str) -> np.ndarray:
+    width = max(len(value) for value in values)
+    return np.array([list(value.ljust(width).encode()) for value in values], dtype=np.uint8)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA)
+    return path
+
+
+def test_decode_zoned_int_matches_int():
+    values = ["00042", "-0042", "+42  ", "  7", "{12", "", "4 2", "4-2", "abc"]
+    result = decode_zoned_int(_column(*values), "FIELD")
+
+    assert result.tolist() == [42, -42, 42, 7, 12, None, None, None, None]
+
+
+def test_decode_zoned_int_overpunch():
+    values = ["0012{", "0012}", "0012A", "0012I", "0012J", "0012R", "  12J", "1{2J", "+12J"]
+    result = decode_zoned_int(_column(*values), "FIELD")
+
+    assert result.tolist() == [120, -120, 121, 129, -121, -129, -121, None, None]
+    assert result.tolist()[:7] == [int(TypeCaster.unpunch(value.strip())) for value in values[:7]]
+
+
+def test_decode_zoned_decimal_matches_scalar_caster():
+    values = ["000012345", "-000012345", "0000123.45", "-0000123.45", "12345", "{00012345", "", "fail4sure",
+              "00001234E", "00001234N", "00001234}", "6 {", "{ 97 {", "{ 97", "123456789 {", "{ -5", "1 2"]
+    result = decode_zoned_decimal(_column(*values), "FIELD", 7)
+
+    expected = []
+    for value in values:
+        cast = TypeCaster._parse_decimal_field(value, "FIELD", "9(7)V9(2)") if value else None
+        expected.append(cast if isinstance(cast, float) else None)
+
+    assert result.tolist() == expected
+    assert result.tolist()[-6:] == [None, None, 97.0, 1234567.89, -5.0, None]
+
+
+def test_iter_batches_numpy(make_file_spec, data_file):
+    batches = dict(ColumnarDecoder(make_file_spec()).iter_batches(data_file))
+
+    cif = batches["5"]
+    assert cif["CIF-ACCOUNT-NUMBER"].tolist() == ["ACCT000001", "ACCT000002", None]
+    assert cif["CIF-BALANCE"].tolist() == [123.45, -12.3, None]
+    assert cif["CIF-OPEN-DATE"].tolist()[0].isoformat() == "2021-03-28"
+    assert cif["CIF-OPEN-DATE"].mask.tolist() == [False, True, True]
+    assert cif["CIF-OPEN-TIME"].tolist()[0].total_seconds() == 12 * 3600 + 30 * 60 + 45
+    assert cif["CIF-OPEN-TIME"].mask.tolist() == [False, True, True]
+
+    assert batches["6"]["CIF-TXN-COUNT"].tolist() == [42, 0]
+    assert batches["6"]["CIF-FILLER-2"].tolist() == ["BB", None]
+
+
+def test_small_windows_match_single_window(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 20)
+    spec = make_file_spec()
+
+    def counts(decoder):
+        totals = {}
+        for record_type, batch in decoder.iter_batches(path):
+            totals[record_type] = totals.get(record_type, 0) + len(batch["CIF-RECORD-TYPE"])
+        return totals
+
+    assert counts(ColumnarDecoder(spec, window_size=50)) == counts(ColumnarDecoder(spec)) == {"5": 60, "6": 40}
+
+
+def test_oversized_record_does_not_grow_decoder_window(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 20)
+    decoder = ColumnarDecoder(make_file_spec(), window_size=8)
+
+    assert sum(len(batch["CIF-RECORD-TYPE"]) for _, batch in decoder.iter_batches(path)) == 100
+    assert decoder.window_size == 8
+
+
+def test_read_arrow(make_file_spec, data_file):
+    pa = pytest.importorskip("pyarrow")
+
+    tables = ColumnarDecoder(make_file_spec()).read_arrow(data_file)
+
+    assert tables["5"].num_rows == 3
+    assert tables["5"].schema.field("CIF-OPEN-DATE").type == pa.date32()
+    assert tables["5"].schema.field("CIF-OPEN-TIME").type == pa.time32("s")
+    assert tables["6"].column("CIF-TXN-COUNT").to_pylist() == [42, 0]
+
+
+def test_packed_fields_use_pic_scale(make_file_spec, tmp_path):
+    layout = ("Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause\n"
+              ",TXN-ID,A,1,2,2,,X(2)\n"
+              ",TXN-AMOUNT,N,3,5,3,,S9(3)V9(2) COMP-3\n")
+    path = tmp_path / "txn.dat"
+    path.write_bytes(b"01\x12\x34\x5c02\x00\x00\x1d")
+
+    decoder = ColumnarDecoder(make_file_spec(layout, record_type_start=None), record_length=5)
+    (record_type, batch), = decoder.iter_batches(path)
+
+    assert record_type == "000"
+    assert batch["TXN-AMOUNT"].tolist() == [123.45, -0.01]
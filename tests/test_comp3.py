@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+import pytest
+
+from data_utils.file_utils.fixed_width.comp3 import unpack_comp3, unpack_comp3_column
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+
+def test_unpack_comp3_signs():
+    assert unpack_comp3(b"\x12\x34\x5c") == 12345
+    assert unpack_comp3(b"\x12\x34\x5d") == -12345
+    assert unpack_comp3(b"\x12\x34\x5f") == 12345
+    assert unpack_comp3(b"\x0b") == 0
+
+
+def test_unpack_comp3_is_exact_past_15_digits():
+    assert TypeCaster.unpack_number(bytes.fromhex("1234567890123456789c")) == 1234567890123456789
+
+
+def test_unpack_number_does_not_raise():
+    assert TypeCaster.unpack_number(b"\x12\x34\x5b") == -12345
+    assert TypeCaster.unpack_number(b"\x1a\x3c") is None
+    assert TypeCaster.unpack_number(b"  ") is None
+
+
+def test_unpack_comp3_invalid_nibbles():
+    with pytest.raises(ValueError):
+        unpack_comp3(b"\x1a\x3c")
+    with pytest.raises(ValueError):
+        unpack_comp3(b"\x12\x34")
+
+
+def test_unpack_comp3_column():
+    buffer = b"\x00\x12\x3c\x00\x45\x6d\xff\xff\xff"
+    result = unpack_comp3_column(buffer, [0, 3, 6], 3)
+
+    assert result.tolist() == [123, -456, None]
+
+
+def test_unpack_comp3_column_scale():
+    buffer = b"\x00\x12\x3c\x00\x45\x6d"
+
+    assert unpack_comp3_column(buffer, [0, 3], 3, scale=2).tolist() == [1.23, -4.56]
+    assert unpack_comp3_column(buffer, [0, 3], 3, scale=2, as_decimal=True).tolist() == [Decimal("1.23"),
+                                                                                        Decimal("-4.56")]
+
+
+def test_unpack_comp3_column_wide_fields_are_exact():
+    buffer = bytes.fromhex("1234567890123456789012345d")
+    result = unpack_comp3_column(buffer, [0], 13, scale=4)
+
+    assert result.tolist() == [Decimal("-123456789012345678901.2345")]
+
+
+def test_pic_scale():
+    assert FileSpec.pic_scale("S9(7)V9(2) COMP-3") == 2
+    assert FileSpec.pic_scale("S9(5)V99") == 2
+    assert FileSpec.pic_scale("-9(7).9(2)") == 2
+    assert FileSpec.pic_scale("S9(11) COMP-3") == 0
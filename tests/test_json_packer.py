@@ -0,0 +1,50 @@
+import json
+
+from data_utils.file_utils.fixed_width.json_packer import JsonPacker, json_dumps
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+CIF_DATA = b"5000000004200001234520200813123456\n600042    \n"
+
+
+def read(spec, path):
+    caster = TypeCaster(spec)
+    return [(record_type, caster.cast_record(record_type, record))
+            for record_type, record in FixedWidthReader(spec).records(str(path))]
+
+
+def test_nested_field_name_packs_record_type_fields(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA)
+    spec = make_file_spec(nested_field_name="event_data")
+    packer = JsonPacker(spec)
+
+    rows = [packer.pack(record_type, record) for record_type, record in read(spec, path)]
+
+    assert rows[0]["RECORD_TYPE"] == "5"
+    assert json.loads(rows[0]["EVENT_DATA"]) == {"ACCOUNT_NUMBER": "0000000042", "BALANCE": 123.45,
+                                                 "OPEN_DATE": "2020-08-13", "OPEN_TIME": "12:34:56"}
+    assert json.loads(rows[0]["EVENT_DATA_STRUCTURE"])["BALANCE"] == "NUMERIC(9, 2)"
+    assert json.loads(rows[1]["EVENT_DATA"]) == {"TXN_COUNT": 42}
+    assert set(rows[1]) == {"RECORD_TYPE", "EVENT_DATA", "EVENT_DATA_STRUCTURE"}
+
+
+def test_structure_is_shared_and_emitted_once_per_batch(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes((CIF_DATA.split(b"\n")[0] + b"\n") * 2)
+    spec = make_file_spec(nest_json_fields={"OPEN": {"json_field_name": "opened"}})
+    packer = JsonPacker(spec)
+    records = [record for _, record in read(spec, path)]
+
+    first, second = (packer.pack("5", record) for record in records)
+    rows, structures = packer.pack_batch("5", records)
+
+    assert first["OPENED_STRUCTURE"] is second["OPENED_STRUCTURE"]
+    assert json.loads(first["OPENED"]) == {"OPEN_DATE": "2020-08-13", "OPEN_TIME": "12:34:56"}
+    assert "OPEN_DATE" not in first and first["BALANCE"] == 123.45
+    assert all("OPENED_STRUCTURE" not in row for row in rows)
+    assert json.loads(structures["OPENED_STRUCTURE"]) == {"OPEN_DATE": "DATE", "OPEN_TIME": "TIME"}
+
+
+def test_json_dumps_encodes_ints_wider_than_64_bits():
+    assert json.loads(json_dumps()({"a": 10 ** 20, "b": 1})) == {"a": 10 ** 20, "b": 1}
@@ -0,0 +1,50 @@
+import pytest
+
+from data_utils.file_utils.fixed_width import layout_cache
+from data_utils.file_utils.fixed_width.file_spec import FileSpec
+from data_utils.settings import Settings
+
+from tests.conftest import LAYOUT_CSV
+
+
+@pytest.fixture
+def cached_settings(tmp_path):
+    config_file = tmp_path / "cached.ini"
+    config_file.write_text(f"[file_config]\ndownload_path = {tmp_path}/\nuse_s3 = false\n"
+                           f"layout_cache_dir = {tmp_path}/layout_cache\nlayout_cache_registry = true\n")
+    yield Settings(str(config_file))
+    layout_cache.clear_registry()
+
+
+def test_disk_cache_skips_layout_parse(cached_settings, tmp_path, monkeypatch):
+    (tmp_path / "layout.csv").write_text(LAYOUT_CSV)
+    spec = FileSpec(cached_settings, {"layout_name": "layout.csv"})
+    layout_cache.clear_registry()
+
+    monkeypatch.setattr("csv.DictReader", lambda *args, **kwargs: pytest.fail("layout should not be parsed"))
+    cached = FileSpec(cached_settings, {"layout_name": "layout.csv"})
+
+    assert cached.layout == spec.layout
+    assert cached.struct_fmt_str == spec.struct_fmt_str
+    assert list(cached.dtypes) == list(spec.dtypes)
+
+
+def test_pinned_version_needs_no_layout_file(cached_settings, tmp_path):
+    (tmp_path / "layout.csv").write_text(LAYOUT_CSV)
+    spec = FileSpec(cached_settings, {"layout_name": "layout.csv", "layout_version": "v1"})
+    (tmp_path / "layout.csv").unlink()
+
+    assert FileSpec(cached_settings, {"layout_name": "layout.csv", "layout_version": "v1"}).layout == spec.layout
+
+
+def test_changed_layout_or_config_misses_cache(cached_settings, tmp_path):
+    (tmp_path / "layout.csv").write_text(LAYOUT_CSV)
+    FileSpec(cached_settings, {"layout_name": "layout.csv"})
+
+    cast = FileSpec(cached_settings, {"layout_name": "layout.csv", "cast_fields": {
+        "CIF-TXN-COUNT": {"data_type": "A", "pic_clause": "X(5)"}}})
+    assert cast.layout["6"][1][1] == "A"
+
+    (tmp_path / "layout.csv").write_text(LAYOUT_CSV.replace("CIF-TXN-COUNT", "CIF-TXN-TOTAL"))
+    changed = FileSpec(cached_settings, {"layout_name": "layout.csv"})
+    assert changed.layout["6"][1][0] == "CIF-TXN-TOTAL"
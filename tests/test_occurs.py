@@ -0,0 +1,129 @@
+import pytest
+
+from data_utils.file_utils.fixed_width.occurs import OCCURRENCE, OccursExpander, occurs_groups
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+# ACT-AMOUNT is listed once for its whole OCCURS 3 block. ACT-CODE and ACT-QTY are one OCCURS 2 group listed
+# once per occurrence.
+LAYOUT_CSV = """Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause
+1,ACT-RECORD-TYPE,A,1,1,1,,X(1)
+1,ACT-ACCOUNT,A,2,5,4,,X(4)
+1,ACT-AMOUNT,N,6,20,15,,9(3)V9(2)
+2,ACT-RECORD-TYPE,A,1,1,1,,X(1)
+2,ACT-ACCOUNT,A,2,5,4,,X(4)
+2,ACT-CODE,A,6,7,2,,X(2)
+2,ACT-QTY,N,8,10,3,,9(3)
+2,ACT-CODE,A,11,12,2,,X(2)
+2,ACT-QTY,N,13,15,3,,9(3)
+"""
+
+SEQUENCE_FIELDS = {"ACT-AMOUNT": 3, "ACT-CODE": 2, "ACT-QTY": 2}
+
+DATA = (
+    b"1A0011234500050     \n"
+    b"2A002AB007          \n"
+    b"1A003          00001\n"
+)
+
+
+@pytest.fixture
+def spec(make_file_spec):
+    return make_file_spec(LAYOUT_CSV, sequence_fields=SEQUENCE_FIELDS)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "act.txt"
+    path.write_bytes(DATA)
+    return path
+
+
+def test_sequence_field_block_is_split_per_occurrence(spec):
+    amounts = [field for field in spec.layout["1"] if field[0] == "ACT-AMOUNT"]
+
+    assert [(field[2], field[3], field[4]) for field in amounts] == [(6, 10, 5), (11, 15, 5), (16, 20, 5)]
+    assert spec.struct_fmt_str["1"] == "1s4s5s5s5s"
+    assert str(spec.dtypes["AMOUNT_3"]) == "NUMERIC(5, 2)"
+    assert "AMOUNT" not in spec.dtypes
+
+
+def test_reader_returns_wide_columns(spec, data_file):
+    caster = TypeCaster(spec)
+    records = [caster.cast_record(record_type, record)
+               for record_type, record in FixedWidthReader(spec).records(str(data_file))]
+
+    assert [records[0][f"ACT-AMOUNT-{i}"] for i in (1, 2, 3)] == [123.45, 0.5, None]
+    assert records[1]["ACT-CODE-1"] == "AB"
+    assert records[1]["ACT-QTY-2"] is None
+
+
+def test_occurs_groups(spec):
+    groups = occurs_groups(spec)
+
+    (amount,) = groups["1"]
+    assert (amount.name, amount.count, amount.stride) == ("ACT-AMOUNT", 3, 5)
+
+    (code,) = groups["2"]
+    assert (code.count, code.stride) == (2, 5)
+    assert [(field.name, field.offset, field.width) for field in code.fields] == [("ACT-CODE", 5, 2),
+                                                                                  ("ACT-QTY", 7, 3)]
+
+
+def test_child_rows_drop_blank_occurrences(spec, data_file):
+    expander = OccursExpander(spec)
+    children = [child for record_type, record in FixedWidthReader(spec).records(str(data_file))
+                for child in expander.child_rows(record_type, record, parent_fields=["ACT-ACCOUNT"])]
+
+    assert children == [
+        ("ACT-AMOUNT", {"ACT-ACCOUNT": "A001", OCCURRENCE: 1, "ACT-AMOUNT": 123.45}),
+        ("ACT-AMOUNT", {"ACT-ACCOUNT": "A001", OCCURRENCE: 2, "ACT-AMOUNT": 0.5}),
+        ("ACT-CODE", {"ACT-ACCOUNT": "A002", OCCURRENCE: 1, "ACT-CODE": "AB", "ACT-QTY": 7}),
+        ("ACT-AMOUNT", {"ACT-ACCOUNT": "A003", OCCURRENCE: 3, "ACT-AMOUNT": 0.01}),
+    ]
+
+
+def test_parent_and_cast_occurrences(spec):
+    _, record = FixedWidthReader(spec).parse_record(DATA.splitlines()[0])
+    expander = OccursExpander(spec)
+
+    assert expander.parent("1", record) == {"ACT-RECORD-TYPE": "1", "ACT-ACCOUNT": "A001"}
+    assert expander.cast_occurrences("1", record, "ACT-AMOUNT") == [123.45, 0.5, None]
+
+    with pytest.raises(KeyError):
+        expander.cast_occurrences("1", record, "ACT-ACCOUNT")
+
+
+def test_columnar_wide_matches_type_caster(spec, data_file):
+    columnar = pytest.importorskip("data_utils.file_utils.fixed_width.columnar")
+
+    batches = dict(columnar.ColumnarDecoder(spec).iter_batches(data_file))
+
+    assert batches["1"]["ACT-AMOUNT-1"].tolist() == [123.45, None]
+    assert batches["1"]["ACT-AMOUNT-3"].tolist() == [None, 0.01]
+    assert batches["2"]["ACT-CODE-1"].tolist() == ["AB"]
+    assert batches["2"]["ACT-QTY-2"].tolist() == [None]
+
+
+def test_columnar_child_rows(spec, data_file):
+    columnar = pytest.importorskip("data_utils.file_utils.fixed_width.columnar")
+
+    batches = dict(columnar.ColumnarDecoder(spec).iter_batches(data_file, occurs="rows",
+                                                               parent_fields=["ACT-ACCOUNT"]))
+
+    assert set(batches["1"]) == {"ACT-RECORD-TYPE", "ACT-ACCOUNT"}
+    amounts = batches["1/ACT-AMOUNT"]
+    assert amounts["ACT-ACCOUNT"].tolist() == ["A001", "A001", "A003"]
+    assert amounts[OCCURRENCE].tolist() == [1, 2, 3]
+    assert amounts["ACT-AMOUNT"].tolist() == [123.45, 0.5, 0.01]
+    assert batches["2/ACT-CODE"]["ACT-QTY"].tolist() == [7]
+
+
+def test_columnar_child_rows_to_arrow(spec, data_file):
+    columnar = pytest.importorskip("data_utils.file_utils.fixed_width.columnar")
+    pytest.importorskip("pyarrow")
+
+    tables = columnar.ColumnarDecoder(spec).read_arrow(data_file, occurs="rows")
+
+    assert tables["1/ACT-AMOUNT"].column(OCCURRENCE).to_pylist() == [1, 2, 3]
+    assert tables["1/ACT-AMOUNT"].column("ACT-AMOUNT").to_pylist() == [123.45, 0.5, 0.01]
@@ -0,0 +1,66 @@
+import json
+import pickle
+
+from data_utils.file_utils.fixed_width.parallel import ParallelParser, split_file
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+CIF_DATA = b"5ACCT00000100001234520210328123045\n600042AABB\n"
+
+
+def test_split_file_aligns_to_records(tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 10)
+
+    ranges = split_file(path, 4)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(CIF_DATA) * 10
+    assert all(path.read_bytes()[end - 1:end] == b"\n" for _, end in ranges)
+    assert split_file(path, 3, record_length=10) == [(0, 150), (150, 300), (300, 450), (450, 460)]
+
+
+def test_snapshot_is_picklable_without_s3(make_file_spec):
+    spec = make_file_spec()
+    snapshot = pickle.loads(pickle.dumps(spec.snapshot()))
+
+    assert snapshot._s3_conn is None and snapshot.settings is None
+    assert snapshot.layout == spec.layout
+
+
+def test_parse_matches_sequential_reader(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 100)
+    spec = make_file_spec()
+    caster = TypeCaster(spec)
+
+    expected = [(record_type, caster.cast_record(record_type, record))
+                for record_type, record in FixedWidthReader(spec).records(path)]
+
+    assert list(ParallelParser(spec, workers=2, shards=7).parse(path)) == expected
+
+
+def test_write_parts(make_file_spec, tmp_path):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 100)
+
+    parts = ParallelParser(make_file_spec(), workers=2, shards=3).write_parts(path, tmp_path / "out")
+
+    assert len(parts) == 3
+    assert sum(count for _, count in parts) == 200
+    first = json.loads(open(parts[0][0]).readline())
+    assert first == {"record_type": "5", "record": {"CIF-RECORD-TYPE": "5", "CIF-ACCOUNT-NUMBER": "ACCT000001",
+                                                    "CIF-BALANCE": 123.45, "CIF-OPEN-DATE": "2021-03-28",
+                                                    "CIF-OPEN-TIME": "12:30:45"}}
+
+
+def test_shards_are_sized_by_bytes_not_workers(make_file_spec, tmp_path, monkeypatch):
+    path = tmp_path / "cif.txt"
+    path.write_bytes(CIF_DATA * 100)
+    monkeypatch.setattr("data_utils.file_utils.fixed_width.parallel.SPOOL_BATCH_RECORDS", 7)
+
+    two = ParallelParser(make_file_spec(), workers=2, shard_bytes=1000)
+    four = ParallelParser(make_file_spec(), workers=4, shard_bytes=1000)
+
+    assert len(two.split(path)) == 5
+    assert two.split(path) == four.split(path)
+    assert len(list(two.parse(path))) == 200
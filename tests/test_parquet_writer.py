@@ -0,0 +1,55 @@
+import io
+from datetime import date, time
+from decimal import Decimal
+
+import pytest
+
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.fixed_width.type_caster import TypeCaster
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from data_utils.file_utils.fixed_width.parquet_writer import ParquetWriter, write_parquet  # noqa: E402
+
+CIF_DATA = (
+    b"5ACCT00000100001234520210328123045\n"
+    b"600042AABB\n"
+    b"5ACCT00000200000000020210401      \n"
+    b"5ACCT000003notanumbr        999999\n"
+)
+
+
+def _cast_records(spec):
+    caster = TypeCaster(spec)
+    for record_type, record in FixedWidthReader(spec).records(io.BytesIO(CIF_DATA)):
+        yield record_type, caster.cast_record(record_type, record)
+
+
+def test_schema_from_file_spec_dtypes(make_file_spec, tmp_path):
+    spec = make_file_spec()
+
+    with ParquetWriter(spec, "5", str(tmp_path / "cif.parquet"), dictionary_fields=["RECORD_TYPE"]) as writer:
+        schema = writer.schema
+
+    assert schema.names == ["RECORD_TYPE", "ACCOUNT_NUMBER", "BALANCE", "OPEN_DATE", "OPEN_TIME"]
+    assert schema.field("RECORD_TYPE").type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field("ACCOUNT_NUMBER").type == pa.string()
+    assert schema.field("BALANCE").type == pa.decimal128(9, 2)
+    assert schema.field("OPEN_DATE").type == pa.date32()
+    assert schema.field("OPEN_TIME").type == pa.time32("s")
+
+
+def test_write_parquet_per_record_type(make_file_spec, tmp_path):
+    spec = make_file_spec()
+    paths = write_parquet(spec, _cast_records(spec), str(tmp_path / "cif_{record_type}.parquet"),
+                          row_group_size=2)
+
+    cif = pq.read_table(paths["5"])
+    assert pq.ParquetFile(paths["5"]).num_row_groups == 2
+    assert cif.column("BALANCE").to_pylist() == [Decimal("123.45"), Decimal("0.00"), None]
+    assert cif.column("OPEN_DATE").to_pylist() == [date(2021, 3, 28), date(2021, 4, 1), None]
+    assert cif.column("OPEN_TIME").to_pylist()[0] == time(12, 30, 45)
+
+    # FILLER fields are dropped, like FileSpec.dtypes.
+    assert pq.read_table(paths["6"]).to_pylist() == [{"RECORD_TYPE": "6", "TXN_COUNT": Decimal("42")}]
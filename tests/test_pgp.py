@@ -0,0 +1,91 @@
+import io
+
+import gnupg
+import pytest
+
+from data_utils.file_utils import pgp
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+from data_utils.file_utils.pgp import (FileDecryptError, PGPBatchError, decrypt_many, decrypt_stream, encrypt_many,
+                                        encrypt_pgp, encrypt_stream)
+
+PASSPHRASE = "correct horse"
+
+
+@pytest.fixture(scope="session")
+def keys(tmp_path_factory):
+    """A throwaway key pair, generated once since key generation takes a few seconds."""
+    gpg = gnupg.GPG(gnupghome=str(tmp_path_factory.mktemp("keygen")))
+    key = gpg.gen_key(gpg.gen_key_input(key_type="RSA", key_length=1024, subkey_type="RSA", subkey_length=1024,
+                                        name_email="test@example.com", passphrase=PASSPHRASE))
+    return (gpg.export_keys(key.fingerprint),
+            gpg.export_keys(key.fingerprint, secret=True, passphrase=PASSPHRASE))
+
+
+@pytest.fixture
+def homedir(tmp_path):
+    path = tmp_path / "gnupg"
+    path.mkdir(mode=0o700)
+    return str(path)
+
+
+def test_stream_round_trip_feeds_reader(keys, homedir, make_file_spec):
+    public_key, private_key = keys
+    plaintext = b"".join(b"5%010d%09d20200813123456\n" % (i, i * 100) for i in range(2000))
+
+    ciphertext = encrypt_stream(io.BytesIO(plaintext), public_key, homedir)
+    with ciphertext:
+        encrypted = ciphertext.read()
+
+    reader = FixedWidthReader(make_file_spec())
+    with decrypt_stream(io.BytesIO(encrypted), private_key, PASSPHRASE, homedir) as stream:
+        records = list(reader.records(stream))
+
+    assert len(records) == 2000
+    assert records[-1][1]["CIF-ACCOUNT-NUMBER"] == "0000001999"
+
+
+def test_keys_are_imported_once_per_keyring(keys, homedir, tmp_path, monkeypatch):
+    public_key, _ = keys
+    (tmp_path / "plain.txt").write_bytes(b"hello")
+    imports = []
+    import_keys = gnupg.GPG.import_keys
+    monkeypatch.setattr(gnupg.GPG, "import_keys", lambda self, key: imports.append(key) or import_keys(self, key))
+
+    for i in range(3):
+        encrypt_pgp(str(tmp_path / "plain.txt"), str(tmp_path / f"plain-{i}.pgp"), public_key, homedir)
+
+    assert len(imports) == 1
+    assert pgp.prepare_keyring(public_key, homedir)[0] is pgp.prepare_keyring(public_key, homedir)[0]
+
+
+def test_decrypt_stream_raises_on_bad_passphrase(keys, homedir):
+    public_key, private_key = keys
+    with encrypt_stream(io.BytesIO(b"secret data"), public_key, homedir) as stream:
+        encrypted = stream.read()
+
+    with pytest.raises(FileDecryptError):
+        with decrypt_stream(io.BytesIO(encrypted), private_key, "wrong", homedir) as stream:
+            stream.read()
+
+
+def test_decrypt_many_aggregates_failures(keys, homedir, tmp_path):
+    public_key, private_key = keys
+    inputs = []
+    for i in range(4):
+        path = tmp_path / f"file-{i}.txt"
+        path.write_bytes(b"row %d\n" % i * 100)
+        inputs.append(str(path))
+
+    encrypted = encrypt_many(inputs, str(tmp_path / "encrypted"), public_key, workers=2, homedir=homedir)
+    corrupt = tmp_path / "encrypted" / "corrupt.txt.pgp"
+    corrupt.write_bytes(b"not pgp data")
+
+    with pytest.raises(PGPBatchError) as e:
+        decrypt_many([result.output_filepath for result in encrypted] + [str(corrupt)], str(tmp_path / "out"),
+                     private_key, PASSPHRASE, workers=3, homedir=homedir)
+
+    assert [result.input_filepath for result in e.value.failures] == [str(corrupt)]
+    succeeded = [result for result in e.value.results if result.error is None]
+    assert [result.output_filepath for result in succeeded] == [str(tmp_path / "out" / f"file-{i}.txt")
+                                                                 for i in range(4)]
+    assert (tmp_path / "out" / "file-2.txt").read_bytes() == b"row 2\n" * 100
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from data_utils.pipeline import run_pipeline
+from data_utils.script import Script
+
+
+def test_threaded_pipeline_applies_backpressure():
+    produced = []
+
+    def extract():
+        for i in range(20):
+            produced.append(i)
+            yield [i]
+
+    def transform(batches):
+        for batch in batches:
+            yield [value * 2 for value in batch]
+
+    def load(batches):
+        loaded = []
+        for batch in batches:
+            # The producer can only be a few batches ahead of the slow consumer.
+            assert len(produced) - batch[0] // 2 <= 2 * 2 + 3
+            time.sleep(0.001)
+            loaded.extend(batch)
+        return loaded
+
+    assert run_pipeline([extract, transform, load], queue_size=2) == [i * 2 for i in range(20)]
+
+
+@pytest.mark.parametrize("mode", ["threads", "asyncio"])
+def test_stage_errors_cancel_the_pipeline(mode):
+    closed = threading.Event()
+
+    def extract():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    def load(batches):
+        for batch in batches:
+            if batch == 5:
+                raise ValueError("bad batch")
+
+    async def aload(batches):
+        async for batch in batches:
+            if batch == 5:
+                raise ValueError("bad batch")
+
+    with pytest.raises(ValueError, match="bad batch"):
+        run_pipeline([extract, load if mode == "threads" else aload], mode=mode)
+
+    assert closed.is_set()
+
+
+def test_asyncio_pipeline_with_async_generators():
+    async def extract():
+        for i in range(10):
+            yield i
+
+    async def transform(batches):
+        async for batch in batches:
+            if batch % 2:
+                yield batch
+
+    async def load(batches):
+        return [batch async for batch in batches]
+
+    assert run_pipeline([extract, transform, load], mode="asyncio") == [1, 3, 5, 7, 9]
+
+
+def test_streaming_script_skips_default_transform(tmp_path):
+    config_file = tmp_path / "script.ini"
+    config_file.write_text("[loggers]\nkeys = root\n[handlers]\nkeys =\n[formatters]\nkeys =\n"
+                           "[logger_root]\nhandlers =\n")
+
+    class StreamingScript(Script):
+        streaming = True
+
+        def extract(self):
+            return iter([[1, 2], [3]])
+
+        def load(self, batches):
+            return sum(sum(batch) for batch in batches)
+
+    assert StreamingScript(["--config", str(config_file)]).run() == 6
+
+
+def test_lazy_iterator_last_stage_is_drained():
+    loaded = []
+
+    def extract():
+        return iter([[1], [2], [3]])
+
+    def load(batches):
+        return map(loaded.extend, batches)
+
+    run_pipeline([extract, load])
+
+    assert loaded == [1, 2, 3]
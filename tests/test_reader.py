@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+from data_utils.file_utils.fixed_width.reader import FixedWidthReader
+
+CIF_DATA = (
+    b"5ACCT00000100001234520210328123045\n"
+    b"600042AABB\n"
+    b"9UNKNOWN\n"
+    b"5ACCT00000200000000020210401\r\n"
+)
+
+
+def test_records_routes_by_record_type(make_file_spec):
+    reader = FixedWidthReader(make_file_spec())
+    records = list(reader.records(io.BytesIO(CIF_DATA)))
+
+    assert [record_type for record_type, _ in records] == ["5", "6", "5"]
+    assert records[0][1] == {
+        "CIF-RECORD-TYPE": "5",
+        "CIF-ACCOUNT-NUMBER": "ACCT000001",
+        "CIF-BALANCE": "000012345",
+        "CIF-OPEN-DATE": "20210328",
+        "CIF-OPEN-TIME": "123045",
+    }
+    assert reader.record_count == 3
+    assert reader.unknown_record_count == 1
+
+
+def test_records_pads_short_lines_and_numbers_repeated_names(make_file_spec):
+    records = list(FixedWidthReader(make_file_spec()).records(io.BytesIO(CIF_DATA)))
+
+    assert records[1][1] == {"CIF-RECORD-TYPE": "6", "CIF-TXN-COUNT": "00042", "CIF-FILLER-1": "AA",
+                             "CIF-FILLER-2": "BB"}
+    assert records[2][1]["CIF-OPEN-TIME"] == ""
+
+
+def test_records_small_chunks_match_single_chunk(make_file_spec, tmp_path):
+    data_file = tmp_path / "cif.txt"
+    data_file.write_bytes(CIF_DATA * 50)
+    spec = make_file_spec()
+
+    expected = list(FixedWidthReader(spec).records(str(data_file)))
+    chunked = list(FixedWidthReader(spec, chunk_size=7).records(str(data_file)))
+
+    assert chunked == expected
+    assert len(expected) == 150
+
+
+def test_records_as_tuples_without_decoding(make_file_spec):
+    reader = FixedWidthReader(make_file_spec(), as_dict=False, decode=False)
+    record_type, values = next(reader.records(io.BytesIO(CIF_DATA)))
+
+    assert record_type == "5"
+    assert values == (b"5", b"ACCT000001", b"000012345", b"20210328", b"123045")
+
+
+def test_records_fixed_record_length(make_file_spec):
+    data = b"600001    " + b"600002    " + b"600003    "
+    reader = FixedWidthReader(make_file_spec(), record_length=10, chunk_size=15)
+
+    counts = [record["CIF-TXN-COUNT"] for _, record in reader.records(io.BytesIO(data))]
+
+    assert counts == ["00001", "00002", "00003"]
+
+
+def test_multiple_record_types_require_record_type_start(make_file_spec):
+    with pytest.raises(ValueError):
+        FixedWidthReader(make_file_spec(record_type_start=None))
+
+
+def test_ebcdic_records_match_per_field_decoding(make_file_spec):
+    # CIF_DATA keeps its ASCII newlines so the records stay delimited.
+    data = b"\n".join(line.decode().encode("cp037") for line in CIF_DATA.split(b"\n"))
+    spec = make_file_spec(file_format="EBCDIC")
+    expected = list(FixedWidthReader(make_file_spec()).records(io.BytesIO(CIF_DATA)))
+
+    assert list(FixedWidthReader(spec).records(io.BytesIO(data))) == expected
+    assert list(FixedWidthReader(spec, chunk_size=7).records(io.BytesIO(data))) == expected
+
+
+def test_ebcdic_fixed_records_leave_packed_bytes_untouched(make_file_spec):
+    layout = ("Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause\n"
+              ",TXN-ID,A,1,2,2,,X(2)\n"
+              ",TXN-AMOUNT,N,3,5,3,,S9(3)V9(2) COMP-3\n"
+              ",TXN-CODE,N,6,8,3,,S9(3)\n")
+    data = "01".encode("cp037") + b"\x12\x34\x5c" + "12J".encode("cp037")
+    spec = make_file_spec(layout, record_type_start=None, file_format="EBCDIC")
+
+    records = list(FixedWidthReader(spec, record_length=8, chunk_size=10).records(io.BytesIO(data * 3)))
+
+    assert records == [("000", {"TXN-ID": "01", "TXN-AMOUNT": b"\x12\x34\x5c", "TXN-CODE": "12J"})] * 3
@@ -0,0 +1,149 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+from data_utils.connectors.s3_connector import S3Connector, S3DownloadError
+
+
+class FakeS3Client:
+    def __init__(self, data, failures=None):
+        self.data = data
+        self.failures = failures or {}
+        self.ranges = []
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self.data), "ETag": '"abc"'}
+
+    def get_object(self, Bucket, Key, Range, IfMatch):
+        start, end = (int(value) for value in Range[len("bytes="):].split("-"))
+        self.ranges.append(start)
+        if self.failures.get(start, 0) > 0:
+            self.failures[start] -= 1
+            raise IOError("Connection reset")
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+
+class FakePaginator:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def paginate(self, Bucket, Prefix):
+        return [{"Contents": [obj for obj in page if obj["Key"].startswith(Prefix)]} for page in self.pages]
+
+
+class FakeBulkClient:
+    def __init__(self, objects):
+        self.objects = objects
+        self.uploaded = {}
+
+    def get_paginator(self, operation):
+        keys = sorted(self.objects)
+        return FakePaginator([[self._summary(key) for key in keys[i:i + 2]] for i in range(0, len(keys), 2)])
+
+    def _summary(self, key):
+        return {"Key": key, "Size": len(self.objects[key]), "LastModified": datetime(2024, 1, int(key[-5]) + 1,
+                                                                                       tzinfo=timezone.utc)}
+
+    def download_file(self, bucket, key, path, Config=None):
+        if key not in self.objects:
+            raise KeyError(key)
+        with open(path, "wb") as f:
+            f.write(self.objects[key])
+
+    def upload_file(self, path, bucket, key, Config=None):
+        with open(path, "rb") as f:
+            self.uploaded[key] = f.read()
+
+
+def make_connector(client, max_pool_connections=4):
+    connector = S3Connector.__new__(S3Connector)
+    connector.client = client
+    connector.transfer_config = None
+    connector.max_pool_connections = max_pool_connections
+    connector._executor = None
+    return connector
+
+
+def test_download_file_ranged_retries_only_failed_parts(tmp_path):
+    data = bytes(range(256)) * 10
+    client = FakeS3Client(data, failures={1000: 1})
+    path = tmp_path / "object.bin"
+
+    stats = make_connector(client).download_file_ranged("bucket", "key", str(path), part_size=500,
+                                                        max_concurrency=3)
+
+    assert path.read_bytes() == data
+    assert sorted(client.ranges) == [0, 500, 1000, 1000, 1500, 2000, 2500]
+    assert (stats.bytes, stats.parts, stats.failed_attempts, stats.resumed_parts) == (2560, 6, 1, 0)
+    assert not (tmp_path / "object.bin.parts").exists()
+
+
+def test_download_file_ranged_resumes_finished_parts(tmp_path):
+    data = bytes(range(256)) * 10
+    client = FakeS3Client(data, failures={1500: 2})
+    path = tmp_path / "object.bin"
+    connector = make_connector(client)
+
+    with pytest.raises(S3DownloadError):
+        connector.download_file_ranged("bucket", "key", str(path), part_size=500, retry_count=2)
+
+    client.ranges.clear()
+    stats = connector.download_file_ranged("bucket", "key", str(path), part_size=500, retry_count=2)
+
+    assert path.read_bytes() == data
+    assert client.ranges == [1500]
+    assert (stats.bytes, stats.resumed_parts) == (500, 5)
+
+
+def test_download_file_ranged_restarts_when_part_size_changes(tmp_path):
+    data = bytes(range(256)) * 10
+    client = FakeS3Client(data, failures={2000: 2})
+    path = tmp_path / "object.bin"
+    connector = make_connector(client)
+
+    with pytest.raises(S3DownloadError):
+        connector.download_file_ranged("bucket", "key", str(path), part_size=500, retry_count=2)
+
+    client.ranges.clear()
+    stats = connector.download_file_ranged("bucket", "key", str(path), part_size=1000, retry_count=2)
+
+    assert path.read_bytes() == data
+    assert sorted(client.ranges) == [0, 1000, 2000]
+    assert (stats.bytes, stats.parts, stats.resumed_parts) == (2560, 3, 0)
+
+
+@pytest.fixture
+def bulk_client():
+    return FakeBulkClient({**{f"day=1/part-{i}.csv": b"x" * i for i in range(5)}, "day=2/part-9.csv": b"y"})
+
+
+def test_list_objects_paginates_and_filters(bulk_client):
+    connector = make_connector(bulk_client)
+
+    keys = [obj["Key"] for obj in connector.list_objects("bucket", "day=1/", pattern="*.csv",
+                                                           modified_after=datetime(2024, 1, 2, tzinfo=timezone.utc),
+                                                           predicate=lambda obj: obj["Size"] < 4)]
+
+    assert keys == ["day=1/part-2.csv", "day=1/part-3.csv"]
+
+
+def test_download_and_upload_many(bulk_client, tmp_path):
+    connector = make_connector(bulk_client, max_pool_connections=2)
+    objects = connector.list_objects("bucket", "day=1/")
+
+    results = list(connector.download_many("bucket", list(objects) + ["day=1/missing.csv"], str(tmp_path / "in"),
+                                           prefix="day=1/", retry_count=1))
+
+    assert len(results) == 6
+    assert {result.key: result.bytes for result in results if not result.error} == {
+        f"day=1/part-{i}.csv": i for i in range(5)}
+    assert [result.key for result in results if result.error] == ["day=1/missing.csv"]
+    assert (tmp_path / "in" / "part-4.csv").read_bytes() == b"xxxx"
+
+    paths = [str(path) for path in (tmp_path / "in").iterdir()]
+    uploaded = list(connector.upload_many(paths, "bucket", "copy/", base_dir=str(tmp_path)))
+    connector.close()
+
+    assert all(result.error is None for result in uploaded)
+    assert sorted(bulk_client.uploaded) == [f"copy/in/part-{i}.csv" for i in range(5)]
@@ -0,0 +1,112 @@
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+from data_utils import settings as settings_module
+from data_utils.settings import Settings
+
+
+class FakeSSM:
+    def __init__(self, values):
+        self.values = values
+        self.batches = []
+        self.single_gets = []
+
+    def get_parameters(self, Names, WithDecryption):
+        self.batches.append(list(Names))
+        return {"Parameters": [{"Name": name, "Value": self.values[name]} for name in Names if name in self.values],
+                "InvalidParameters": [name for name in Names if name not in self.values]}
+
+    def get_parameter(self, Name, WithDecryption):
+        self.single_gets.append(Name)
+        return {"Parameter": {"Name": Name, "Value": self.values[Name]}}
+
+
+@pytest.fixture
+def ssm(monkeypatch):
+    fake = FakeSSM({f"/app/secret{i}": f"value{i}" for i in range(12)})
+    monkeypatch.setattr("boto3.client", lambda *args, **kwargs: fake)
+    return fake
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "ssm.ini"
+    path.write_text("[snowflake]\n" + "".join(f"option{i} = ssm:/app/secret{i}\n" for i in range(12)) +
+                    "missing = ssm:/app/missing\nplain = value\n")
+    return str(path)
+
+
+def test_ssm_values_are_prefetched_in_batches(ssm, config_file):
+    settings = Settings(config_file)
+
+    assert [len(batch) for batch in ssm.batches] == [10, 3]
+    assert [settings.get("snowflake", f"option{i}") for i in range(12)] == [f"value{i}" for i in range(12)]
+    assert settings.get("snowflake", "option0") == "value0"
+    assert ssm.single_gets == []
+    assert settings.ssm_cache_info() == {"hits": 13, "misses": 0, "size": 12}
+
+
+def test_expired_values_are_fetched_again(ssm, config_file, monkeypatch):
+    settings = Settings(config_file, ssm_cache_ttl=60)
+    now = settings_module.time.time()
+    monkeypatch.setattr(settings_module.time, "time", lambda: now + 120)
+
+    assert settings.get("snowflake", "option3") == "value3"
+    assert ssm.single_gets == ["/app/secret3"]
+    assert settings.ssm_cache_info()["misses"] == 1
+
+
+def test_encrypted_cache_file_gives_warm_start(ssm, config_file, tmp_path):
+    cache_file = tmp_path / "ssm.cache"
+    key = Fernet.generate_key().decode()
+    Settings(config_file, ssm_cache_file=str(cache_file), ssm_cache_key=key)
+    ssm.batches.clear()
+
+    settings = Settings(config_file, ssm_cache_file=str(cache_file), ssm_cache_key=key)
+
+    assert b"value1" not in cache_file.read_bytes()
+    assert ssm.batches == [["/app/missing"]]
+    assert settings.get("snowflake", "option11") == "value11"
+
+
+def test_cache_file_entries_expire_by_default(ssm, config_file, tmp_path, monkeypatch):
+    cache_file = tmp_path / "ssm.cache"
+    key = Fernet.generate_key().decode()
+    saves = []
+    save = Settings.EnvironmentInterpolation._save_cache_file
+    monkeypatch.setattr(Settings.EnvironmentInterpolation, "_save_cache_file",
+                        lambda self: saves.append(1) or save(self))
+    Settings(config_file, ssm_cache_file=str(cache_file), ssm_cache_key=key)
+    assert len(saves) == 1
+
+    now = settings_module.time.time()
+    monkeypatch.setattr(settings_module.time, "time", lambda: now + settings_module.DEFAULT_CACHE_FILE_TTL + 1)
+    ssm.batches.clear()
+
+    Settings(config_file, ssm_cache_file=str(cache_file), ssm_cache_key=key)
+
+    assert [len(batch) for batch in ssm.batches] == [10, 3]
+
+
+def test_prefetch_without_credentials_does_not_break_settings(config_file, monkeypatch):
+    from botocore.exceptions import NoCredentialsError
+
+    class NoCredentialsSSM:
+        def get_parameters(self, Names, WithDecryption):
+            raise NoCredentialsError()
+
+    monkeypatch.setattr("boto3.client", lambda *args, **kwargs: NoCredentialsSSM())
+
+    settings = Settings(config_file)
+
+    assert settings.get("snowflake", "plain") == "value"
+    assert settings.ssm_cache_info()["size"] == 0
+
+
+def test_cache_file_without_cryptography_names_the_extra(ssm, config_file, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "cryptography.fernet", None)
+
+    with pytest.raises(ImportError, match="ssm-cache"):
+        Settings(config_file, ssm_cache_file=str(tmp_path / "ssm.cache"), ssm_cache_key="key")
@@ -0,0 +1,134 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from data_utils.file_utils import sftp_s3_interface
+from data_utils.file_utils.sftp_s3_interface import SftpS3Interface, TransferException
+
+
+class FakeSftp:
+    def __init__(self, files, failures):
+        self.files = files
+        self.failures = failures
+        self.closed = False
+
+    def listdir(self, directory):
+        return list(self.files)
+
+    def get(self, remote_path, local_path):
+        name = remote_path.rsplit("/", 1)[-1]
+        if self.failures.get(name, 0) > 0:
+            self.failures[name] -= 1
+            raise IOError(f"Connection lost reading {name}")
+
+        with open(local_path, "wb") as f:
+            f.write(self.files[name])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSftpFile:
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+
+    def readv(self, chunks):
+        for offset, length in chunks:
+            self.reads.append(length)
+            yield self.data[offset:offset + length]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeS3:
+    def __init__(self):
+        self.uploads = []
+        self.objects = {}
+
+    def upload_file(self, file_name, bucket, key):
+        self.uploads.append((bucket, key))
+
+    def upload_fileobj(self, fileobj, bucket, key, part_size, max_concurrency):
+        self.objects[key] = b"".join(iter(lambda: fileobj.read(part_size), b""))
+
+    def get_object(self, bucket, key):
+        return {"Body": io.BytesIO(self.objects[key]), "ContentLength": len(self.objects[key])}
+
+
+@pytest.fixture
+def interface(settings, monkeypatch):
+    files = {"a.txt": b"a" * 10, "b.txt": b"b" * 20, "c.csv": b"c" * 30}
+    failures = {}
+    sessions = []
+
+    def connect(settings, vendor=None):
+        sessions.append(FakeSftp(files, failures))
+        return sessions[-1]
+
+    monkeypatch.setattr(sftp_s3_interface, "SftpConnector", connect)
+    interface = SftpS3Interface.__new__(SftpS3Interface)
+    interface.settings = settings
+    interface.vendor = None
+    interface.sftp_conn = FakeSftp(files, failures)
+    interface.s3_client = FakeS3()
+    interface.failures = failures
+    interface.sessions = sessions
+    return interface
+
+
+def test_transfer_many_matches_glob_and_retries_per_file(interface, tmp_path):
+    settings = interface.settings
+    settings.set("file_config", "use_s3", "true")
+    interface.failures["b.txt"] = 1
+
+    results = interface.transfer_many_sftp_to_s3("*.txt", "/outbound", str(tmp_path), "bucket", "raw", workers=2)
+
+    assert sorted(result.filename for result in results) == ["a.txt", "b.txt"]
+    assert {result.filename: result.attempts for result in results} == {"a.txt": 1, "b.txt": 2}
+    assert {result.filename: result.bytes for result in results} == {"a.txt": 10, "b.txt": 20}
+    assert sorted(interface.s3_client.uploads) == [("bucket", "raw/a.txt"), ("bucket", "raw/b.txt")]
+    assert (tmp_path / "b.txt").read_bytes() == b"b" * 20
+    assert all(session.closed for session in interface.sessions)
+    assert not interface.sftp_conn.closed
+
+
+def test_transfer_many_reports_every_failed_file(interface, tmp_path):
+    interface.failures.update({"a.txt": 5, "c.csv": 5})
+
+    with pytest.raises(TransferException) as e:
+        interface.transfer_many_sftp_to_s3(["a.txt", "b.txt", "c.csv"], "/outbound", str(tmp_path), "bucket",
+                                           "raw", workers=3, retry_count=2)
+
+    failed = {result.filename: result.attempts for result in e.value.results if result.error}
+    assert failed == {"a.txt": 2, "c.csv": 2}
+    assert "2 of 3 files failed" in str(e.value)
+
+
+def test_stream_sftp_to_s3_reads_one_part_at_a_time(interface):
+    data = bytes(range(256)) * 40
+    remote_file = FakeSftpFile(data)
+    interface.sftp_conn.stat = lambda path: SimpleNamespace(st_size=len(data))
+    interface.sftp_conn.open = lambda path, mode: remote_file
+
+    result = interface.stream_sftp_to_s3("big.dat", "/outbound", "bucket", "raw/big.dat", part_size=4096)
+
+    assert interface.s3_client.objects["raw/big.dat"] == data
+    assert remote_file.reads == [4096, 4096, 2048]
+    assert result.bytes == len(data) and result.local_path is None
+
+
+def test_stream_s3_to_sftp_puts_response_body(interface):
+    interface.s3_client.objects["out/report.csv"] = b"id,name\n1,a\n"
+    puts = []
+    interface.sftp_conn.putfo = lambda body, path, file_size: puts.append((body.read(), path, file_size))
+
+    result = interface.stream_s3_to_sftp("bucket", "out/report.csv", "report.csv", "/inbound")
+
+    assert puts == [(b"id,name\n1,a\n", "/inbound/report.csv", 12)]
+    assert result.attempts == 1
@@ -0,0 +1,206 @@
+import gzip
+
+import pytest
+
+from data_utils.connectors import snowflake_connector
+
+from data_utils.connectors.snowflake_connector import (SnowflakeConnectionPool, SnowflakeConnectionPoolTimeout,
+                                                       SnowflakeConnector, split_file_gzip)
+from data_utils.settings import Settings
+
+
+class FakeCursor:
+    def __init__(self, statements, results):
+        self.statements = statements
+        self.results = results
+        self.closed = False
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return self
+
+    def fetchall(self):
+        return self.results
+
+    def fetchmany(self, size):
+        rows, self.results[:] = self.results[:size], self.results[size:]
+        return rows
+
+    def fetch_arrow_batches(self):
+        return iter(self.results)
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self, results=()):
+        self.statements = []
+        self.results = list(results)
+        self.closed = False
+        self.client_prefetch_threads = 4
+        self.cursors = []
+
+    def cursor(self, cursor_class=None):
+        self.cursors.append(FakeCursor(self.statements, self.results))
+        return self.cursors[-1]
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+def test_split_file_gzip_repeats_header(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"id,name\n" + b"".join(b"%d,row\n" % i for i in range(10)))
+
+    chunks = split_file_gzip(str(path), str(tmp_path), chunk_bytes=20, header_lines=1)
+
+    contents = [gzip.open(chunk).read() for chunk in chunks]
+    assert len(chunks) == 3
+    assert all(content.startswith(b"id,name\n") for content in contents)
+    assert b"".join(content[len(b"id,name\n"):] for content in contents) == path.read_bytes()[len(b"id,name\n"):]
+
+
+def test_bulk_load_puts_all_chunks_then_copies_once(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(b"".join(b"%d,row\n" % i for i in range(100)))
+    connector = SnowflakeConnector.__new__(SnowflakeConnector)
+    connector.conn = FakeConnection([{"file": "data_00000.gz", "status": "LOADED", "rows_loaded": 100}])
+
+    results = connector.bulk_load(str(path), "my_stage", "MY_TABLE", "(FORMAT_NAME = 'csv')", chunks=3,
+                                  parallel=4)
+
+    put, copy = connector.conn.statements
+    assert put.startswith("PUT 'file:///") and "*.gz' @my_stage/my_table_" in put
+    assert "PARALLEL = 4 AUTO_COMPRESS = FALSE" in put
+    assert copy.startswith("COPY INTO MY_TABLE FROM @my_stage/my_table_")
+    assert "FILES = ('data_00000.gz', 'data_00001.gz', 'data_00002.gz')" in copy
+    assert copy.endswith("FILE_FORMAT = (FORMAT_NAME = 'csv')")
+    assert results[0]["rows_loaded"] == 100
+
+
+def test_bulk_load_puts_a_list_of_files_in_one_statement_per_compression(tmp_path):
+    parts = [tmp_path / f"part-{i}.parquet" for i in range(4)] + [tmp_path / "extra.csv"]
+    for part in parts:
+        part.write_bytes(b"data")
+    connector = SnowflakeConnector.__new__(SnowflakeConnector)
+    connector.conn = FakeConnection([])
+
+    connector.bulk_load([str(part) for part in parts], "my_stage", "MY_TABLE", "(TYPE = PARQUET)", parallel=4)
+
+    *puts, copy = connector.conn.statements
+    assert len(puts) == 2
+    assert "/compressed/*' @my_stage/my_table_" in puts[0] and puts[0].endswith("AUTO_COMPRESS = FALSE")
+    assert "/raw/*' @my_stage/my_table_" in puts[1] and puts[1].endswith("AUTO_COMPRESS = TRUE")
+    assert "'part-3.parquet', 'extra.csv.gz'" in copy
+
+
+def test_query_batches_yields_fixed_size_batches():
+    connector = SnowflakeConnector.__new__(SnowflakeConnector)
+    connector.conn = FakeConnection([(i,) for i in range(25)])
+
+    batches = connector.query_batches("SELECT 1", batch_size=10, prefetch_threads=8)
+
+    assert len(next(batches)) == 10
+    assert connector.conn.client_prefetch_threads == 8
+    assert [len(batch) for batch in batches] == [10, 5]
+    assert connector.conn.statements == ["SELECT 1"]
+    assert connector.conn.client_prefetch_threads == 4
+
+
+def test_query_arrow_batches_rebatches_result_chunks():
+    pa = pytest.importorskip("pyarrow")
+    chunks = [pa.table({"ID": list(range(start, start + size))}) for start, size in [(0, 7), (7, 0), (7, 12)]]
+    connector = SnowflakeConnector.__new__(SnowflakeConnector)
+    connector.conn = FakeConnection(chunks)
+
+    batches = list(connector.query_arrow_batches("SELECT ID FROM T", batch_size=5))
+
+    assert all(isinstance(batch, pa.RecordBatch) for batch in batches)
+    assert [batch.num_rows for batch in batches] == [5, 5, 5, 4]
+    assert [value for batch in batches for value in batch.column(0).to_pylist()] == list(range(19))
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    connections = []
+
+    def connect(**kwargs):
+        connections.append(FakeConnection([(1,)]))
+        return connections[-1]
+
+    monkeypatch.setattr(snowflake_connector.snowflake.connector, "connect", connect)
+    return connections
+
+
+def test_pool_reuses_returned_connections(fake_connect):
+    pool = SnowflakeConnectionPool({}, max_size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert pool.created_count == 1 and pool.reused_count == 1
+
+
+def test_pool_resets_client_settings_and_closes_health_check_cursors(fake_connect):
+    pool = SnowflakeConnectionPool({"client_prefetch_threads": 2}, max_size=1, health_check_seconds=0)
+
+    conn = pool.acquire()
+    conn.client_prefetch_threads = 16
+    pool.release(conn)
+
+    assert conn.client_prefetch_threads == 2
+    assert pool.acquire() is conn
+    assert conn.statements == ["SELECT 1"] and conn.cursors[-1].closed
+
+
+def test_pool_times_out_when_full(fake_connect):
+    pool = SnowflakeConnectionPool({}, max_size=1)
+
+    with pool.connection():
+        with pytest.raises(SnowflakeConnectionPoolTimeout):
+            pool.acquire(timeout=0.01)
+
+
+def test_pool_evicts_idle_and_unhealthy_connections(fake_connect):
+    pool = SnowflakeConnectionPool({}, max_size=2, max_idle_seconds=60, health_check_seconds=0)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.cursor = None  # SELECT 1 health check now fails
+    assert pool.acquire() is not conn
+    assert conn.closed
+
+    pool.max_idle_seconds = 0
+    pool.release(fake_connect[-1])
+    assert pool.acquire() is not fake_connect[-2]
+    assert len(fake_connect) == 3
+
+
+def test_pooled_connectors_share_a_pool(fake_connect, tmp_path):
+    config_file = tmp_path / "snowflake.ini"
+    config_file.write_text("[snowflake]\nusername = u\npassword = p\naccount = a\nregion = r\nwarehouse = w\n"
+                           "database = d\nrole = r\nschema = s\npool = true\n")
+    settings = Settings(str(config_file))
+
+    with SnowflakeConnector(settings) as connector:
+        first = connector.conn
+    with SnowflakeConnector.borrow(settings) as connector:
+        assert connector.conn is first
+
+    connector.close()
+    assert connector.conn is None and not first.closed
+    snowflake_connector.close_pools()
+    assert first.closed
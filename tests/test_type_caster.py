@@ -49,3 +49,80 @@ def test_parse_expiration_date():
     assert TypeCaster._parse_expiration_date('21-03-01', '%y-%m-%d') == '2021-03-01'
     assert TypeCaster._parse_expiration_date('03/21') == '2021-03-31'
     assert TypeCaster._parse_expiration_date('032021') == '2021-03-31'
+
+
+PLAN_LAYOUT = """Record Type,Copybook Element Name,Data Type,Start,End,Length,Logic Type,Pic Clause
+,TXN-COUNT,N,1,5,5,,9(5)
+,TXN-AMOUNT,N,6,16,11,,-9(7).9(2)
+,TXN-DATE,D,17,24,8,,9(8)
+,TXN-EXP-DATE,D,25,28,4,,9(4)
+,TXN-TIME,T,29,34,6,,9(6)
+,TXN-NAME,A,35,44,10,,X(10)
+,TXN-PACKED,N,45,47,3,,S9(3)V9(2) COMP-3
+"""
+
+PLAN_VALUES = [
+    ["00042", "-000012345", "20210328", "2103", "235000", "BOB", b"\x12\x34\x5d"],
+    ["4{", "0000123.45", "2021153", "1153", "", "A\u0000B", b"\x00\x01\x2c"],
+    ["", "", "", "", "12", "", "123"],
+    ["abc", "fail4sure{", "xx", "9999", "hhmmss", "NAME", b"\xff\xff"],
+]
+
+
+@pytest.mark.parametrize("values", PLAN_VALUES)
+def test_cast_record_matches_cast_data_types(make_file_spec, values):
+    spec = make_file_spec(PLAN_LAYOUT, record_type_start=None, cast_fields={
+        "TXN-EXP-DATE": {"data_type": "D", "pic_clause": "9(4)", "date_format": "%y%m"}})
+    caster = TypeCaster(spec)
+    layout = spec.layout["000"]
+
+    expected = [caster.cast_data_types(value, field[1], field[6], field[0]) for value, field in zip(values, layout)]
+
+    assert caster.cast_record("000", values) == expected
+    assert caster.cast_record("000", dict(zip("abcdefg", values))) == dict(zip("abcdefg", expected))
+
+
+def test_cast_data_types_unpacks_packed_bytes():
+    caster = TypeCaster.__new__(TypeCaster)
+
+    assert caster.cast_data_types(b"\x12\x34\x5d", "N", "S9(3)V9(2) COMP-3", "AMOUNT") == -123.45
+    assert caster.cast_data_types(b"\x12\x3c", "N", "S9(3) COMP-3", "AMOUNT") == 123
+
+
+def test_date_cache_counts_hits_and_misses(make_file_spec):
+    caster = TypeCaster(make_file_spec(PLAN_LAYOUT, record_type_start=None))
+
+    for _ in range(3):
+        assert caster._parse_date_field("20210328", "TXN-DATE", "9(8)") == "2021-03-28"
+        assert caster._parse_date_field("032023", "TXN-DATE", "9(8)") == "2023-03-31"
+
+    info = caster.date_cache_info()["TXN-DATE"]
+    assert (info.hits, info.misses) == (4, 2)
+
+
+def test_date_cache_keys_julian_dates_by_decade(make_file_spec, monkeypatch):
+    from data_utils.file_utils.fixed_width import type_caster
+
+    caster = TypeCaster(make_file_spec(PLAN_LAYOUT, record_type_start=None))
+    cast_date = caster.plans["000"][2]
+
+    monkeypatch.setattr(type_caster, "_julian_year_prefix", lambda: "202")
+    assert cast_date("1153") == "2021-06-02"
+    monkeypatch.setattr(type_caster, "_julian_year_prefix", lambda: "203")
+    assert cast_date("1153") == "2031-06-02"
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("12{", "120"), ("12}", "-120"), ("12A", "121"), ("12I", "129"), ("12J", "-121"), ("12R", "-129"),
+    ("{", "0"), ("00123", "00123"), ("{0012", "0012"), ("fail4sure{", "fail4sure"), ("", ""),
+])
+def test_unpunch(value, expected):
+    assert TypeCaster.unpunch(value) == expected
+
+
+def test_negative_overpunch_keeps_sign():
+    caster = TypeCaster.__new__(TypeCaster)
+
+    assert caster.cast_data_types("0001234J", "N", "S9(8)", "AMOUNT") == -12341
+    assert caster.cast_data_types("0001234J", "N", "S9(6)V9(2)", "AMOUNT") == -123.41
+    assert caster.cast_data_types("0001234{", "N", "S9(6)V9(2)", "AMOUNT") == 123.40